@@ -0,0 +1,120 @@
+class TableInfo:
+    """Model representing a table's size statistics from information_schema."""
+    def __init__(self, name: str, data_length: int = 0, index_length: int = 0, table_rows: int = 0):
+        self.name = name
+        self.data_length = int(data_length or 0)
+        self.index_length = int(index_length or 0)
+        self.table_rows = int(table_rows or 0)
+
+    @property
+    def estimated_bytes(self) -> int:
+        """Rough size of the table's dump, based on its data and index footprint."""
+        return self.data_length + self.index_length
+
+    def __repr__(self):
+        return f"Table(Name={self.name}, Bytes={self.estimated_bytes}, Rows={self.table_rows})"
+
+class DumpUnit:
+    """Model representing a whole table, or one primary-key range of it, assigned to a dump worker."""
+    def __init__(self, table: TableInfo, estimated_bytes: int = None, table_rows: int = None,
+                 where: str = None, part: int = None):
+        self.table = table
+        self.name = table.name
+        self.estimated_bytes = table.estimated_bytes if estimated_bytes is None else estimated_bytes
+        self.table_rows = table.table_rows if table_rows is None else table_rows
+        self.where = where
+        self.part = part
+
+    @property
+    def is_part(self) -> bool:
+        return self.part is not None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "estimated_bytes": self.estimated_bytes,
+            "table_rows": self.table_rows,
+            "where": self.where,
+            "part": self.part,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            TableInfo(data["name"]),
+            estimated_bytes=data["estimated_bytes"],
+            table_rows=data["table_rows"],
+            where=data["where"],
+            part=data["part"],
+        )
+
+    def __repr__(self):
+        if self.is_part:
+            return f"DumpUnit(Name={self.name}, Part={self.part}, Where={self.where}, Bytes={self.estimated_bytes})"
+        return f"DumpUnit(Name={self.name}, Bytes={self.estimated_bytes})"
+
+class DumpFile:
+    """Model representing one output file of a dump run and the units written into it."""
+    def __init__(self, file_name: str, units: list[DumpUnit]):
+        self.file_name = file_name
+        self.units = units
+
+    @property
+    def name(self) -> str:
+        return self.file_name
+
+    @property
+    def tables(self) -> list[str]:
+        return list(dict.fromkeys(unit.name for unit in self.units))
+
+    @property
+    def estimated_bytes(self) -> int:
+        return sum(unit.estimated_bytes for unit in self.units)
+
+    @property
+    def table_rows(self) -> int:
+        return sum(unit.table_rows for unit in self.units)
+
+    def to_dict(self) -> dict:
+        return {"tables": self.tables, "units": [unit.to_dict() for unit in self.units]}
+
+    @classmethod
+    def from_dict(cls, file_name: str, data: dict):
+        return cls(file_name, [DumpUnit.from_dict(unit) for unit in data["units"]])
+
+    def __repr__(self):
+        return f"DumpFile(Name={self.file_name}, Tables={self.tables}, Bytes={self.estimated_bytes})"
+
+class ImportUnit:
+    """
+    Model representing one table's section of a dump file, or a whole dump file, to import.
+
+    Delimited-text files are whole-file units with `load_table` set to the table they are loaded into.
+    Files of a stored export list their `chunks`, read from the chunk store at `path`.
+    """
+    def __init__(self, file_name: str, path: str, size: int, table: str = None, offset: int = 0,
+                 header: bytes = b"", footer: bytes = b"", temporary: bool = False, deferred: bool = False,
+                 load_table: str = None, chunks: list[str] = None):
+        self.file_name = file_name
+        self.path = path
+        self.size = size
+        self.table = table
+        self.offset = offset
+        self.header = header
+        self.footer = footer
+        self.temporary = temporary
+        self.deferred = deferred
+        self.load_table = load_table
+        self.chunks = chunks
+
+    @property
+    def key(self) -> str:
+        """The unit's entry in the import state."""
+        return self.file_name if self.table is None else f"{self.file_name}#{self.table}"
+
+    @property
+    def is_whole_file(self) -> bool:
+        return self.table is None
+
+    def __repr__(self):
+        return f"ImportUnit(Key={self.key}, Bytes={self.size})"
@@ -0,0 +1,140 @@
+import json
+import os
+import re
+import time
+from datetime import datetime
+from sql.models.models import TableInfo
+
+CATALOG_FOLDER = os.path.join("exported_sqls", "catalog")
+CATALOG_TTL_SECONDS = 3600
+INTEGER_TYPES = ("tinyint", "smallint", "mediumint", "int", "bigint")
+
+# Every table with its primary-key and foreign-key columns, one row per key column, in a single query
+CATALOG_QUERY = (
+    "SELECT t.TABLE_NAME, t.TABLE_TYPE, t.DATA_LENGTH, t.INDEX_LENGTH, t.TABLE_ROWS, t.UPDATE_TIME, "
+    "k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME, c.DATA_TYPE "
+    "FROM information_schema.TABLES t "
+    "LEFT JOIN information_schema.KEY_COLUMN_USAGE k ON k.TABLE_SCHEMA = t.TABLE_SCHEMA "
+    "AND k.TABLE_NAME = t.TABLE_NAME "
+    "AND (k.CONSTRAINT_NAME = 'PRIMARY' OR k.REFERENCED_TABLE_NAME IS NOT NULL) "
+    "LEFT JOIN information_schema.COLUMNS c ON c.TABLE_SCHEMA = k.TABLE_SCHEMA "
+    "AND c.TABLE_NAME = k.TABLE_NAME AND c.COLUMN_NAME = k.COLUMN_NAME "
+    "WHERE t.TABLE_SCHEMA = %s "
+    "ORDER BY t.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION;"
+)
+
+
+class SchemaCatalog:
+    """
+    Local cache of a database's tables: type, size, row count, update time, primary key and
+    foreign-key edges, kept per endpoint and database under exported_sqls/catalog.
+
+    Listing and planning read the cache while it is younger than its TTL, so they need no
+    tunnel or connection; a refresh re-reads everything from information_schema in one query.
+    """
+    def __init__(self, path: str, database: str, tables: dict = None, foreign_keys: list = None,
+                 fetched_at: float = 0):
+        self.path = path
+        self.database = database
+        self.tables = tables or {}
+        self.foreign_keys = foreign_keys or []
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def path_for(cls, rds_host: str, rds_port, rds_db: str) -> str:
+        """Return the cache file of one endpoint and database."""
+        name = re.sub(r"[^\w.-]", "_", f"{rds_host}_{rds_port}_{rds_db}")
+        return os.path.join(CATALOG_FOLDER, f"{name}.json")
+
+    @classmethod
+    def load(cls, path: str):
+        """Load a cached catalog, or return None if there is none."""
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls(path, data["database"], data["tables"], data["foreign_keys"], data["fetched_at"])
+
+    @classmethod
+    def fetch(cls, path: str, database: str, cursor):
+        """
+        Read a fresh catalog from information_schema and save it.
+
+        Args:
+            path (str): The cache file to write.
+            database (str): The schema to read.
+            cursor: An open cursor on the database.
+        """
+        cursor.execute(CATALOG_QUERY, (database,))
+        tables, edges = {}, {}
+        for (name, table_type, data_length, index_length, table_rows, update_time,
+             constraint, column, referenced_table, referenced_column, data_type) in cursor.fetchall():
+            table = tables.setdefault(name, {
+                "type": table_type,
+                "data_length": int(data_length or 0),
+                "index_length": int(index_length or 0),
+                "table_rows": int(table_rows or 0),
+                "update_time": update_time.isoformat() if update_time else None,
+                "primary_key": [],
+                "primary_key_types": [],
+            })
+            if constraint == "PRIMARY":
+                table["primary_key"].append(column)
+                table["primary_key_types"].append((data_type or "").lower())
+            elif referenced_table is not None:
+                edge = edges.setdefault((name, constraint), {
+                    "table": name,
+                    "columns": [],
+                    "referenced_table": referenced_table,
+                    "referenced_columns": [],
+                })
+                edge["columns"].append(column)
+                edge["referenced_columns"].append(referenced_column)
+
+        catalog = cls(path, database, tables, list(edges.values()), time.time())
+        catalog.save()
+        return catalog
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(
+                {
+                    "database": self.database,
+                    "fetched_at": self.fetched_at,
+                    "tables": self.tables,
+                    "foreign_keys": self.foreign_keys,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+
+    def is_fresh(self, ttl_seconds: float) -> bool:
+        return time.time() - self.fetched_at < ttl_seconds
+
+    def age(self) -> str:
+        return datetime.fromtimestamp(self.fetched_at).isoformat(timespec="seconds")
+
+    def table_names(self) -> list[str]:
+        """All tables and views, like SHOW TABLES."""
+        return sorted(self.tables)
+
+    def view_names(self) -> list[str]:
+        return sorted(name for name, table in self.tables.items() if table["type"] == "VIEW")
+
+    def table_info(self, name: str) -> TableInfo:
+        """Return a table's size statistics; unknown tables and views have zero size."""
+        table = self.tables.get(name)
+        if table is None:
+            return TableInfo(name)
+        return TableInfo(name, table["data_length"], table["index_length"], table["table_rows"])
+
+    def integer_primary_keys(self, table_names: list[str]) -> dict:
+        """Return table name to primary key column, for tables with a single-column integer key."""
+        keys = {}
+        for name in table_names:
+            table = self.tables.get(name)
+            if table and len(table["primary_key"]) == 1 and table["primary_key_types"][0] in INTEGER_TYPES:
+                keys[name] = table["primary_key"][0]
+        return keys
@@ -1,8 +1,11 @@
 import click
 import os
+import shutil
 from instant.utils.constants import DEFAULT_REGIONS, IGNORED_TABLES
 from sql_helper import SqlHelper
 from sql_local_helper import SqlLocalHelper
+from sql_store import ChunkStore, store_export_folder
+from sql_subset import parse_seed
 from aws.aws_helper import AwsHelper
 from instant.utils.general_helper import GeneralHelper
 
@@ -11,11 +14,13 @@ def cli():
     """SQL CLI commands."""
     pass
 
-@cli.command()
-@click.option('--prefix', default='brick', prompt='Give me the instance prefix',
-              help='This helps filter the instances result.')
-def dump_data(prefix):
-    """Dump RDS data to local."""
+def select_remote_sql_helper(prefix, aws_profile, tunnels):
+    """
+    Prompt for the region, bastion instance and RDS endpoint, and build the SqlHelper for them.
+
+    Returns:
+        SqlHelper: The helper for the selected source, or None if no instance matches the prefix.
+    """
     click.echo("Select the AWS region:")
     for index, region in enumerate(DEFAULT_REGIONS, start=1):
         click.echo(f"{index}. {region}")
@@ -24,14 +29,13 @@ def dump_data(prefix):
     region = DEFAULT_REGIONS[choice - 1]
     click.echo(f"Selected region: {region}, prefix {prefix}")
 
-    
     # Lets find the instance with prefix in the selected region
-    aws_helper = AwsHelper(aws_profile= os.getenv("AWS_PROFILE"), aws_region=region)
+    aws_helper = AwsHelper(aws_profile=aws_profile, aws_region=region)
     instances = aws_helper.get_running_instances(prefix)
     
     if not instances:
         click.echo("No running instances found with the given prefix.")
-        return
+        return None
 
     instance_names = [instance.name for instance in instances]
     selected_instance_name = GeneralHelper.select_option(instance_names)
@@ -42,8 +46,7 @@ def dump_data(prefix):
     rds_endpoints = [rds.endpoint for rds in list_rds]
     selected_rds_endpoint = GeneralHelper.select_option(rds_endpoints)
 
-    # First init the SqlHelper
-    sql_helper = SqlHelper(
+    return SqlHelper(
         ssh_host=selected_instance.public_ip,  # Assuming the instance has a public IP
         ssh_port=22,  # Default SSH port
         ssh_user=os.getenv('SSH_USER'),  # Adjust as necessary
@@ -53,15 +56,120 @@ def dump_data(prefix):
         rds_user=os.getenv('RDS_USER'),  # Adjust as necessary
         rds_password=os.getenv('RDS_PASSWORD'),  # Replace with actual password
         rds_db=os.getenv('RDS_DB'),  # Adjust as necessary
+        tunnel_count=tunnels,
     )
 
-    filtered_tables = sql_helper.get_filtered_table_names(IGNORED_TABLES)
-    click.echo(f"filtered_tables {filtered_tables}")
-    # Perform the dump_data process
-    sql_helper.dump_data(
-        tables_to_dump=filtered_tables,  # Replace with your table names
+def local_sql_helper():
+    """Build the SqlLocalHelper for the local database configured in the environment."""
+    return SqlLocalHelper(
+        rds_host='127.0.0.1',
+        rds_port=int(os.getenv('LOCAL_RDS_PORT')),
+        rds_user=os.getenv('LOCAL_RDS_USER'),
+        rds_password=os.getenv('LOCAL_RDS_PASSWORD'),
+        rds_db=os.getenv('LOCAL_RDS_DB'),
     )
 
+@cli.command()
+@click.option('--prefix', default='brick', prompt='Give me the instance prefix',
+              help='This helps filter the instances result.')
+@click.option('--workers', default=5, type=int, help='Number of parallel dump processes.')
+@click.option('--dry-run', is_flag=True, help='Print the planned table assignment without dumping.')
+@click.option('--tunnels', default=1, type=int, help='Number of shared SSH tunnels the workers connect through.')
+@click.option('--compress', type=click.Choice(['gzip', 'zstd']), default=None,
+              help='Stream the dumps through a compressor into .sql.gz/.sql.zst files.')
+@click.option('--split-threshold-mb', default=1024, type=int,
+              help='Tables at least this large are dumped as parallel primary-key ranges.')
+@click.option('--split-parts', default=None, type=int,
+              help='Number of primary-key ranges per split table (defaults to --workers).')
+@click.option('--incremental', is_flag=True,
+              help='Only dump tables changed since the previous export, hard-linking the unchanged files.')
+@click.option('--checksum', type=click.Choice(['quick', 'full']), default='quick',
+              help='How tables are checked for changes in the manifest: quick uses CHECKSUM TABLE QUICK and '
+                   'UPDATE_TIME; full runs CHECKSUM TABLE, a scan of every table on the source.')
+@click.option('--resume', is_flag=True, help="Only redo the files today's export did not finish.")
+@click.option('--retries', default=3, type=int, help='Retries per failed file, with exponential backoff.')
+@click.option('--format', 'data_format', type=click.Choice(['sql', 'tsv']), default='sql',
+              help='sql: mysqldump files. tsv: one delimited-text file per table plus schema files, '
+                   'imported with LOAD DATA LOCAL INFILE (needs local_infile on the target).')
+@click.option('--engine', type=click.Choice(['mysqldump', 'native']), default='mysqldump',
+              help='native: dump SQL over pymysql from one snapshot shared by all workers, no mysqldump needed.')
+@click.option('--adaptive', is_flag=True,
+              help='Start with few workers and add or remove them as measured throughput changes, up to --workers.')
+@click.option('--threads-running-limit', default=25, type=int,
+              help="With --adaptive, back off while the database's Threads_running is above this.")
+@click.option('--refresh-catalog', is_flag=True,
+              help='Re-read table names, sizes and keys from the database instead of the cached catalog.')
+@click.option('--subset', 'subset_seeds', multiple=True, metavar='TABLE[:WHERE]',
+              help='Only dump these seed rows and the rows they reference through foreign keys; '
+                   'other tables are dumped schema-only. Repeatable.')
+@click.option('--subset-limit', default=None, type=int,
+              help='With --subset, keep at most this many of the newest rows per seed table.')
+@click.option('--trace', is_flag=True,
+              help='Also write a Chrome trace-event file of the run, next to its JSON-lines metrics.')
+@click.option('--max-worker-mbps', default=None, type=float,
+              help="Cap each worker's dump output at this many MB per second.")
+@click.option('--max-total-mbps', default=None, type=float,
+              help="Cap all workers' dump output together at this many MB per second.")
+@click.option('--throttle-threads-running', default=None, type=int,
+              help="Slow the workers while the source's Threads_running is above this; pause them at twice as many.")
+@click.option('--throttle-replica-lag', default=None, type=int,
+              help="Slow the workers while the source's replica lag is above this many seconds; pause them at twice.")
+def dump_data(prefix, workers, dry_run, tunnels, compress, split_threshold_mb, split_parts, incremental,
+              checksum, resume, retries, data_format, engine, adaptive, threads_running_limit, refresh_catalog,
+              subset_seeds, subset_limit, trace, max_worker_mbps, max_total_mbps, throttle_threads_running,
+              throttle_replica_lag):
+    """Dump RDS data to local."""
+    if engine == 'native' and data_format != 'sql':
+        raise click.UsageError("--engine native writes SQL files, use it with --format sql.")
+    if engine == 'native' and adaptive:
+        raise click.UsageError("--engine native opens every snapshot at once, it cannot be used with --adaptive.")
+    if subset_seeds and incremental:
+        raise click.UsageError("--subset dumps partial tables, it cannot reuse files with --incremental.")
+    if subset_limit is not None and not subset_seeds:
+        raise click.UsageError("--subset-limit applies to the seed tables, use it with --subset.")
+    subset = dict(parse_seed(seed) for seed in subset_seeds) or None
+
+    sql_helper = select_remote_sql_helper(prefix, os.getenv("AWS_PROFILE"), tunnels)
+    if sql_helper is None:
+        return
+
+    # Keep one set of tunnels open for the table listing and the dump itself
+    with sql_helper.open_tunnel():
+        sql_helper.get_catalog(refresh=refresh_catalog)
+        filtered_tables = sql_helper.get_filtered_table_names(IGNORED_TABLES)
+        click.echo(f"filtered_tables {filtered_tables}")
+        if subset:
+            schema_catalog = sql_helper.get_catalog()
+            for table in subset:
+                if table not in filtered_tables:
+                    raise click.UsageError(f"--subset table {table} is not among the tables to dump.")
+                if subset_limit is not None and not schema_catalog.tables[table]["primary_key"]:
+                    raise click.UsageError(f"--subset-limit needs a primary key, {table} has none.")
+        # Perform the dump_data process
+        sql_helper.dump_data(
+            tables_to_dump=filtered_tables,  # Replace with your table names
+            num_workers=workers,
+            dry_run=dry_run,
+            compress=compress,
+            split_threshold_bytes=split_threshold_mb * 1024 * 1024,
+            split_parts=split_parts,
+            incremental=incremental,
+            resume=resume,
+            retries=retries,
+            data_format=data_format,
+            engine=engine,
+            adaptive=adaptive,
+            threads_running_limit=threads_running_limit,
+            subset=subset,
+            subset_limit=subset_limit,
+            trace=trace,
+            max_worker_rate=max_worker_mbps * 1024 * 1024 if max_worker_mbps else None,
+            max_total_rate=max_total_mbps * 1024 * 1024 if max_total_mbps else None,
+            throttle_threads_running=throttle_threads_running,
+            throttle_replica_lag=throttle_replica_lag,
+            checksum=checksum,
+        )
+
 @cli.command()
 @click.option('--prefix', default='brick', prompt='Give me the instance prefix',
               help='This helps filter the instances result.')
@@ -69,64 +177,271 @@ def dump_data(prefix):
               help='AWS profile to use (optional).')
 @click.option('--source-folder', prompt='Please provide the source data folder', help='Exported data folder')
 @click.option('--local', is_flag=True, help='Flag to indicate if the operation is local.')
-def import_data(prefix, aws_profile, source_folder, local):
+@click.option('--tunnels', default=1, type=int, help='Number of shared SSH tunnels the workers connect through.')
+@click.option('--resume', is_flag=True, help='Skip the files a previous import of this folder completed.')
+@click.option('--retries', default=3, type=int, help='Retries per failed file, with exponential backoff.')
+@click.option('--fast-load', is_flag=True,
+              help='Load each file with foreign-key/unique checks off and one commit per file.')
+@click.option('--skip-binlog', is_flag=True,
+              help='With --fast-load on a local target, also disable binary logging for the session.')
+@click.option('--split/--no-split', default=True,
+              help='Cut multi-table dump files into per-table units that import in parallel.')
+@click.option('--workers', default=5, type=int, help='Number of parallel import processes.')
+@click.option('--from-store', is_flag=True,
+              help="Stream the export named like the source folder's last path part from the chunk store.")
+@click.option('--adaptive', is_flag=True,
+              help='Start with few workers and add or remove them as measured throughput changes, up to --workers.')
+@click.option('--threads-running-limit', default=25, type=int,
+              help="With --adaptive, back off while the database's Threads_running is above this.")
+@click.option('--trace', is_flag=True,
+              help='Also write a Chrome trace-event file of the run, next to its JSON-lines metrics.')
+@click.option('--defer-indexes', is_flag=True,
+              help='Create tables with only their primary key and add the secondary indexes after the data load.')
+@click.option('--index-workers', default=4, type=int,
+              help='With --defer-indexes, number of tables whose indexes are added concurrently.')
+def import_data(prefix, aws_profile, source_folder, local, tunnels, resume, retries, fast_load, skip_binlog, split,
+                workers, from_store, adaptive, threads_running_limit, trace, defer_indexes, index_workers):
     """
     Import SQL files from a specified folder into the database.
+    Compressed dumps (.sql.gz, .sql.zst) are decompressed on the fly, and delimited-text
+    exports (.tsv) are bulk-loaded with LOAD DATA LOCAL INFILE after their schema file.
 
     Parameters:
     - prefix (str): Instance prefix to filter the instances.
     - aws_profile (str): AWS profile to use (optional).
     - source_folder (str): Folder containing the SQL files to import.
     - local (bool): Flag to indicate if the operation is local.
+    - tunnels (int): Number of shared SSH tunnels for remote imports.
+    - resume (bool): Skip the files a previous import of this folder completed.
+    - retries (int): Retries per failed file.
+    - fast_load (bool): Wrap each file in a bulk-load tuned session.
+    - skip_binlog (bool): With fast_load, set sql_log_bin=0 (local only).
+    - split (bool): Cut multi-table files into per-table units.
+    - workers (int): Number of parallel import processes.
+    - from_store (bool): Stream the stored export instead of reading the folder's files.
+    - trace (bool): Also write a Chrome trace-event file of the run.
+    - adaptive (bool): Tune the number of running workers to the measured throughput.
+    - threads_running_limit (int): With adaptive, back off above this many running threads.
+    - defer_indexes (bool): Add the secondary indexes after the data load, one ALTER TABLE per table.
+    - index_workers (int): Number of tables indexed concurrently.
     """
     if local:
         click.echo(f"Running in local mode, prefix {prefix}")
-        sql_helper = SqlLocalHelper(
-            rds_host='127.0.0.1',
-            rds_port=int(os.getenv('LOCAL_RDS_PORT')),
-            rds_user=os.getenv('LOCAL_RDS_USER'),
-            rds_password=os.getenv('LOCAL_RDS_PASSWORD'),
-            rds_db=os.getenv('LOCAL_RDS_DB'),
+        sql_helper = local_sql_helper()
+        sql_helper.import_data_local(
+            sql_folder=source_folder, resume=resume, retries=retries, fast_load=fast_load, skip_binlog=skip_binlog,
+            split_units=split, num_workers=workers, adaptive=adaptive, threads_running_limit=threads_running_limit,
+            from_store=from_store, trace=trace, defer_indexes=defer_indexes, index_workers=index_workers,
         )
-        sql_helper.import_data_local(sql_folder=source_folder)
     else:
-        click.echo("Select the AWS region:")
-        for index, region in enumerate(DEFAULT_REGIONS, start=1):
-            click.echo(f"{index}. {region}")
-        
-        choice = click.prompt("Enter the number of your choice", type=int)
-        region = DEFAULT_REGIONS[choice - 1]
-        click.echo(f"Selected region: {region}, prefix {prefix}")
-
-        # Initialize the AWS helper
-        aws_helper = AwsHelper(aws_profile=aws_profile, aws_region=region)
-        instances = aws_helper.get_running_instances(prefix)
-        
-        if not instances:
-            click.echo("No running instances found with the given prefix.")
+        sql_helper = select_remote_sql_helper(prefix, aws_profile, tunnels)
+        if sql_helper is None:
             return
 
-        instance_names = [instance.name for instance in instances]
-        selected_instance_name = GeneralHelper.select_option(instance_names)
-        selected_instance = next(instance for instance in instances if instance.name == selected_instance_name)
-
-        # List available RDS instances in the selected region
-        list_rds = aws_helper.list_available_rds()
-        rds_endpoints = [rds.endpoint for rds in list_rds]
-        selected_rds_endpoint = GeneralHelper.select_option(rds_endpoints)
-
-        # Initialize the SqlHelper
-        sql_helper = SqlHelper(
-            ssh_host=selected_instance.public_ip,
-            ssh_port=22,
-            ssh_user=os.getenv('SSH_USER'),
-            ssh_pkey=os.getenv('KEY_PATH'),
-            rds_host=selected_rds_endpoint,
-            rds_port=int(os.getenv('RDS_PORT')),
-            rds_user=os.getenv('RDS_USER'),
-            rds_password=os.getenv('RDS_PASSWORD'),
-            rds_db=os.getenv('RDS_DB'),
+        # Call the import_data method
+        if skip_binlog:
+            click.echo("--skip-binlog only applies to local imports, ignoring it.")
+        sql_helper.import_data(
+            sql_folder=source_folder, resume=resume, retries=retries, fast_load=fast_load, split_units=split,
+            num_workers=workers, adaptive=adaptive, threads_running_limit=threads_running_limit, from_store=from_store,
+            trace=trace, defer_indexes=defer_indexes, index_workers=index_workers,
         )
 
-        # Call the import_data method
-        sql_helper.import_data(sql_folder=source_folder)
\ No newline at end of file
+@cli.command()
+@click.option('--prefix', default='brick', prompt='Give me the instance prefix',
+              help='This helps filter the instances result.')
+@click.option('--aws-profile', default=os.getenv("AWS_PROFILE"),
+              help='AWS profile to use (optional).')
+@click.option('--workers', default=5, type=int, help='Number of tables streamed concurrently.')
+@click.option('--tunnels', default=1, type=int, help='Number of shared SSH tunnels the workers connect through.')
+@click.option('--split-threshold-mb', default=1024, type=int,
+              help='Tables at least this large are streamed as parallel primary-key ranges.')
+@click.option('--split-parts', default=None, type=int,
+              help='Number of primary-key ranges per split table (defaults to --workers).')
+@click.option('--archive', is_flag=True, help="Also keep a copy of every stream in today's export folder.")
+@click.option('--compress', type=click.Choice(['gzip', 'zstd']), default=None,
+              help='Compress the archive copies into .sql.gz/.sql.zst files.')
+@click.option('--resume', is_flag=True, help="Only clone the files today's clone did not finish.")
+@click.option('--retries', default=3, type=int, help='Retries per failed file, with exponential backoff.')
+@click.option('--fast-load', is_flag=True,
+              help='Load each stream with foreign-key/unique checks off and one commit per stream.')
+@click.option('--adaptive', is_flag=True,
+              help='Start with few workers and add or remove them as measured throughput changes, up to --workers.')
+@click.option('--threads-running-limit', default=25, type=int,
+              help="With --adaptive, back off while the database's Threads_running is above this.")
+@click.option('--refresh-catalog', is_flag=True,
+              help='Re-read table names, sizes and keys from the database instead of the cached catalog.')
+@click.option('--trace', is_flag=True,
+              help='Also write a Chrome trace-event file of the run, next to its JSON-lines metrics.')
+def clone(prefix, aws_profile, workers, tunnels, split_threshold_mb, split_parts, archive, compress, resume,
+          retries, fast_load, adaptive, threads_running_limit, refresh_catalog, trace):
+    """
+    Clone RDS data straight into the local database, without writing dump files first.
+    Each table streams from mysqldump into the local mysql client as it is read.
+    """
+    if compress and not archive:
+        raise click.UsageError("--compress applies to the archive copies, use it with --archive.")
+
+    sql_helper = select_remote_sql_helper(prefix, aws_profile, tunnels)
+    if sql_helper is None:
+        return
+
+    # Keep one set of tunnels open for the table listing and the clone itself
+    with sql_helper.open_tunnel():
+        sql_helper.get_catalog(refresh=refresh_catalog)
+        filtered_tables = sql_helper.get_filtered_table_names(IGNORED_TABLES)
+        click.echo(f"filtered_tables {filtered_tables}")
+        sql_helper.clone_data(
+            tables_to_clone=filtered_tables,
+            target=local_sql_helper(),
+            num_workers=workers,
+            split_threshold_bytes=split_threshold_mb * 1024 * 1024,
+            split_parts=split_parts,
+            archive=archive,
+            compress=compress,
+            resume=resume,
+            retries=retries,
+            fast_load=fast_load,
+            adaptive=adaptive,
+            threads_running_limit=threads_running_limit,
+            trace=trace,
+        )
+
+@cli.command()
+@click.option('--prefix', default='brick', prompt='Give me the instance prefix',
+              help='This helps filter the instances result.')
+@click.option('--aws-profile', default=os.getenv("AWS_PROFILE"),
+              help='AWS profile to use (optional).')
+@click.option('--refresh', is_flag=True, help='Re-read the catalog from the database even if the cache is fresh.')
+def catalog(prefix, aws_profile, refresh):
+    """
+    Show the cached schema catalog of an RDS database: tables, sizes, primary keys and foreign keys.
+    The catalog is refreshed from information_schema when older than an hour, or with --refresh.
+    """
+    sql_helper = select_remote_sql_helper(prefix, aws_profile, 1)
+    if sql_helper is None:
+        return
+
+    schema_catalog = sql_helper.get_catalog(refresh=refresh)
+    click.echo(f"Catalog of {sql_helper.rds_db}, fetched {schema_catalog.age()}:")
+    for name in schema_catalog.table_names():
+        table = schema_catalog.tables[name]
+        if table["type"] == "VIEW":
+            click.echo(f"  {name} (view)")
+            continue
+        size = GeneralHelper.format_bytes(table["data_length"] + table["index_length"])
+        primary_key = ", ".join(table["primary_key"]) or "none"
+        click.echo(f"  {name}: {size}, ~{table['table_rows']} rows, primary key {primary_key}")
+    for edge in schema_catalog.foreign_keys:
+        click.echo(
+            f"  {edge['table']}({', '.join(edge['columns'])}) -> "
+            f"{edge['referenced_table']}({', '.join(edge['referenced_columns'])})"
+        )
+
+@cli.command()
+@click.option('--prefix', default='brick', prompt='Give me the instance prefix',
+              help='This helps filter the instances result.')
+@click.option('--aws-profile', default=os.getenv("AWS_PROFILE"),
+              help='AWS profile to use (optional).')
+@click.option('--table', 'tables', multiple=True, help='Only verify these tables (repeatable); defaults to all.')
+@click.option('--method', type=click.Choice(['crc', 'checksum']), default='crc',
+              help='crc: row counts and CRC32 aggregates per primary-key range. '
+                   'checksum: CHECKSUM TABLE, only comparable between identical server versions.')
+@click.option('--chunk-rows', default=200000, type=int, help='Approximate rows per checksummed key range.')
+@click.option('--source-workers', default=2, type=int, help='Concurrent checksum queries on the source.')
+@click.option('--target-workers', default=4, type=int, help='Concurrent checksum queries on the local target.')
+@click.option('--pause', default=0.0, type=float, help='Seconds to sleep between chunks on the source.')
+@click.option('--tunnels', default=1, type=int, help='Number of shared SSH tunnels the workers connect through.')
+@click.option('--refresh-catalog', is_flag=True,
+              help='Re-read table names, sizes and keys from the database instead of the cached catalog.')
+def verify(prefix, aws_profile, tables, method, chunk_rows, source_workers, target_workers, pause, tunnels,
+           refresh_catalog):
+    """
+    Verify that the local database matches the RDS source after an import or clone.
+    Source and target are checksummed concurrently; mismatched tables or key ranges are reported.
+    """
+    sql_helper = select_remote_sql_helper(prefix, aws_profile, tunnels)
+    if sql_helper is None:
+        return
+
+    with sql_helper.open_tunnel():
+        sql_helper.get_catalog(refresh=refresh_catalog)
+        tables_to_verify = list(tables) or sql_helper.get_filtered_table_names(IGNORED_TABLES)
+        mismatches = sql_helper.verify_data(
+            tables_to_verify=tables_to_verify,
+            target=local_sql_helper(),
+            method=method,
+            chunk_rows=chunk_rows,
+            source_workers=source_workers,
+            target_workers=target_workers,
+            pause_seconds=pause,
+        )
+    if mismatches:
+        raise click.ClickException(f"{len(mismatches)} tables or ranges differ between the source and the target.")
+
+@cli.command()
+@click.option('--folder', 'folders', multiple=True, required=True,
+              help='Export folder to store, e.g. exported_sqls/20240820 (repeatable).')
+@click.option('--workers', default=4, type=int, help='Number of files chunked in parallel.')
+@click.option('--prune', is_flag=True, help='Remove each export folder once it is stored.')
+def store_export(folders, workers, prune):
+    """
+    Store export folders in the deduplicated chunk store under exported_sqls/.store.
+    Content shared with already stored exports is kept only once.
+    """
+    store = ChunkStore()
+    for folder in folders:
+        files = store_export_folder(folder, store, workers)
+        file_bytes = sum(entry["file_bytes"] for entry in files.values())
+        new_bytes = sum(entry["new_bytes"] for entry in files.values())
+        click.echo(
+            f"Stored {len(files)} files of {folder} ({GeneralHelper.format_bytes(file_bytes)} on disk), "
+            f"{GeneralHelper.format_bytes(new_bytes)} of new content."
+        )
+        if prune:
+            shutil.rmtree(folder)
+            click.echo(f"Removed {folder}")
+
+@cli.command()
+@click.option('--name', prompt='Stored export to restore', help='The stored export, e.g. 20240820.')
+@click.option('--target-folder', default=None, help='Where to rebuild it; defaults to exported_sqls/<name>.')
+def restore_export(name, target_folder):
+    """Rebuild a stored export's files from the chunk store."""
+    target_folder = target_folder or os.path.join("exported_sqls", name)
+    count = ChunkStore().restore_export(name, target_folder)
+    click.echo(f"Restored {count} files into {target_folder}")
+
+@cli.command()
+@click.option('--drop', multiple=True, help='Stored export to forget before collecting (repeatable).')
+@click.option('--keep', default=None, type=int, help='Forget all but the newest N stored exports.')
+def store_gc(drop, keep):
+    """Delete the chunks no stored export refers to anymore."""
+    store = ChunkStore()
+    names = store.export_names()
+    dropped = set(drop)
+    if keep is not None:
+        dropped |= set(names[:max(len(names) - keep, 0)])
+    for name in sorted(dropped):
+        store.drop_export(name)
+        click.echo(f"Dropped stored export {name}")
+    deleted, freed = store.collect_garbage()
+    click.echo(f"Deleted {deleted} unreferenced chunks, freed {GeneralHelper.format_bytes(freed)}.")
+
+@cli.command()
+def store_report():
+    """Report the stored exports and the space the chunk store saves."""
+    store = ChunkStore()
+    file_bytes, content_bytes = 0, 0
+    for name in store.export_names():
+        files = store.load_recipe(name)["files"]
+        export_file_bytes = sum(entry["file_bytes"] for entry in files.values())
+        file_bytes += export_file_bytes
+        content_bytes += sum(entry["size"] for entry in files.values())
+        click.echo(f"{name}: {len(files)} files, {GeneralHelper.format_bytes(export_file_bytes)} as exported")
+    stored_bytes = store.stored_bytes()
+    saved = 1 - stored_bytes / file_bytes if file_bytes else 0
+    click.echo(
+        f"Exports: {GeneralHelper.format_bytes(file_bytes)} as exported "
+        f"({GeneralHelper.format_bytes(content_bytes)} uncompressed), "
+        f"store: {GeneralHelper.format_bytes(stored_bytes)}, {saved:.1%} saved."
+    )
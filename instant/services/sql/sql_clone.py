@@ -0,0 +1,104 @@
+import os
+import subprocess
+from contextlib import nullcontext
+from sql_compression import compression_for, open_output
+from sql_concurrency import worker_slot
+from sql_planner import DumpPlanner
+from sql_state import run_with_retries
+from sql_stream import ProgressReader, StreamProgress, TailReader, TeeReader, feed_process
+from sql_tab import is_triggers_file
+
+# Views are cloned last, once every table they may select from exists
+VIEWS_FILE = "{timestamp_folder}.views{extension}"
+
+
+def clone_phases(dump_files: list) -> list[list]:
+    """
+    Order planned files for cloning, each phase largest first.
+
+    Split tables follow DumpPlanner.import_phases, so their rows stream once the first part
+    has created the table; the views file and the split tables' triggers come last.
+    """
+    by_name = {dump_file.file_name: dump_file for dump_file in dump_files}
+    last = [
+        dump_file for dump_file in dump_files
+        if ".views." in dump_file.file_name or is_triggers_file(dump_file.file_name)
+    ]
+    tables = [name for name in by_name if by_name[name] not in last]
+    phases = [[by_name[name] for name in phase] for phase in DumpPlanner.import_phases(tables)] + [last]
+    return [sorted(phase, key=lambda dump_file: -dump_file.estimated_bytes) for phase in phases if phase]
+
+
+def stream_dump(mysqldump_command, mysql_command, progress: StreamProgress = None, archive_path: str = None,
+                session=None) -> int:
+    """
+    Pipe mysqldump's output straight into the mysql client, optionally keeping an archive copy.
+
+    Data only passes through OS pipes and one fixed-size chunk at a time, so memory stays
+    bounded however large the table is. The archive copy is compressed on the fly according
+    to its file name.
+
+    Args:
+        mysqldump_command (list): The mysqldump command reading the source.
+        mysql_command (list): The mysql client command writing the target.
+        progress (StreamProgress): Optional progress on the bytes streamed.
+        archive_path (str): Optional path of the archive copy.
+        session (FastLoadSession): Optional session tuning wrapped around the stream.
+
+    Returns:
+        int: The number of bytes streamed.
+
+    Raises:
+        subprocess.CalledProcessError: If mysqldump, the client or the archive compressor fails.
+    """
+    dump_process = subprocess.Popen(mysqldump_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    dump_stderr = TailReader(dump_process.stderr)
+    dump_stderr.start()
+    progress = progress or StreamProgress("clone", 0)
+    try:
+        archive_context = open_output(archive_path, compression_for(archive_path)) if archive_path else nullcontext()
+        with archive_context as archive:
+            source = ProgressReader(dump_process.stdout, progress)
+            if archive is not None:
+                source = TeeReader(source, archive)
+            if session is None:
+                feed_process(mysql_command, source)
+            else:
+                session.verify(feed_process(mysql_command, source, session.prologue(), session.epilogue()))
+    finally:
+        dump_process.stdout.close()  # If the client or the archive failed first, mysqldump stops on the closed pipe
+        dump_process.wait()
+
+    if dump_process.returncode != 0:
+        raise subprocess.CalledProcessError(dump_process.returncode, mysqldump_command, stderr=dump_stderr.text)
+    return progress.bytes_done
+
+
+def clone_file(
+    mysqldump_command, mysql_command, dump_file, archive_folder, shared_state, retries=3, session=None, slots=None
+):
+    """
+    Clone one planned table, key range or the views from the source into the target.
+
+    Args:
+        mysqldump_command (list): The mysqldump command for the file's tables.
+        mysql_command (list): The mysql client command for the target.
+        dump_file (DumpFile): The planned file, tracked in shared_state by its name.
+        archive_folder (str): Where to keep a copy of the stream, or None.
+        shared_state: The run's Manager dict recording each file's status.
+        retries (int): How many times a failed clone is retried, with exponential backoff.
+        session (FastLoadSession): Optional bulk-load session tuning.
+        slots: The adaptive run's concurrency semaphore, or None.
+    """
+    archive_path = os.path.join(archive_folder, dump_file.file_name) if archive_folder else None
+
+    def clone():
+        print(f"Cloning {dump_file.file_name}...")
+        progress = StreamProgress(dump_file.file_name, dump_file.estimated_bytes)
+        streamed_bytes = stream_dump(mysqldump_command, mysql_command, progress, archive_path, session)
+        progress.report()
+        print(f"Clone completed for {dump_file.file_name}")
+        return streamed_bytes
+
+    with worker_slot(slots):
+        run_with_retries(clone, shared_state, dump_file.file_name, retries)
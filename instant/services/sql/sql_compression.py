@@ -0,0 +1,194 @@
+import signal
+import subprocess
+import threading
+from contextlib import contextmanager
+from sql_stream import ProgressReader, TailReader, pump
+from sql_throttle import throttled
+
+# Streaming compressors, run as external processes so dumps never hit the disk uncompressed
+COMPRESSION_FORMATS = {
+    "gzip": {
+        "suffix": ".gz",
+        "extension": ".sql.gz",
+        "compress": ["gzip", "-c"],
+        "decompress": ["gzip", "-dc"],
+    },
+    "zstd": {
+        "suffix": ".zst",
+        "extension": ".sql.zst",
+        "compress": ["zstd", "-q", "-c", "-T0"],
+        "decompress": ["zstd", "-q", "-dc"],
+    },
+}
+DUMP_EXTENSIONS = (".sql",) + tuple(fmt["extension"] for fmt in COMPRESSION_FORMATS.values())
+
+
+def dump_extension(compress=None) -> str:
+    """Return the dump file extension for the given compression format (None for plain SQL)."""
+    return COMPRESSION_FORMATS[compress]["extension"] if compress else ".sql"
+
+
+def is_dump_file(file_name: str) -> bool:
+    """Check whether a file is a plain or compressed SQL dump."""
+    return file_name.endswith(DUMP_EXTENSIONS)
+
+
+def compression_for(file_name: str):
+    """Return the compression format of a dump file, or None if it is not compressed."""
+    for name, fmt in COMPRESSION_FORMATS.items():
+        if file_name.endswith(fmt["suffix"]):
+            return name
+    return None
+
+
+def run_pipeline(commands, stdin=None, stdout=None):
+    """
+    Run commands connected stdout-to-stdin, like a shell pipeline.
+
+    Args:
+        commands (list): The commands to chain, each a list of arguments.
+        stdin: File object fed to the first command.
+        stdout: File object receiving the output of the last command.
+
+    Raises:
+        subprocess.CalledProcessError: If any command fails, with the tail of that command's stderr.
+    """
+    processes = []
+    stderr_readers = []
+    try:
+        previous_stdout = stdin
+        for index, command in enumerate(commands):
+            is_last = index == len(commands) - 1
+            process = subprocess.Popen(
+                command,
+                stdin=previous_stdout,
+                stdout=stdout if is_last else subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            if processes:
+                processes[-1].stdout.close()  # Let the upstream process see SIGPIPE if this one exits
+            processes.append(process)
+            stderr_reader = TailReader(process.stderr)
+            stderr_reader.start()
+            stderr_readers.append(stderr_reader)
+            previous_stdout = process.stdout
+
+        for process in processes:
+            process.wait()
+
+        # Report the process that actually failed rather than the ones killed by a broken pipe
+        failed = [p for p in processes if p.returncode != 0]
+        if failed:
+            culprit = next((p for p in failed if p.returncode != -signal.SIGPIPE), failed[0])
+            stderr = stderr_readers[processes.index(culprit)].text
+            raise subprocess.CalledProcessError(culprit.returncode, culprit.args, stderr=stderr)
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+
+def run_dump_command(mysqldump_command, dump_file, compress=None, throttle=None):
+    """
+    Run mysqldump, streaming its output through the compressor into dump_file when compress is set.
+
+    With a throttle, mysqldump's output is read here and written at the throttle's pace; a
+    paused or capped worker stops reading, which in turn holds back mysqldump and the source.
+    """
+    if throttle is not None:
+        process = subprocess.Popen(mysqldump_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stderr_reader = TailReader(process.stderr)
+        stderr_reader.start()
+        try:
+            with open_output(dump_file, compress, throttle) as output:
+                pump(process.stdout, output, close=False)
+        finally:
+            process.stdout.close()  # mysqldump exits on SIGPIPE if the output failed
+            process.wait()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr_reader.text)
+        return
+
+    if not compress:
+        subprocess.run(
+            [*mysqldump_command, f"--result-file={dump_file}"], check=True, capture_output=True, text=True
+        )
+        return
+
+    with open(dump_file, "wb") as f:
+        run_pipeline([mysqldump_command, COMPRESSION_FORMATS[compress]["compress"]], stdout=f)
+
+
+@contextmanager
+def open_output(path, compress=None, throttle=None):
+    """
+    Open a file for writing, through the compressor process when compress is set, at the
+    throttle's pace when there is one.
+
+    Yields:
+        A binary file object to write the uncompressed data to.
+
+    Raises:
+        subprocess.CalledProcessError: If the compressor fails, with the tail of its stderr.
+    """
+    with open(path, "wb") as f:
+        if not compress:
+            with throttled(f, throttle) as output:
+                yield output
+            return
+
+        process = subprocess.Popen(
+            COMPRESSION_FORMATS[compress]["compress"], stdin=subprocess.PIPE, stdout=f, stderr=subprocess.PIPE
+        )
+        stderr_reader = TailReader(process.stderr)
+        stderr_reader.start()
+        try:
+            with throttled(process.stdin, throttle) as output:
+                yield output
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            process.wait()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr_reader.text)
+
+
+@contextmanager
+def open_dump(dump_file_path, progress=None):
+    """
+    Open a plain or compressed dump as a binary stream of SQL.
+
+    Compressed dumps are decompressed on the fly by the format's decompressor process.
+    Progress is reported on the bytes of the file itself, so percentages are of the file on disk.
+
+    Yields:
+        A binary file object with the decompressed SQL.
+    """
+    compress = compression_for(dump_file_path)
+    with open(dump_file_path, "rb") as raw:
+        reader = ProgressReader(raw, progress) if progress else raw
+        if not compress:
+            yield reader
+            return
+
+        process = subprocess.Popen(
+            COMPRESSION_FORMATS[compress]["decompress"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        stderr_reader = TailReader(process.stderr)
+        stderr_reader.start()
+        feeder = threading.Thread(target=pump, args=(reader, process.stdin), daemon=True)
+        feeder.start()
+        try:
+            yield process.stdout
+        finally:
+            process.stdout.close()  # Stops the decompressor if the consumer gave up early
+            process.wait()
+            feeder.join()
+        if process.returncode not in (0, -signal.SIGPIPE):
+            raise subprocess.CalledProcessError(process.returncode, process.args, stderr=stderr_reader.text)
@@ -0,0 +1,183 @@
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from instant.utils.general_helper import GeneralHelper
+
+HISTORY_FILE = os.path.join("exported_sqls", "concurrency_history.json")
+
+
+class ConcurrencyController:
+    """
+    Hill-climbing control of how many units a pool works on at once.
+
+    The pool is started with `max_workers` processes, but every unit first takes a slot from a
+    shared semaphore. The controller keeps the slots above the current concurrency to itself,
+    handing one out while aggregate throughput keeps improving and taking one back once it
+    plateaus or drops, or when the source reports too many running threads. Slots taken back
+    for the source's load are handed out again, one per window, once a cool-down has passed
+    with the load back under the limit, up to the best concurrency measured.
+    """
+    def __init__(self, slots, max_workers: int, start_workers: int = 2, probe=None,
+                 threads_running_limit: int = None, window_seconds: float = 20, min_gain: float = 0.05,
+                 cooldown_seconds: float = 60):
+        """
+        Args:
+            slots: A Manager Semaphore created with max_workers permits.
+            max_workers (int): The pool size, the most units ever processed at once.
+            start_workers (int): The concurrency to start from.
+            probe: Optional callable returning the source's Threads_running.
+            threads_running_limit (int): Back off while Threads_running is above this.
+            window_seconds (float): How long throughput is measured before each decision.
+            min_gain (float): The relative throughput change that counts as better or worse.
+            cooldown_seconds (float): How long after a back-off for the source's load workers are not added back.
+        """
+        self.slots = slots
+        self.max_workers = max_workers
+        self.workers = max(1, min(start_workers, max_workers))
+        self.probe = probe
+        self.threads_running_limit = threads_running_limit
+        self.window_seconds = window_seconds
+        self.min_gain = min_gain
+        self.cooldown_seconds = cooldown_seconds
+        self.cooldown_until = 0.0
+        self.pending_shrinks = 0
+        self.best_throughput = 0.0
+        self.best_workers = self.workers
+        self.settled = False
+        self.window_start = None
+        self.window_bytes = 0
+
+    def start(self):
+        """Reserve the slots above the starting concurrency."""
+        for _ in range(self.max_workers - self.workers):
+            self.slots.acquire()
+        print(f"Adaptive concurrency: starting with {self.workers} of up to {self.max_workers} workers.")
+
+    def observe(self, done_bytes: int):
+        """Take a throughput sample; called by RunState.track with the bytes finished so far."""
+        now = time.time()
+        self.take_back_slots()
+        if self.window_start is None:
+            self.window_start, self.window_bytes = now, done_bytes
+            return
+        elapsed = now - self.window_start
+        if elapsed < self.window_seconds:
+            return
+
+        threads_running = self.probe() if self.probe else None
+        if self.threads_running_limit and threads_running is not None and threads_running > self.threads_running_limit:
+            self.shrink(f"source Threads_running is {threads_running}")
+            self.cooldown_until = now + self.cooldown_seconds
+            self.window_start, self.window_bytes = now, done_bytes
+            return
+        if self.workers < self.best_workers and now >= self.cooldown_until:
+            # The load that made the run back off has passed; climb back to the best concurrency measured
+            self.grow("source load is back under the limit")
+            self.window_start, self.window_bytes = now, done_bytes
+            return
+        if done_bytes == self.window_bytes:
+            return  # Large units finish rarely; keep measuring until one does
+
+        throughput = (done_bytes - self.window_bytes) / elapsed
+        self.window_start, self.window_bytes = now, done_bytes
+        if throughput > self.best_throughput * (1 + self.min_gain):
+            self.best_throughput, self.best_workers = throughput, self.workers
+            if not self.settled:
+                self.grow(f"throughput improved to {GeneralHelper.format_bytes(throughput)}/s")
+        elif throughput < self.best_throughput * (1 - self.min_gain) and self.workers > self.best_workers:
+            self.settled = True
+            self.shrink(f"throughput fell to {GeneralHelper.format_bytes(throughput)}/s")
+        else:
+            self.settled = True
+
+    def grow(self, reason: str):
+        if self.workers >= self.max_workers:
+            return
+        if self.pending_shrinks:
+            self.pending_shrinks -= 1
+        else:
+            self.slots.release()
+        self.workers += 1
+        print(f"Adaptive concurrency: {self.workers} workers ({reason}).")
+
+    def shrink(self, reason: str):
+        if self.workers <= 1:
+            return
+        self.workers -= 1
+        self.pending_shrinks += 1
+        self.take_back_slots()
+        print(f"Adaptive concurrency: {self.workers} workers ({reason}).")
+
+    def take_back_slots(self):
+        """Reclaim the slots of a shrink as the units holding them finish."""
+        while self.pending_shrinks and self.slots.acquire(False):
+            self.pending_shrinks -= 1
+
+    def finish(self, target: str, mode: str):
+        """Log the concurrency the run settled on, so the next run for the target starts there."""
+        chosen = self.best_workers if self.best_throughput else self.workers
+        print(
+            f"Adaptive concurrency settled on {chosen} workers "
+            f"({GeneralHelper.format_bytes(self.best_throughput)}/s at best)."
+        )
+        history = load_history()
+        history.append({
+            "target": target,
+            "mode": mode,
+            "workers": chosen,
+            "throughput": self.best_throughput,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+        with open(HISTORY_FILE, "w") as f:
+            json.dump(history, f, indent=2)
+
+
+class ThreadsRunningProbe:
+    """Read a server's Threads_running over one kept-open connection."""
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self):
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_running';")
+            row = cursor.fetchone()
+            cursor.close()
+            return int(row[1]) if row else None
+        except Exception:
+            return None  # The probe only informs the controller; a failed read must not stop the run
+
+    def close(self):
+        self.connection.close()
+
+
+def load_history() -> list:
+    if not os.path.exists(HISTORY_FILE):
+        return []
+    with open(HISTORY_FILE) as f:
+        return json.load(f)
+
+
+def start_workers_for(target: str, mode: str, default: int = 2) -> int:
+    """Return the concurrency the last adaptive run against the target settled on."""
+    for run in reversed(load_history()):
+        if run["target"] == target and run["mode"] == mode:
+            return run["workers"]
+    return default
+
+
+def create_controller(manager, max_workers: int, target: str, mode: str, probe=None, threads_running_limit=None):
+    """Create and start a controller whose slots the pool's workers share through the manager."""
+    controller = ConcurrencyController(
+        manager.Semaphore(max_workers), max_workers, start_workers_for(target, mode), probe, threads_running_limit
+    )
+    controller.start()
+    return controller
+
+
+def worker_slot(slots):
+    """Context manager holding one concurrency slot for a unit, or nothing outside adaptive runs."""
+    return slots if slots is not None else nullcontext()
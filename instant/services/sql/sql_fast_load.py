@@ -0,0 +1,103 @@
+import json
+import os
+from datetime import datetime
+from instant.utils.general_helper import GeneralHelper
+
+HISTORY_FILE = os.path.join("exported_sqls", "import_history.json")
+VERIFY_MARKER = "instant_fast_load"
+
+
+class FastLoadSession:
+    """
+    Session tuning wrapped around each dump file for bulk loading.
+
+    Foreign-key and unique checks are disabled and autocommit is turned off, so rows are
+    committed once per file (mysqldump's DDL and UNLOCK TABLES still commit implicitly).
+    The settings are restored at the end of the file and read back so the import fails
+    loudly if the session was left tuned.
+    """
+    def __init__(self, skip_binlog: bool = False):
+        self.skip_binlog = skip_binlog
+
+    def prologue(self) -> bytes:
+        statements = [
+            "SET SESSION foreign_key_checks = 0;",
+            "SET SESSION unique_checks = 0;",
+            "SET SESSION autocommit = 0;",
+        ]
+        if self.skip_binlog:
+            statements.append("SET SESSION sql_log_bin = 0;")
+        return ("\n".join(statements) + "\n").encode()
+
+    def epilogue(self) -> bytes:
+        statements = [
+            "",
+            "COMMIT;",
+            "SET SESSION autocommit = 1;",
+            "SET SESSION unique_checks = 1;",
+            "SET SESSION foreign_key_checks = 1;",
+        ]
+        if self.skip_binlog:
+            statements.append("SET SESSION sql_log_bin = 1;")
+        statements.append(
+            f"SELECT '{VERIFY_MARKER}', @@session.foreign_key_checks, @@session.unique_checks, "
+            "@@session.autocommit, @@session.sql_log_bin;"
+        )
+        return ("\n".join(statements) + "\n").encode()
+
+    def verify(self, output: str):
+        """
+        Check the settings read back by the epilogue.
+
+        Raises:
+            RuntimeError: If the settings were not restored.
+        """
+        for line in reversed(output.splitlines()):
+            fields = line.split("\t")
+            if fields[0] == VERIFY_MARKER:
+                expected = ["1", "1", "1"] + (["1"] if self.skip_binlog else [])
+                if fields[1:1 + len(expected)] != expected:
+                    raise RuntimeError(f"Session settings not restored after fast load: {line}")
+                return
+        raise RuntimeError("Could not verify the session settings after fast load.")
+
+
+def record_import_throughput(target: str, fast_load: bool, imported_bytes: int, seconds: float):
+    """
+    Record an import run's throughput and, for fast loads, report the speedup over the
+    latest normal import into the same target.
+    """
+    history = []
+    if os.path.exists(HISTORY_FILE):
+        with open(HISTORY_FILE) as f:
+            history = json.load(f)
+
+    throughput = imported_bytes / seconds if seconds > 0 else 0
+    mode = "fast-load" if fast_load else "normal"
+    print(f"Import throughput ({mode}): {GeneralHelper.format_bytes(throughput)}/s")
+
+    if fast_load:
+        baseline = next(
+            (run for run in reversed(history) if run["target"] == target and run["mode"] == "normal"), None
+        )
+        if baseline and baseline["throughput"] > 0:
+            print(
+                f"Speedup over the last normal import ({baseline['created_at']}): "
+                f"{throughput / baseline['throughput']:.2f}x "
+                f"({GeneralHelper.format_bytes(baseline['throughput'])}/s before)"
+            )
+        else:
+            print("No normal import recorded for this target yet; run once without --fast-load for a baseline.")
+
+    if imported_bytes:
+        history.append({
+            "target": target,
+            "mode": mode,
+            "bytes": imported_bytes,
+            "seconds": round(seconds, 2),
+            "throughput": throughput,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+        with open(HISTORY_FILE, "w") as f:
+            json.dump(history, f, indent=2)
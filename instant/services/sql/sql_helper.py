@@ -1,89 +1,168 @@
 import os
-from sshtunnel import SSHTunnelForwarder
+from contextlib import contextmanager
 from datetime import datetime
-import random
-import subprocess
 from multiprocessing import Manager, Pool
-import pymysql
 import time
+from sql_planner import DumpPlanner
+from sql_tunnel import TunnelManager, connect_through_tunnel
+from sql_manifest import DumpManifest
+from sql_metrics import RunMetrics
+from sql_fast_load import FastLoadSession, record_import_throughput
+from sql_compression import compression_for, dump_extension, run_dump_command
+from sql_native_dump import SnapshotLock, run_native_dump
+from sql_clone import VIEWS_FILE, clone_file, clone_phases
+from sql_catalog import CATALOG_TTL_SECONDS, SchemaCatalog
+from sql_concurrency import ThreadsRunningProbe, create_controller, worker_slot
+from sql_throttle import create_throttle
+from sql_verify import DEFAULT_CHUNK_ROWS, checksum_chunks, compare_checksums, range_chunks
+from sql_subset import SCHEMA_ONLY, subset_of, subset_predicates
+from sql_indexes import build_table_indexes, plan_index_builds, record_deferred_indexes
+from sql_splitter import plan_import, plan_stored_import, remove_unit_files, run_import_unit
+from sql_store import ChunkStore
+from sql_tab import (
+    SCHEMA_FILE, SCHEMA_OPTIONS, TRIGGERS_FILE, TRIGGERS_OPTIONS, is_tab_file, is_triggers_file, run_tab_dump_file,
+    tab_extension,
+)
+from sql_state import (
+    CLONE_STATE_FILE, DONE, DUMP_STATE_FILE, IMPORT_STATE_FILE, RunState, prepare_import_state, ready_for_import,
+    run_with_retries,
+)
+from sql.models.models import DumpFile, DumpUnit, TableInfo
+
+# Options for every part of a split table; its triggers are dumped on their own and created after all parts loaded
+PART_OPTIONS = ["--skip-triggers"]
+# Options for the row-only parts of a split table; the first part already carries the table definition
+PART_DATA_OPTIONS = [
+    "--no-create-info",
+    "--skip-triggers",
+    "--skip-add-locks",  # Let the parts of one table load concurrently
+    "--insert-ignore",  # A retried part may find some of its rows already loaded
+]
+
+
+def build_mysqldump_command(local_port, rds_db, tables, extra_options=()):
+    """Build the mysqldump command for the given tables, connecting through the parent's shared tunnel."""
+    return [
+        "/usr/local/bin/mysqldump",
+        "--defaults-file=" + os.path.join(os.path.dirname(__file__), '.db.cnf'),  # Update path here
+        "--set-gtid-purged=OFF",  # Disable GTID purging
+        "--single-transaction",  # Ensure a consistent dump
+        rds_db,
+        *tables,  # Unpack the table list directly into the command
+        "--no-tablespaces",
+        "--add-drop-trigger",
+        "--host=127.0.0.1",
+        f"--port={local_port}",
+        *extra_options,
+    ]
+
+
+def dump_options(dump_file):
+    """
+    Return the extra mysqldump options for a planned file: the --where of a split table's
+    key range or of a subset table, which are always planned one per file, or the options of
+    the triggers file.
+    """
+    if is_triggers_file(dump_file.file_name):
+        return TRIGGERS_OPTIONS
+    unit = dump_file.units[0]
+    if unit.where is None:
+        return []
+    if not unit.is_part:
+        return [f"--where={unit.where}"]
+    return [f"--where={unit.where}"] + (PART_DATA_OPTIONS if unit.part > 0 else PART_OPTIONS)
+
+
+def split_triggers_file(units, timestamp_folder, extension):
+    """
+    Plan the file holding the triggers of the split tables among the units, or None if there are none.
+
+    The parts of a split table are dumped without triggers: created with the first part, they
+    would fire on every row of the other parts. The import and clone create them last instead.
+    """
+    tables = sorted({unit.name for unit in units if unit.is_part and unit.part > 0})
+    if not tables:
+        return None
+    return DumpFile(
+        TRIGGERS_FILE.format(timestamp_folder=timestamp_folder, extension=extension),
+        [DumpUnit(TableInfo(table)) for table in tables],
+    )
+
 
 def run_dump(
-    chunk,
+    dump_files,
     process_num,
-    ssh_host,
-    ssh_port,
-    ssh_user,
-    ssh_pkey,
-    rds_host,
-    rds_port,
+    local_port,
+    rds_user,
+    rds_password,
     rds_db,
     timestamp_folder,
+    shared_state,
+    retries=3,
+    slots=None,
+    throttle=None,
 ):
-    dump_file = os.path.join("exported_sqls", timestamp_folder, f"{timestamp_folder}_{process_num}.sql")
-    # Set up the SSH tunnel
-    with SSHTunnelForwarder(
-        (ssh_host, ssh_port),
-        ssh_username=ssh_user,
-        ssh_pkey=ssh_pkey,
-        remote_bind_address=(rds_host, rds_port),
-        local_bind_address=("127.0.0.1", random.randint(57000, 57999)),  # Local port for the tunnel
-    ) as tunnel:
-        print(f"Tunnel established on port {tunnel.local_bind_port}")
-
-        # Define the mysqldump command
-        mysqldump_command = [
-            "/usr/local/bin/mysqldump",
-            "--defaults-file=" + os.path.join(os.path.dirname(__file__), '.db.cnf'),  # Update path here
-            "--set-gtid-purged=OFF",  # Disable GTID purging
-            "--single-transaction",  # Ensure a consistent dump
-            rds_db,
-            *chunk,  # Unpack the chunk list directly into the command
-            f"--result-file={dump_file}",  # Use the correct path for the result file
-            "--no-tablespaces",
-            "--add-drop-trigger",
-            "--host=127.0.0.1",
-            f"--port={tunnel.local_bind_port}",
-        ]
+    """
+    Dump one worker's share of the plan, one mysqldump per planned file.
 
-        # Run the mysqldump command
-        try:
-            subprocess.run(mysqldump_command, check=True, capture_output=True, text=True)
-            print(f"Dump completed successfully for process {process_num}")
-        except subprocess.CalledProcessError as e:
-            print(f"Error occurred in process {process_num}: {e.stderr}")
+    Each file's progress is recorded in shared_state; failed files are retried with backoff.
+    In adaptive runs each file first takes a slot from the `slots` semaphore.
+    The compression and data format follow from the planned file name, so resumed runs keep them:
+    delimited-text files are streamed row by row over a pymysql connection instead of mysqldump.
+    With a throttle, files are written at its pace and not started while it is paused.
+    """
+    export_folder = os.path.join("exported_sqls", timestamp_folder)
 
+    for dump_file in dump_files:
+        mysqldump_command = build_mysqldump_command(local_port, rds_db, dump_file.tables, dump_options(dump_file))
+        dump_file_path = os.path.join(export_folder, dump_file.file_name)
 
-def import_single_file(
-    sql_file, ssh_host, ssh_port, ssh_user, ssh_pkey, rds_host, rds_port, rds_db, sql_folder
-):
-    dump_file_path = os.path.join(sql_folder, sql_file)
-    with SSHTunnelForwarder(
-        (ssh_host, ssh_port),
-        ssh_username=ssh_user,
-        ssh_pkey=ssh_pkey,
-        remote_bind_address=(rds_host, rds_port),
-    ) as tunnel:
-        # Define the mysql command for importing
-        mysql_command = [
-            "/usr/local/bin/mysql",
-            "--defaults-file=" + os.path.join(os.path.dirname(__file__), '.db.cnf'),  # Update path here
-            f"--database={rds_db}",
-            "--host=127.0.0.1",
-            f"--port={tunnel.local_bind_port}",
-        ]
+        # Run the mysqldump command, writing to the dump file directly or through the compressor
+        def dump():
+            if throttle is not None:
+                throttle.record_wait(throttle.wait_while_paused())
+            if is_tab_file(dump_file.file_name):
+                run_tab_dump_file(local_port, rds_user, rds_password, rds_db, dump_file, dump_file_path, throttle)
+            else:
+                run_dump_command(mysqldump_command, dump_file_path, compression_for(dump_file.file_name), throttle)
+            print(f"Dump completed successfully for {dump_file.file_name} (process {process_num})")
+            return os.path.getsize(dump_file_path)
 
-        # Run the mysql command
-        print(f"Importing data from {sql_file}...")
-        with open(dump_file_path, "r") as f:
-            subprocess.run(
-                mysql_command, stdin=f, check=True, capture_output=True, text=True
-            )
+        with worker_slot(slots):
+            run_with_retries(dump, shared_state, dump_file.file_name, retries)
+
+
+def build_mysql_command(local_port, rds_db):
+    """Build the mysql client command connecting through one of the parent's shared tunnels."""
+    return [
+        "/usr/local/bin/mysql",
+        "--defaults-file=" + os.path.join(os.path.dirname(__file__), '.db.cnf'),  # Update path here
+        f"--database={rds_db}",
+        "--host=127.0.0.1",
+        f"--port={local_port}",
+    ]
 
-        print(f"Data import completed for {sql_file}")
+
+def import_single_unit(unit, local_port, rds_db, shared_state, retries=3, session=None, slots=None,
+                       defer_indexes=False):
+    # Define the mysql command for importing, connecting through the parent's shared tunnel
+    mysql_command = build_mysql_command(local_port, rds_db)
+
+    # Run the mysql command, decompressing compressed dumps on the fly
+    def import_unit():
+        print(f"Importing data from {unit.key}...")
+        deferred_indexes = {} if defer_indexes else None
+        imported_bytes = run_import_unit(mysql_command, unit, session, deferred_indexes)
+        record_deferred_indexes(shared_state, unit.key, deferred_indexes)
+        print(f"Data import completed for {unit.key}")
+        return imported_bytes
+
+    with worker_slot(slots):
+        run_with_retries(import_unit, shared_state, unit.key, retries)
 
 
 class SqlHelper:
-    def __init__(self, ssh_host, ssh_port, ssh_user, ssh_pkey, rds_host, rds_port, rds_user, rds_password, rds_db):
+    def __init__(self, ssh_host, ssh_port, ssh_user, ssh_pkey, rds_host, rds_port, rds_user, rds_password, rds_db, tunnel_count=1):
         os.makedirs("exported_sqls", exist_ok=True)  # Create exported_sqls directory if it does not exist
         self.timestamp_folder = datetime.now().strftime("%Y%m%d")
         self.dump_file_base = f"./exported_sqls/{self.timestamp_folder}/"
@@ -99,76 +178,653 @@ class SqlHelper:
         self.rds_user = rds_user
         self.rds_password = rds_password
         self.rds_db = rds_db
+        self.tunnel_count = tunnel_count
+        self.tunnel_manager = None
+        self.catalog_ttl = CATALOG_TTL_SECONDS
+        self.catalog = None
 
-    def dump_data(self, tables_to_dump):
-        start_time = time.time()  # Start the timer
-
-        # Split tables into chunks of 20
-        chunk_size = 20
-        if len(tables_to_dump) < chunk_size:
-            chunks = [tables_to_dump]  # Use the entire list as a single chunk
-        else:
-            chunks = [
-                tables_to_dump[i : i + chunk_size] for i in range(0, len(tables_to_dump), chunk_size)
-            ]
-
-        # Create a manager to handle shared state
-        with Manager() as manager:
-            manager.list()  # To track completed processes
-
-            # Create a pool with the appropriate number of processes
-            num_processes = min(5, len(chunks))  # Limit to 5 or the number of chunks
-            with Pool(processes=num_processes) as pool:
-                pool.starmap(
-                    run_dump,
-                    [
-                        (
-                            chunk,
-                            i,
-                            self.ssh_host,
-                            self.ssh_port,
-                            self.ssh_user,
-                            self.ssh_pkey,
-                            self.rds_host,
-                            self.rds_port,
-                            self.rds_db,
-                            self.timestamp_folder,
+    @contextmanager
+    def open_tunnel(self):
+        """
+        Open the shared SSH tunnel(s) for a run, or reuse the ones already open.
+
+        Yields:
+            TunnelManager: The manager whose local ports the workers connect through.
+        """
+        if self.tunnel_manager is not None:
+            yield self.tunnel_manager
+            return
+
+        with TunnelManager(
+            self.ssh_host,
+            self.ssh_port,
+            self.ssh_user,
+            self.ssh_pkey,
+            self.rds_host,
+            self.rds_port,
+            tunnel_count=self.tunnel_count,
+        ) as tunnel_manager:
+            self.tunnel_manager = tunnel_manager
+            try:
+                yield tunnel_manager
+            finally:
+                self.tunnel_manager = None
+
+    def dump_data(
+        self, tables_to_dump, num_workers=5, dry_run=False, compress=None,
+        split_threshold_bytes=1024 ** 3, split_parts=None, incremental=False, resume=False, retries=3,
+        data_format="sql", engine="mysqldump", adaptive=False, threads_running_limit=None, subset=None,
+        subset_limit=None, trace=False, max_worker_rate=None, max_total_rate=None,
+        throttle_threads_running=None, throttle_replica_lag=None, checksum="quick",
+    ):
+        """
+        Dump the given tables, balancing them across workers by estimated size.
+
+        Args:
+            tables_to_dump (list): The table names to dump.
+            num_workers (int): The maximum number of parallel mysqldump processes.
+            dry_run (bool): Print the planned assignment without dumping anything.
+            compress (str): Stream the dumps through "gzip" or "zstd" instead of writing plain SQL.
+            split_threshold_bytes (int): Tables at least this large are dumped as parallel primary-key ranges.
+            split_parts (int): The number of ranges per split table, defaults to num_workers.
+            incremental (bool): Reuse the files of the previous export whose tables have not changed since.
+            resume (bool): Only redo the files of this export that did not finish in the previous attempt.
+            retries (int): How many times a failed file is retried, with exponential backoff.
+            data_format (str): "sql" for mysqldump files, or "tsv" for one delimited-text file per table
+                plus separate schema and triggers files, imported with LOAD DATA.
+            engine (str): "mysqldump", or "native" to write the SQL files over pymysql connections
+                that all read one consistent snapshot, without needing mysqldump installed.
+            adaptive (bool): Queue the files largest first and start with few workers, adding more
+                while throughput keeps improving, up to num_workers.
+            threads_running_limit (int): In adaptive runs, back off while the source's Threads_running is above this.
+            subset (dict): Seed table to its WHERE predicate, or None for all its rows. Only the seed rows
+                and the rows they reference through foreign keys are dumped; other tables are schema-only.
+            subset_limit (int): In subset mode, keep at most this many of the newest rows per seed table.
+            trace (bool): Also write the run as a Chrome trace-event file next to its JSON-lines events.
+            max_worker_rate (float): Cap each worker's output at this many bytes per second.
+            max_total_rate (float): Cap all workers' output together at this many bytes per second.
+            throttle_threads_running (int): Slow the workers while the source's Threads_running is above
+                this, and pause them above twice as many.
+            throttle_replica_lag (int): Likewise for the source's replica lag in seconds, when it is a replica.
+            checksum (str): How the manifest's change detection reads the tables, see get_table_stats.
+
+        Raises:
+            ValueError: When the native engine is combined with adaptive mode.
+        """
+        if engine == "native" and adaptive:
+            # The snapshot barrier waits for one task per worker, adaptive runs queue one per file
+            raise ValueError("The native engine opens every snapshot at once, it cannot be used in adaptive mode.")
+        start_time = time.time()  # Start the timer, tunnel setup included
+        extension = tab_extension(compress) if data_format == "tsv" else dump_extension(compress)
+        state = RunState.load(os.path.join(self.dump_file_base, DUMP_STATE_FILE), resume)
+        schema_tables = list(tables_to_dump)
+        metrics = RunMetrics(self.dump_file_base, "dump", trace)
+
+        with self.open_tunnel() as tunnel_manager:
+            metrics.tunnel_setup(tunnel_manager)
+            plan_start = time.time()
+            table_stats = None
+            manifest = DumpManifest(self.dump_file_base, self.rds_db)
+
+            if state.entries:
+                # Resume: re-plan only the files that did not finish, keeping their original names
+                pending_files = [DumpFile.from_dict(key, state.entries[key]) for key in state.unfinished()]
+                print(f"Resuming: {len(state.done())} files already done, {len(pending_files)} left.")
+                chunks = DumpPlanner.plan(pending_files, num_workers)
+                worker_files = chunks
+                if any(is_tab_file(key) for key in state.entries):
+                    data_format = "tsv"
+            else:
+                if data_format == "tsv":
+                    # Views only exist in the schema file
+                    views = set(self.get_view_names())
+                    tables_to_dump = [table for table in tables_to_dump if table not in views]
+                if incremental:
+                    table_stats = self.get_table_stats(schema_tables, checksum)
+                    tables_to_dump = self.reuse_unchanged_tables(tables_to_dump, table_stats, state, extension, dry_run)
+
+                # Plan the worker assignment from information_schema sizes, largest tables first
+                table_sizes = self.get_table_sizes(tables_to_dump)
+                if subset:
+                    # Each table's rows are picked by its own predicate, so every table gets its own file
+                    predicates = subset_predicates(self.get_catalog(), tables_to_dump, subset, subset_limit)
+                    units = [
+                        DumpUnit(
+                            table,
+                            estimated_bytes=0 if predicates.get(table.name) == SCHEMA_ONLY else None,
+                            where=predicates.get(table.name),
                         )
+                        for table in table_sizes
+                    ]
+                else:
+                    units = self.split_large_tables(table_sizes, split_threshold_bytes, split_parts or num_workers)
+                chunks = DumpPlanner.plan(units, num_workers)
+                if data_format == "tsv" or subset:
+                    worker_files = [
+                        DumpPlanner.table_files(chunk, self.timestamp_folder, extension) for chunk in chunks
+                    ]
+                else:
+                    worker_files = [
+                        DumpPlanner.dump_files(chunk, i, self.timestamp_folder, extension)
                         for i, chunk in enumerate(chunks, start=1)
-                    ],
-                )
+                    ]
+                    triggers_file = split_triggers_file(units, self.timestamp_folder, extension)
+                    if triggers_file is not None:
+                        worker_files[-1].append(triggers_file)  # Keeps one task per worker for the native engine
+
+            if chunks:
+                DumpPlanner.print_plan(chunks)
+            else:
+                print("No tables to dump.")
+            if dry_run:
+                return
+            if table_stats is None:
+                # Record per-table statistics in the export's manifest so the next run can skip unchanged
+                # tables; subset files hold partial tables and are never reused
+                partial = subset or subset_of(state.entries)
+                table_stats = {} if partial else self.get_table_stats(schema_tables, checksum)
+            metrics.span("plan", plan_start)
+
+            for files in worker_files:
+                for dump_file in files:
+                    state.register(dump_file.file_name, **dump_file.to_dict())
+            state.save()
+            dump_start = time.time()
+            if data_format == "tsv":
+                self.dump_tab_schema(schema_tables, state, tunnel_manager.port_for(0))
+
+            if adaptive:
+                # Queue single files largest first; the controller decides how many run at once
+                planned = [dump_file for files in worker_files for dump_file in files]
+                worker_files = [[dump_file] for dump_file in sorted(planned, key=lambda f: -f.estimated_bytes)]
+
+            if worker_files:
+                # Create a manager to share the per-file state with the workers
+                with Manager() as manager:
+                    shared_state = manager.dict(state.entries)
+                    target = f"{self.rds_host}:{self.rds_port}/{self.rds_db}"
+
+                    # Create a pool with the appropriate number of processes
+                    # The planner never returns more chunks than workers
+                    num_processes = min(len(worker_files), num_workers)
+                    controller = None
+                    if adaptive:
+                        probe = ThreadsRunningProbe(self.create_db_connection(tunnel_manager.port_for(0)))
+                        controller = create_controller(
+                            manager, num_processes, target, "dump", probe, threads_running_limit
+                        )
+                    throttle = monitor = None
+                    if max_worker_rate or max_total_rate or throttle_threads_running or throttle_replica_lag:
+                        # Watch the source over a side connection on the shared tunnel
+                        throttle, monitor = create_throttle(
+                            manager,
+                            self.create_db_connection(tunnel_manager.port_for(0)),
+                            max_worker_rate,
+                            max_total_rate,
+                            throttle_threads_running,
+                            throttle_replica_lag,
+                            metrics,
+                        )
+                    with Pool(processes=num_processes) as pool:
+                        if engine == "native":
+                            # Block writes while every worker opens its snapshot, so all files show one point in time
+                            snapshot_barrier = manager.Barrier(num_processes + 1)
+                            snapshot_lock = SnapshotLock(
+                                self.create_db_connection(tunnel_manager.port_for(0)),
+                                sorted({table for files in worker_files for f in files for table in f.tables}),
+                            )
+                            snapshot_lock.acquire()
+                            async_result = pool.starmap_async(
+                                run_native_dump,
+                                [
+                                    (
+                                        files,
+                                        i,
+                                        tunnel_manager.port_for(i),
+                                        self.rds_user,
+                                        self.rds_password,
+                                        self.rds_db,
+                                        self.timestamp_folder,
+                                        shared_state,
+                                        snapshot_barrier,
+                                        retries,
+                                        throttle,
+                                    )
+                                    for i, files in enumerate(worker_files, start=1)
+                                ],
+                                chunksize=1,  # One worker per process, or the barrier could not fill
+                            )
+                            snapshot_lock.hold_until_ready(snapshot_barrier)
+                            manifest.snapshot = snapshot_lock.binlog_position
+                        else:
+                            async_result = pool.starmap_async(
+                                run_dump,
+                                [
+                                    (
+                                        files,
+                                        i,
+                                        tunnel_manager.port_for(i),
+                                        self.rds_user,
+                                        self.rds_password,
+                                        self.rds_db,
+                                        self.timestamp_folder,
+                                        shared_state,
+                                        retries,
+                                        controller.slots if controller else None,
+                                        throttle,
+                                    )
+                                    for i, files in enumerate(worker_files, start=1)
+                                ],
+                                chunksize=1,
+                            )
+                        state.track(
+                            async_result, shared_state, controller=controller, metrics=metrics, monitor=monitor
+                        )
+                    if controller:
+                        controller.finish(target, "dump")
+                        controller.probe.close()
+                    if monitor:
+                        monitor.finish()
+            metrics.span("dump", dump_start)
+
+            for file_name in state.done():
+                manifest.add_file(file_name, state.entries[file_name]["tables"], table_stats)
+            manifest.subset = subset_of(state.entries)
+            manifest.save()
+            state.print_summary()
+            metrics.finish(state.entries)
 
         end_time = time.time()  # End the timer
         processing_time = end_time - start_time  # Calculate the processing time
         print(f"All dump processes completed in {processing_time:.2f} seconds.")
 
-    def import_data(
-        self, sql_folder
+    def clone_data(
+        self, tables_to_clone, target, num_workers=5, split_threshold_bytes=1024 ** 3, split_parts=None,
+        archive=False, compress=None, resume=False, retries=3, fast_load=False, adaptive=False,
+        threads_running_limit=None, trace=False,
     ):
-        """Import SQL files from a specified folder into the database using mysqldump."""
-        # Get all SQL files from the specified folder
-        sql_files = [f for f in os.listdir(sql_folder) if f.endswith(".sql")]
-
-        # Create a pool of 5 processes
-        with Pool(processes=5) as pool:
-            # Use pool to import all SQL files
-            pool.starmap(
-                import_single_file,
-                [
-                    (
-                        sql_file,
-                        self.ssh_host,
-                        self.ssh_port,
-                        self.ssh_user,
-                        self.ssh_pkey,
-                        self.rds_host,
-                        self.rds_port,
-                        self.rds_db,
-                        sql_folder,
+        """
+        Stream tables from the source straight into a local database, without dump files in between.
+
+        Each table, or primary-key range of a large table, is piped from mysqldump into the target's
+        mysql client, several at a time, so the import runs while the source is still being read.
+
+        Args:
+            tables_to_clone (list): The tables and views to clone.
+            target (SqlLocalHelper): The local database to clone into.
+            num_workers (int): The number of tables streamed concurrently.
+            split_threshold_bytes (int): Tables at least this large are streamed as parallel primary-key ranges.
+            split_parts (int): The number of ranges per split table, defaults to num_workers.
+            archive (bool): Also keep a copy of every stream in today's export folder, importable with import-data.
+            compress (str): Compress the archive copies with "gzip" or "zstd".
+            resume (bool): Only clone the files the previous attempt did not finish.
+            retries (int): How many times a failed file is retried, with exponential backoff.
+            fast_load (bool): Wrap each stream in a bulk-load tuned session.
+            adaptive (bool): Tune the number of concurrent streams to the measured throughput, up to num_workers.
+            threads_running_limit (int): In adaptive mode, back off while the source has more running threads.
+            trace (bool): Also write the run as a Chrome trace-event file next to its JSON-lines events.
+        """
+        start_time = time.time()  # Start the timer, tunnel setup included
+        extension = dump_extension(compress)
+        state = RunState.load(os.path.join(self.dump_file_base, CLONE_STATE_FILE), resume)
+        metrics = RunMetrics(self.dump_file_base, "clone", trace)
+        session = FastLoadSession() if fast_load else None
+        mysql_command = target.build_mysql_command()
+        archive_folder = self.dump_file_base if archive else None
+
+        with self.open_tunnel() as tunnel_manager:
+            metrics.tunnel_setup(tunnel_manager)
+            plan_start = time.time()
+            if state.entries:
+                dump_files = [DumpFile.from_dict(key, entry) for key, entry in state.entries.items()]
+                print(f"Resuming: {len(state.done())} of {len(dump_files)} files already cloned.")
+            else:
+                # Plan one stream per table or key range; views go last in a single file
+                views = set(self.get_view_names())
+                table_sizes = self.get_table_sizes([table for table in tables_to_clone if table not in views])
+                units = self.split_large_tables(table_sizes, split_threshold_bytes, split_parts or num_workers)
+                dump_files = DumpPlanner.table_files(units, self.timestamp_folder, extension)
+                triggers_file = split_triggers_file(units, self.timestamp_folder, extension)
+                if triggers_file is not None:
+                    dump_files.append(triggers_file)
+                view_names = [table for table in tables_to_clone if table in views]
+                if view_names:
+                    dump_files.append(DumpFile(
+                        VIEWS_FILE.format(timestamp_folder=self.timestamp_folder, extension=extension),
+                        [DumpUnit(TableInfo(view)) for view in view_names],
+                    ))
+                for dump_file in dump_files:
+                    state.register(dump_file.file_name, **dump_file.to_dict())
+
+            pending = set(prepare_import_state(state, [dump_file.file_name for dump_file in dump_files]))
+            print(f"Cloning {len(pending)} of {len(dump_files)} files into {target.rds_host}:{target.rds_port}.")
+            metrics.span("plan", plan_start)
+            clone_start = time.time()
+
+            target_name = f"{target.rds_host}:{target.rds_port}/{target.rds_db}"
+            with Manager() as manager, Pool(processes=num_workers) as pool:
+                shared_state = manager.dict(state.entries)
+                controller = None
+                if adaptive:
+                    probe = ThreadsRunningProbe(self.create_db_connection(tunnel_manager.port_for(0)))
+                    controller = create_controller(
+                        manager, num_workers, target_name, "clone", probe, threads_running_limit
                     )
-                    for sql_file in sql_files
-                ],
+                for phase in clone_phases([dump_file for dump_file in dump_files if dump_file.file_name in pending]):
+                    ready = set(ready_for_import(state, [dump_file.file_name for dump_file in phase]))
+                    state.track(
+                        pool.starmap_async(
+                            clone_file,
+                            [
+                                (
+                                    build_mysqldump_command(
+                                        tunnel_manager.port_for(i), self.rds_db, dump_file.tables,
+                                        dump_options(dump_file),
+                                    ),
+                                    mysql_command,
+                                    dump_file,
+                                    archive_folder,
+                                    shared_state,
+                                    retries,
+                                    session,
+                                    controller.slots if controller else None,
+                                )
+                                for i, dump_file in enumerate(f for f in phase if f.file_name in ready)
+                            ],
+                            chunksize=1,  # Keep the largest-first order
+                        ),
+                        shared_state,
+                        controller=controller,
+                        metrics=metrics,
+                    )
+                if controller:
+                    controller.finish(target_name, "clone")
+                    controller.probe.close()
+            metrics.span("clone", clone_start)
+
+        state.print_summary()
+        metrics.finish(state.entries)
+        if archive_folder:
+            print(f"Archive copies written to {archive_folder}")
+        processing_time = time.time() - start_time
+        print(f"All clone processes completed in {processing_time:.2f} seconds.")
+        record_import_throughput(target_name, fast_load, state.bytes_done(pending), processing_time)
+
+    def verify_data(
+        self, tables_to_verify, target, method="crc", chunk_rows=DEFAULT_CHUNK_ROWS, source_workers=2,
+        target_workers=4, pause_seconds=0,
+    ):
+        """
+        Check that a target database holds the same rows as the source, table by table.
+
+        Large tables with an integer primary key are compared in key ranges, so a mismatch points
+        at the range to look at. The source and the target are checksummed at the same time, each
+        by its own pool; the source's pool size and pause between chunks bound the load on it.
+
+        Args:
+            tables_to_verify (list): The tables to compare; views are skipped.
+            target (SqlLocalHelper): The database the data was imported or cloned into.
+            method (str): "crc" for row counts and BIT_XOR(CRC32) aggregates per range, or "checksum"
+                for CHECKSUM TABLE per table, which needs the same server version and row format on both sides.
+            chunk_rows (int): The approximate number of rows per checksummed range.
+            source_workers (int): The number of concurrent checksum queries on the source.
+            target_workers (int): The number of concurrent checksum queries on the target.
+            pause_seconds (float): Sleep between the source's chunks.
+
+        Returns:
+            list: A description of every mismatched table or range, empty when the target matches.
+        """
+        start_time = time.time()
+        catalog = self.get_catalog()
+        views = set(catalog.view_names())
+        tables = [catalog.table_info(name) for name in tables_to_verify if name not in views]
+        if not tables:
+            print("No tables to verify.")
+            return []
+
+        with self.open_tunnel() as tunnel_manager:
+            connection = self.create_db_connection(tunnel_manager.port_for(0))
+            cursor = connection.cursor()
+            placeholders = ", ".join(["%s"] * len(tables))
+            cursor.execute(
+                "SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS "
+                f"WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({placeholders}) ORDER BY TABLE_NAME, ORDINAL_POSITION;",
+                (self.rds_db, *[table.name for table in tables]),
             )
+            columns = {}
+            for table_name, column_name in cursor.fetchall():
+                columns.setdefault(table_name, []).append(column_name)
+
+            # Plan one chunk per table, or per key range of the large tables
+            primary_keys = catalog.integer_primary_keys([table.name for table in tables])
+            chunks = []
+            for table in tables:
+                primary_key = primary_keys.get(table.name)
+                if method != "crc" or primary_key is None or table.table_rows <= chunk_rows:
+                    chunks.append(DumpUnit(table))
+                    continue
+                cursor.execute(f"SELECT MIN(`{primary_key}`), MAX(`{primary_key}`) FROM `{table.name}`;")
+                min_value, max_value = cursor.fetchone()
+                if min_value is None:
+                    chunks.append(DumpUnit(table))
+                    continue
+                parts = -(-table.table_rows // chunk_rows)  # Ceiling division
+                chunks.extend(range_chunks(table, primary_key, min_value, max_value, parts))
+            cursor.close()
+            connection.close()
+            print(f"Verifying {len(tables)} tables in {len(chunks)} chunks with {method}.")
+
+            target_options = {
+                "host": target.rds_host, "port": target.rds_port, "user": target.rds_user,
+                "password": target.rds_password, "database": target.rds_db,
+            }
+            source_batches = DumpPlanner.plan(chunks, source_workers)
+            target_batches = DumpPlanner.plan(chunks, target_workers)
+            with Pool(processes=len(source_batches)) as source_pool, \
+                    Pool(processes=len(target_batches)) as target_pool:
+                source_result = source_pool.starmap_async(
+                    checksum_chunks,
+                    [
+                        (
+                            {
+                                "host": "127.0.0.1", "port": tunnel_manager.port_for(i), "user": self.rds_user,
+                                "password": self.rds_password, "database": self.rds_db,
+                            },
+                            batch,
+                            columns,
+                            method,
+                            pause_seconds,
+                        )
+                        for i, batch in enumerate(source_batches)
+                    ],
+                    chunksize=1,
+                )
+                target_result = target_pool.starmap_async(
+                    checksum_chunks,
+                    [(target_options, batch, columns, method) for batch in target_batches],
+                    chunksize=1,
+                )
+                source_checksums = {key: value for results in source_result.get() for key, value in results.items()}
+                target_checksums = {key: value for results in target_result.get() for key, value in results.items()}
+
+        mismatches = compare_checksums(source_checksums, target_checksums)
+        for mismatch in mismatches:
+            print(f"Mismatch: {mismatch}")
+        matched = len(chunks) - len(mismatches)
+        print(f"{matched}/{len(chunks)} chunks match.")
+        print(f"Verification completed in {time.time() - start_time:.2f} seconds.")
+        return mismatches
+
+    def dump_tab_schema(self, tables, state, local_port):
+        """
+        Dump the schema and the triggers of a delimited-text export into their own SQL files.
+
+        The import creates the tables from the schema file before loading any rows and the
+        triggers last, so they do not fire on the loaded rows. Files already done are kept.
+
+        Args:
+            tables (list): All tables and views of the export.
+            state (RunState): The state of this export; the files are recorded as done.
+            local_port (int): The local tunnel port to dump through.
+        """
+        for file_name, options in (
+            (SCHEMA_FILE.format(timestamp_folder=self.timestamp_folder), SCHEMA_OPTIONS),
+            (TRIGGERS_FILE.format(timestamp_folder=self.timestamp_folder, extension=".sql"), TRIGGERS_OPTIONS),
+        ):
+            if state.entries.get(file_name, {}).get("status") == DONE:
+                continue
+            dump_file_path = os.path.join(self.dump_file_base, file_name)
+            run_dump_command(build_mysqldump_command(local_port, self.rds_db, tables, options), dump_file_path)
+            state.entries.pop(file_name, None)
+            state.register(file_name, status=DONE, bytes=os.path.getsize(dump_file_path), tables=tables, units=[])
+            print(f"Dump completed successfully for {file_name}")
+        state.save()
+
+    def reuse_unchanged_tables(self, tables_to_dump, table_stats, state, extension, dry_run=False):
+        """
+        Hard-link the previous export's files whose tables are unchanged into this export.
+
+        Args:
+            tables_to_dump (list): The tables this run should export.
+            table_stats (dict): The current statistics of those tables.
+            state (RunState): The state of this export; reused files are recorded as done.
+            extension (str): The dump file extension of this run; files of another format are not reused.
+            dry_run (bool): Only report what would be reused.
+
+        Returns:
+            list: The tables that still have to be dumped.
+        """
+        previous = DumpManifest.find_previous("exported_sqls", self.timestamp_folder, self.rds_db)
+        if previous is None:
+            print("No previous export with a manifest found, dumping all tables.")
+            return tables_to_dump
+
+        wanted_stats = {table: table_stats[table] for table in tables_to_dump if table in table_stats}
+        reused_tables = set()
+        for file_name in previous.reusable_files(wanted_stats, extension):
+            tables = previous.files[file_name]
+            if not dry_run:
+                target = previous.link_file(file_name, self.dump_file_base)
+                state.register(file_name, status=DONE, bytes=os.path.getsize(target), tables=tables, units=[])
+            reused_tables.update(tables)
+
+        print(
+            f"Incremental dump against {previous.folder}: reusing {len(reused_tables)} unchanged tables, "
+            f"dumping {len(tables_to_dump) - len(reused_tables)}."
+        )
+        return [table for table in tables_to_dump if table not in reused_tables]
+
+    def import_data(
+        self, sql_folder, resume=False, retries=3, fast_load=False, split_units=True, num_workers=5,
+        adaptive=False, threads_running_limit=None, from_store=False, trace=False, defer_indexes=False,
+        index_workers=4,
+    ):
+        """
+        Import plain or compressed SQL files from a specified folder into the database using mysql.
+
+        Args:
+            sql_folder (str): The folder containing the SQL files.
+            resume (bool): Skip the files a previous attempt already imported.
+            retries (int): How many times a failed file is retried, with exponential backoff.
+            fast_load (bool): Wrap each file in a bulk-load tuned session.
+            split_units (bool): Cut multi-table files into per-table units so tables import in parallel.
+            num_workers (int): The number of units imported concurrently.
+            adaptive (bool): Tune the number of concurrent units to the measured throughput, up to num_workers.
+            threads_running_limit (int): In adaptive mode, back off while the database has more running threads.
+            from_store (bool): Stream the export named like sql_folder from the chunk store instead of its files.
+            trace (bool): Also write the run as a Chrome trace-event file next to its JSON-lines events.
+            defer_indexes (bool): Create tables with only their primary key, adding the other indexes after the load.
+            index_workers (int): The number of tables whose deferred indexes are added concurrently.
+        """
+        session = FastLoadSession() if fast_load else None
+        if from_store:
+            os.makedirs(sql_folder, exist_ok=True)  # Keeps the import state even if the export folder was pruned
+        state = RunState.load(os.path.join(sql_folder, IMPORT_STATE_FILE), resume)
+        target = f"{self.rds_host}:{self.rds_port}/{self.rds_db}"
+        metrics = RunMetrics(sql_folder, "import", trace)
+
+        start_time = time.time()  # Start the timer, tunnel setup included
+
+        # Create a pool of processes sharing one set of tunnels and the per-unit state
+        with self.open_tunnel() as tunnel_manager, Manager() as manager, Pool(processes=num_workers) as pool:
+            metrics.tunnel_setup(tunnel_manager)
+            plan_start = time.time()
+            # Split all SQL files into units, skipping the ones a resumed run already imported
+            if from_store:
+                phases = plan_stored_import(ChunkStore(), os.path.basename(os.path.normpath(sql_folder)), state)
+            else:
+                phases = plan_import(pool, sql_folder, state, split_units)
+            metrics.span("plan", plan_start)
+            import_start = time.time()
+            shared_state = manager.dict(state.entries)
+            controller = None
+            if adaptive:
+                probe = ThreadsRunningProbe(self.create_db_connection(tunnel_manager.port_for(0)))
+                controller = create_controller(manager, num_workers, target, "import", probe, threads_running_limit)
+            # Import largest units first, split table parts once their table has been created
+            for phase in phases:
+                ready = set(ready_for_import(state, [unit.key for unit in phase]))
+                state.track(
+                    pool.starmap_async(
+                        import_single_unit,
+                        [
+                            (
+                                unit,
+                                tunnel_manager.port_for(i),
+                                self.rds_db,
+                                shared_state,
+                                retries,
+                                session,
+                                controller.slots if controller else None,
+                                defer_indexes,
+                            )
+                            for i, unit in enumerate(unit for unit in phase if unit.key in ready)
+                        ],
+                        chunksize=1,  # Keep the largest-first order
+                    ),
+                    shared_state,
+                    controller=controller,
+                    metrics=metrics,
+                )
+            if controller:
+                controller.finish(target, "import")
+                controller.probe.close()
+            metrics.span("import", import_start)
+
+            # Add the deferred secondary indexes, one ALTER TABLE per table, on a pool of their own
+            builds = plan_index_builds(state) if defer_indexes else []
+            if builds:
+                index_start = time.time()
+                shared_state = manager.dict(state.entries)
+                with Pool(processes=index_workers) as index_pool:
+                    state.track(
+                        index_pool.starmap_async(
+                            build_table_indexes,
+                            [
+                                (
+                                    build_mysql_command(tunnel_manager.port_for(i), self.rds_db),
+                                    table,
+                                    definitions,
+                                    shared_state,
+                                    retries,
+                                )
+                                for i, (table, definitions) in enumerate(builds)
+                            ],
+                            chunksize=1,  # Keep the largest-first order
+                        ),
+                        shared_state,
+                        metrics=metrics,
+                    )
+                metrics.span("indexes", index_start)
+
+        state.print_summary()
+        metrics.finish(state.entries)
+        if not state.unfinished():
+            remove_unit_files(sql_folder)
+        processing_time = time.time() - start_time
+        print(f"All import processes completed in {processing_time:.2f} seconds.")
+        imported_keys = [unit.key for phase in phases for unit in phase]
+        record_import_throughput(target, fast_load, state.bytes_done(imported_keys), processing_time)
 
     def get_filtered_table_names(self, ignore_tables_prefix):
         """
@@ -180,32 +836,158 @@ class SqlHelper:
         Returns:
             list: A list of table names that do not start with the specified prefix.
         """
-        # Assuming you have a method to get all table names from the database
-        all_tables = self.get_all_table_names()  # This method should be implemented to fetch all table names
+        # Read from the cached schema catalog, no round trip while it is within its TTL
+        all_tables = self.get_all_table_names()
         filtered_tables = [table for table in all_tables if not any(table.startswith(prefix) for prefix in ignore_tables_prefix)]
         return filtered_tables
 
+    def get_catalog(self, refresh=False):
+        """
+        Return the database's schema catalog, reading the local cache while it is within its TTL.
+
+        Args:
+            refresh (bool): Re-read information_schema even if the cache is still fresh.
+
+        Returns:
+            SchemaCatalog: Table names, sizes, primary keys, foreign keys and update times.
+        """
+        if not refresh and self.catalog is not None and self.catalog.is_fresh(self.catalog_ttl):
+            return self.catalog
+
+        path = SchemaCatalog.path_for(self.rds_host, self.rds_port, self.rds_db)
+        catalog = None if refresh else SchemaCatalog.load(path)
+        if catalog is None or not catalog.is_fresh(self.catalog_ttl):
+            with self.open_tunnel() as tunnel_manager:
+                connection = self.create_db_connection(tunnel_manager.port_for(0))
+                cursor = connection.cursor()
+                catalog = SchemaCatalog.fetch(path, self.rds_db, cursor)
+                cursor.close()
+                connection.close()
+            print(f"Schema catalog refreshed: {len(catalog.tables)} tables, saved to {path}")
+        self.catalog = catalog
+        return catalog
+
     def get_all_table_names(self):
         """
-        Retrieve all table names from the RDS database using an SSH tunnel.
+        Retrieve all table and view names of the database from the schema catalog.
 
         Returns:
             list: A list of all table names in the database.
         """
-        with SSHTunnelForwarder(
-            (self.ssh_host, self.ssh_port),
-            ssh_username=self.ssh_user,
-            ssh_pkey=self.ssh_pkey,
-            remote_bind_address=(self.rds_host, self.rds_port),
-        ) as tunnel:
-            # Connect to the database through the tunnel
-            connection = self.create_db_connection(tunnel.local_bind_port)
+        return self.get_catalog().table_names()
+
+    def get_view_names(self):
+        """
+        Retrieve the names of the views in the database.
+
+        Returns:
+            list: The view names.
+        """
+        return self.get_catalog().view_names()
+
+    def get_table_sizes(self, table_names):
+        """
+        Retrieve size statistics for the given tables from the schema catalog.
+
+        Args:
+            table_names (list): The table names to look up.
+
+        Returns:
+            list: A TableInfo per requested table; tables without statistics (e.g. views) have zero size.
+        """
+        catalog = self.get_catalog()
+        return [catalog.table_info(name) for name in table_names]
+
+    def get_table_stats(self, table_names, checksum="quick"):
+        """
+        Retrieve the change-detection statistics recorded in an export's manifest.
+
+        Args:
+            table_names (list): The tables to look up.
+            checksum (str): "quick" for CHECKSUM TABLE ... QUICK, which only has a value for tables
+                keeping a live checksum and leaves the others to their UPDATE_TIME, or "full" for
+                a CHECKSUM TABLE that scans every table on the source.
+
+        Returns:
+            dict: Table name to its UPDATE_TIME, TABLE_ROWS and CHECKSUM TABLE value.
+        """
+        if not table_names:
+            return {}
+
+        with self.open_tunnel() as tunnel_manager:
+            connection = self.create_db_connection(tunnel_manager.port_for(0))
             cursor = connection.cursor()
-            cursor.execute("SHOW TABLES;")
-            tables = [table[0] for table in cursor.fetchall()]
+            try:
+                # MySQL 8 caches information_schema statistics for a day by default
+                cursor.execute("SET SESSION information_schema_stats_expiry = 0;")
+            except Exception:
+                pass  # Older servers read them live
+            cursor.execute(
+                "SELECT TABLE_NAME, UPDATE_TIME, TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s;",
+                (self.rds_db,),
+            )
+            stats = {
+                name: {
+                    "update_time": update_time.isoformat() if update_time else None,
+                    "table_rows": int(table_rows or 0),
+                    "checksum": None,
+                }
+                for name, update_time, table_rows in cursor.fetchall()
+            }
+            cursor.execute(
+                "CHECKSUM TABLE " + ", ".join(f"`{table}`" for table in table_names)
+                + (";" if checksum == "full" else " QUICK;")
+            )
+            for qualified_name, table_checksum in cursor.fetchall():
+                name = qualified_name.split(".", 1)[-1]
+                if name in stats:
+                    stats[name]["checksum"] = table_checksum
             cursor.close()
             connection.close()
-        return tables
+        return {name: stats[name] for name in table_names if name in stats}
+
+    def split_large_tables(self, table_sizes, split_threshold_bytes, split_parts):
+        """
+        Turn tables into dump units, splitting large tables with an integer primary key into key ranges.
+
+        Args:
+            table_sizes (list): TableInfo of the tables to dump.
+            split_threshold_bytes (int): Tables smaller than this stay on the single-file path.
+            split_parts (int): The number of key ranges per split table.
+
+        Returns:
+            list: The DumpUnits to plan.
+        """
+        large_tables = [
+            table.name for table in table_sizes
+            if split_parts > 1 and table.estimated_bytes >= split_threshold_bytes
+        ]
+        primary_keys = self.get_catalog().integer_primary_keys(large_tables) if large_tables else {}
+        if not primary_keys:
+            return [DumpUnit(table) for table in table_sizes]
+
+        units = []
+        with self.open_tunnel() as tunnel_manager:
+            connection = self.create_db_connection(tunnel_manager.port_for(0))
+            cursor = connection.cursor()
+
+            for table in table_sizes:
+                primary_key = primary_keys.get(table.name)
+                if primary_key is None:
+                    units.append(DumpUnit(table))
+                    continue
+
+                cursor.execute(f"SELECT MIN(`{primary_key}`), MAX(`{primary_key}`) FROM `{table.name}`;")
+                min_value, max_value = cursor.fetchone()
+                if min_value is None:
+                    units.append(DumpUnit(table))
+                    continue
+
+                # Open at both ends, so rows written outside MIN/MAX after planning are still dumped
+                units.extend(range_chunks(table, primary_key, min_value, max_value, split_parts))
+            cursor.close()
+            connection.close()
+        return units
 
     def create_db_connection(self, local_port):
         """
@@ -217,11 +999,5 @@ class SqlHelper:
         Returns:
             connection: A connection object to the RDS database.
         """
-        connection = pymysql.connect(
-            host='127.0.0.1',  # Connect to the local port
-            port=local_port,
-            user=self.rds_user,
-            password=self.rds_password,
-            database=self.rds_db
-        )
+        connection = connect_through_tunnel(local_port, self.rds_user, self.rds_password, self.rds_db)
         return connection
\ No newline at end of file
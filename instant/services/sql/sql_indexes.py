@@ -0,0 +1,190 @@
+import io
+import re
+from sql_state import DONE, run_with_retries, update_state
+from sql_stream import CHUNK_SIZE, feed_process
+
+# mysqldump writes each table's definition as CREATE TABLE on its own line, one column or key per line
+CREATE_TABLE_START = b"CREATE TABLE `"
+SECONDARY_KEY = re.compile(rb"\s*(?:UNIQUE |FULLTEXT |SPATIAL )?KEY `(?:[^`]|``)+` \((.*)\)")
+FOREIGN_KEY = re.compile(rb"\s*CONSTRAINT `(?:[^`]|``)+` FOREIGN KEY \((.*?)\) REFERENCES")
+QUOTED_NAME = re.compile(rb"`((?:[^`]|``)+)`")
+INDEX_KEY_PREFIX = "indexes#"
+
+
+def defer_secondary_indexes(lines: list[bytes]) -> tuple[list[bytes], list[str]]:
+    """
+    Take the secondary indexes out of one CREATE TABLE statement.
+
+    The primary key stays, and so do the indexes the table's foreign keys and its AUTO_INCREMENT
+    column need to exist up front, as do all but one FULLTEXT index, since InnoDB builds only one
+    per ALTER TABLE. Tables without a primary key are left alone: InnoDB clusters them on their
+    first unique key, and adding it later would rebuild the whole table.
+
+    Args:
+        lines (list): The statement's lines, from CREATE TABLE to the closing parenthesis.
+
+    Returns:
+        tuple: The rewritten lines, and the definitions of the indexes taken out.
+    """
+    body = lines[1:-1]
+    if not any(line.lstrip().startswith(b"PRIMARY KEY ") for line in body):
+        return lines, []
+
+    foreign_keys = []
+    auto_increment = []
+    for line in body:
+        match = FOREIGN_KEY.match(line)
+        if match:
+            foreign_keys.append(QUOTED_NAME.findall(match.group(1)))
+        elif line.lstrip().startswith(b"`") and b" AUTO_INCREMENT" in line:
+            auto_increment.append(QUOTED_NAME.search(line).group(1))
+
+    kept, deferred = [], []
+    fulltext_deferred = False
+    for line in body:
+        match = SECONDARY_KEY.match(line)
+        if match:
+            columns = QUOTED_NAME.findall(match.group(1))
+            fulltext = line.lstrip().startswith(b"FULLTEXT ")
+            needed = bool(columns) and columns[0] in auto_increment
+            needed = needed or any(columns[:len(foreign_key)] == foreign_key for foreign_key in foreign_keys)
+            if not needed and not (fulltext and fulltext_deferred):
+                deferred.append(line.strip().rstrip(b",").decode())
+                fulltext_deferred = fulltext_deferred or fulltext
+                continue
+        kept.append(line)
+    if not deferred:
+        return lines, []
+    kept[-1] = kept[-1].rstrip(b"\n").rstrip(b",") + b"\n"  # The last definition takes no comma
+    return [lines[0], *kept, lines[-1]], deferred
+
+
+class IndexDeferringReader:
+    """
+    Binary reader over a mysqldump stream that creates its tables with only their primary key.
+
+    The secondary indexes taken out are collected in `deferred`, table name to definitions,
+    to be added once the rows are loaded.
+    """
+    def __init__(self, raw):
+        self.raw = raw
+        self.deferred = {}
+        self.output = bytearray()
+        self.partial_line = b""
+        self.statement = None  # The lines of the CREATE TABLE being read
+
+    def read(self, size: int = -1) -> bytes:
+        while (size < 0 or len(self.output) < size) and self._fill():
+            pass
+        size = len(self.output) if size < 0 else size
+        data = bytes(self.output[:size])
+        del self.output[:size]
+        return data
+
+    def _fill(self) -> bool:
+        block = self.raw.read(CHUNK_SIZE)
+        if not block:
+            # Pass on whatever is left as is, e.g. a file cut off inside a definition
+            self.output += b"".join(self.statement or []) + self.partial_line
+            self.statement, self.partial_line = None, b""
+            return False
+        data = self.partial_line + block
+        end = data.rfind(b"\n") + 1
+        self.partial_line = data[end:]
+        if end == 0:
+            return True  # No complete line yet
+        if self.statement is None and CREATE_TABLE_START not in data[:end]:
+            self.output += data[:end]  # Rows only, nothing to rewrite
+            return True
+        for line in data[:end - 1].split(b"\n"):
+            self._line(line + b"\n")
+        return True
+
+    def _line(self, line: bytes):
+        if self.statement is None:
+            if line.startswith(CREATE_TABLE_START):
+                self.statement = [line]
+            else:
+                self.output += line
+            return
+        self.statement.append(line)
+        if line.startswith(b")"):
+            lines, definitions = defer_secondary_indexes(self.statement)
+            if definitions:
+                self.deferred[QUOTED_NAME.search(self.statement[0]).group(1).decode()] = definitions
+            self.output += b"".join(lines)
+            self.statement = None
+
+
+def index_key(table: str) -> str:
+    """The import state entry of a table's deferred index build."""
+    return f"{INDEX_KEY_PREFIX}{table}"
+
+
+def is_index_key(key: str) -> bool:
+    return key.startswith(INDEX_KEY_PREFIX)
+
+
+def add_indexes_statement(table: str, definitions: list[str]) -> str:
+    """Build the single ALTER TABLE adding all of a table's deferred indexes, so it is rebuilt once."""
+    return f"ALTER TABLE `{table}` " + ", ".join(f"ADD {definition}" for definition in definitions) + ";"
+
+
+def plan_index_builds(state) -> list[tuple[str, list[str]]]:
+    """
+    Register a build entry for every table whose indexes an import deferred.
+
+    Indexes are only added once every unit has imported, as a table's rows may be split
+    across several units.
+
+    Returns:
+        list: (table, index definitions) of the builds still to run, largest table first.
+    """
+    unfinished = [key for key in state.unfinished() if not is_index_key(key)]
+    if unfinished:
+        print(f"{len(unfinished)} units did not import; deferred indexes are added once a --resume completes them.")
+        return []
+
+    tables = {}
+    for key, entry in state.entries.items():
+        if entry["status"] == DONE and entry.get("deferred_indexes"):
+            for table, definitions in entry["deferred_indexes"].items():
+                tables[table] = (definitions, entry.get("bytes", 0))
+    for table in tables:
+        state.register(index_key(table))
+    state.save()
+
+    pending = set(state.unfinished())
+    builds = sorted(
+        ((table, definitions, size) for table, (definitions, size) in tables.items() if index_key(table) in pending),
+        key=lambda build: -build[2],
+    )
+    if builds:
+        print(f"Adding the deferred indexes of {len(builds)} tables.")
+    return [(table, definitions) for table, definitions, _ in builds]
+
+
+def record_deferred_indexes(shared_state, key: str, deferred: dict):
+    """Keep the indexes a unit deferred in its state entry before it is marked done, so --resume still adds them."""
+    if deferred:
+        update_state(shared_state, key, deferred_indexes=deferred)
+
+
+def build_table_indexes(mysql_command, table: str, definitions: list[str], shared_state, retries: int = 3):
+    """
+    Pool worker: add one table's deferred indexes with a single ALTER TABLE.
+
+    Args:
+        mysql_command (list): The mysql client command of the target.
+        table (str): The table to index.
+        definitions (list): Its index definitions, as in SHOW CREATE TABLE.
+        shared_state: The import's Manager dict.
+        retries (int): How many times a failed build is retried, with exponential backoff.
+    """
+    def build():
+        print(f"Adding {len(definitions)} indexes to {table}...")
+        feed_process([*mysql_command, f"--execute={add_indexes_statement(table, definitions)}"], io.BytesIO())
+        print(f"Indexes added to {table}")
+        return 0
+
+    run_with_retries(build, shared_state, index_key(table), retries)
@@ -1,34 +1,55 @@
 import os
-import subprocess
-from multiprocessing import Pool
+import time
+from multiprocessing import Manager, Pool
+import pymysql
+from sql_concurrency import ThreadsRunningProbe, create_controller, worker_slot
+from sql_metrics import RunMetrics
+from sql_fast_load import FastLoadSession, record_import_throughput
+from sql_indexes import build_table_indexes, plan_index_builds, record_deferred_indexes
+from sql_splitter import plan_import, plan_stored_import, remove_unit_files, run_import_unit
+from sql_store import ChunkStore
+from sql_state import IMPORT_STATE_FILE, RunState, ready_for_import, run_with_retries
 
-def import_single_file_local(sql_file, sql_folder, rds_host, rds_port, rds_user, rds_password, rds_db):
+def build_local_mysql_command(rds_host, rds_port, rds_user, rds_password, rds_db):
+    """Build the mysql client command for the local target database."""
+    return [
+        "/usr/local/bin/mysql",
+        "--defaults-file=" + os.path.join(os.path.dirname(__file__), '.db.cnf'),  # Update path here
+        f"--database={ rds_db}",
+        f"--host={rds_host}",
+        f"--port={rds_port}",
+        f"--user={rds_user}",
+        f"--password={rds_password}",
+    ]
+
+def import_single_unit_local(
+    unit, rds_host, rds_port, rds_user, rds_password, rds_db, shared_state, retries=3, session=None, slots=None,
+    defer_indexes=False,
+):
         """
-        Import a single SQL file into the local database.
+        Import a single SQL file, or one table's section of it, into the local database.
 
         Args:
-            sql_file (str): The name of the SQL file to import.
-            sql_folder (str): The folder containing the SQL files.
+            unit (ImportUnit): The file or table section to import.
+            shared_state: The run's Manager dict recording each unit's status.
+            retries (int): How many times a failed import is retried, with exponential backoff.
+            session (FastLoadSession): Optional bulk-load session tuning wrapped around the file.
+            slots: The adaptive run's concurrency semaphore, or None.
+            defer_indexes (bool): Create tables with only their primary key, recording the indexes left out.
         """
-        dump_file_path = os.path.join(sql_folder, sql_file)
-        mysql_command = [
-            "/usr/local/bin/mysql",
-            "--defaults-file=" + os.path.join(os.path.dirname(__file__), '.db.cnf'),  # Update path here
-            f"--database={ rds_db}",
-            f"--host={rds_host}",
-            f"--port={rds_port}",
-            f"--user={rds_user}",
-            f"--password={rds_password}",
-        ]
+        mysql_command = build_local_mysql_command(rds_host, rds_port, rds_user, rds_password, rds_db)
 
-        # Run the mysql command
-        print(f"Importing data from {sql_file}...")
-        with open(dump_file_path, "r") as f:
-            subprocess.run(
-                mysql_command, stdin=f, check=True, capture_output=True, text=True
-            )
+        # Run the mysql command, decompressing compressed dumps on the fly
+        def import_unit():
+            print(f"Importing data from {unit.key}...")
+            deferred_indexes = {} if defer_indexes else None
+            imported_bytes = run_import_unit(mysql_command, unit, session, deferred_indexes)
+            record_deferred_indexes(shared_state, unit.key, deferred_indexes)
+            print(f"Data import completed for {unit.key}")
+            return imported_bytes
 
-        print(f"Data import completed for {sql_file}")
+        with worker_slot(slots):
+            run_with_retries(import_unit, shared_state, unit.key, retries)
 
 class SqlLocalHelper:
     def __init__(self, rds_host, rds_port, rds_user, rds_password, rds_db):
@@ -46,24 +67,118 @@ class SqlLocalHelper:
         self.rds_password = rds_password
         self.rds_db = rds_db
 
+    def create_db_connection(self):
+        """Create a pymysql connection to the local database."""
+        return pymysql.connect(
+            host=self.rds_host,
+            port=self.rds_port,
+            user=self.rds_user,
+            password=self.rds_password,
+            database=self.rds_db,
+        )
+
+    def build_mysql_command(self):
+        """Build the mysql client command for this target, e.g. to stream a clone into it."""
+        return build_local_mysql_command(self.rds_host, self.rds_port, self.rds_user, self.rds_password, self.rds_db)
 
-    def import_data_local(self, sql_folder):
+    def import_data_local(
+        self, sql_folder, resume=False, retries=3, fast_load=False, skip_binlog=False, split_units=True,
+        num_workers=5, adaptive=False, threads_running_limit=None, from_store=False, trace=False,
+        defer_indexes=False, index_workers=4,
+    ):
         """
-        Import SQL files from a specified folder into the local database.
+        Import plain or compressed SQL files from a specified folder into the local database.
 
         Args:
             sql_folder (str): The folder containing the SQL files.
+            resume (bool): Skip the files a previous attempt already imported.
+            retries (int): How many times a failed file is retried, with exponential backoff.
+            fast_load (bool): Wrap each file in a bulk-load tuned session.
+            skip_binlog (bool): With fast_load, also set sql_log_bin=0 (needs SUPER or SYSTEM_VARIABLES_ADMIN).
+            split_units (bool): Cut multi-table files into per-table units so tables import in parallel.
+            num_workers (int): The number of parallel imports, or the most an adaptive run may use.
+            adaptive (bool): Start with few workers and add more while throughput keeps improving.
+            threads_running_limit (int): In adaptive runs, back off while the target's Threads_running is above this.
+            from_store (bool): Stream the export named like sql_folder from the chunk store instead of its files.
+            trace (bool): Also write the run as a Chrome trace-event file next to its JSON-lines events.
+            defer_indexes (bool): Create tables with only their primary key, adding the other indexes after the load.
+            index_workers (int): The number of tables whose deferred indexes are added concurrently.
         """
-        # Get all SQL files from the specified folder
-        sql_files = [f for f in os.listdir(sql_folder) if f.endswith(".sql")]
+        session = FastLoadSession(skip_binlog=skip_binlog) if fast_load else None
+        start_time = time.time()
+        target = f"{self.rds_host}:{self.rds_port}/{self.rds_db}"
+
+        if from_store:
+            os.makedirs(sql_folder, exist_ok=True)  # Keeps the import state even if the export folder was pruned
+        state = RunState.load(os.path.join(sql_folder, IMPORT_STATE_FILE), resume)
+        metrics = RunMetrics(sql_folder, "import_local", trace)
+
+        # Create a pool of processes sharing the per-unit state
+        with Manager() as manager, Pool(processes=num_workers) as pool:
+            plan_start = time.time()
+            # Split all SQL files into units, skipping the ones a resumed run already imported
+            if from_store:
+                phases = plan_stored_import(ChunkStore(), os.path.basename(os.path.normpath(sql_folder)), state)
+            else:
+                phases = plan_import(pool, sql_folder, state, split_units)
+            metrics.span("plan", plan_start)
+            import_start = time.time()
+            shared_state = manager.dict(state.entries)
+            controller = None
+            if adaptive:
+                probe = ThreadsRunningProbe(self.create_db_connection())
+                controller = create_controller(manager, num_workers, target, "import", probe, threads_running_limit)
+            slots = controller.slots if controller else None
+            # Import largest units first, split table parts once their table has been created
+            for phase in phases:
+                ready = set(ready_for_import(state, [unit.key for unit in phase]))
+                state.track(
+                    pool.starmap_async(
+                        import_single_unit_local,
+                        [
+                            (
+                                unit, self.rds_host, self.rds_port, self.rds_user,
+                                self.rds_password, self.rds_db, shared_state, retries, session, slots, defer_indexes,
+                            )
+                            for unit in phase if unit.key in ready
+                        ],
+                        chunksize=1,  # Keep the largest-first order
+                    ),
+                    shared_state,
+                    controller=controller,
+                    metrics=metrics,
+                )
+            if controller:
+                controller.finish(target, "import")
+                controller.probe.close()
+            metrics.span("import", import_start)
+
+            # Add the deferred secondary indexes, one ALTER TABLE per table, on a pool of their own
+            builds = plan_index_builds(state) if defer_indexes else []
+            if builds:
+                index_start = time.time()
+                shared_state = manager.dict(state.entries)
+                mysql_command = self.build_mysql_command()
+                with Pool(processes=index_workers) as index_pool:
+                    state.track(
+                        index_pool.starmap_async(
+                            build_table_indexes,
+                            [
+                                (mysql_command, table, definitions, shared_state, retries)
+                                for table, definitions in builds
+                            ],
+                            chunksize=1,  # Keep the largest-first order
+                        ),
+                        shared_state,
+                        metrics=metrics,
+                    )
+                metrics.span("indexes", index_start)
 
-        # Create a pool of 5 processes
-        with Pool(processes=5) as pool:
-            # Use pool to import all SQL files
-            pool.starmap(
-                import_single_file_local,
-                [
-                    (sql_file, sql_folder, self.rds_host, self.rds_port, self.rds_user, self.rds_password, self.rds_db)
-                    for sql_file in sql_files
-                ],
-            )
\ No newline at end of file
+        state.print_summary()
+        metrics.finish(state.entries)
+        if not state.unfinished():
+            remove_unit_files(sql_folder)
+        processing_time = time.time() - start_time
+        print(f"All import processes completed in {processing_time:.2f} seconds.")
+        imported_keys = [unit.key for phase in phases for unit in phase]
+        record_import_throughput(target, fast_load, state.bytes_done(imported_keys), processing_time)
\ No newline at end of file
@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+MANIFEST_FILE = "manifest.json"
+
+
+class DumpManifest:
+    """
+    Per-export record of what was dumped: per-table UPDATE_TIME, row count and
+    CHECKSUM TABLE value, plus which files hold each table. Native dumps also record
+    the binary log position of their shared snapshot, and subset dumps the predicate
+    each table's rows were selected with.
+    """
+    def __init__(self, folder: str, database: str = None, tables: dict = None, files: dict = None,
+                 snapshot: dict = None, subset: dict = None):
+        self.folder = folder
+        self.database = database
+        self.tables = tables or {}
+        self.files = files or {}
+        self.snapshot = snapshot
+        self.subset = subset
+
+    @classmethod
+    def load(cls, folder: str):
+        """Load the manifest of an export folder, or return None if it has none."""
+        path = os.path.join(folder, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls(
+            folder, data.get("database"), data.get("tables"), data.get("files"), data.get("snapshot"),
+            data.get("subset"),
+        )
+
+    @classmethod
+    def find_previous(cls, base_folder: str, current_folder: str, database: str):
+        """
+        Find the most recent earlier full export of the same database that has a manifest.
+        Subset exports are skipped, as their files do not hold whole tables.
+
+        Args:
+            base_folder (str): The exported_sqls folder holding the dated exports.
+            current_folder (str): The name of the export being written, which is skipped.
+            database (str): The database the previous export must belong to.
+        """
+        candidates = sorted(
+            (name for name in os.listdir(base_folder)
+             if name != current_folder and os.path.isdir(os.path.join(base_folder, name))),
+            reverse=True,
+        )
+        for name in candidates:
+            manifest = cls.load(os.path.join(base_folder, name))
+            if manifest is not None and manifest.database == database and not manifest.subset:
+                return manifest
+        return None
+
+    def save(self):
+        with open(os.path.join(self.folder, MANIFEST_FILE), "w") as f:
+            json.dump(
+                {
+                    "database": self.database,
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "tables": self.tables,
+                    "files": self.files,
+                    "snapshot": self.snapshot,
+                    "subset": self.subset,
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+
+    def add_file(self, file_name: str, tables: list[str], table_stats: dict):
+        """Record a file and the current statistics of the tables it holds."""
+        self.files[file_name] = tables
+        for table in tables:
+            entry = dict(table_stats.get(table, {}))
+            entry["files"] = sorted(set(self.tables.get(table, {}).get("files", [])) | {file_name})
+            self.tables[table] = entry
+
+    def is_unchanged(self, table: str, stats: dict) -> bool:
+        """
+        Check whether a table still matches this manifest's update time and, when both sides have
+        one, its checksum. Without an update time (e.g. InnoDB after a restart) it counts as changed.
+        """
+        previous = self.tables.get(table)
+        if not previous or previous.get("update_time") is None or stats.get("update_time") is None:
+            return False
+        if previous.get("checksum") is not None and stats.get("checksum") is not None:
+            if previous["checksum"] != stats["checksum"]:
+                return False
+        return previous["update_time"] == stats["update_time"]
+
+    def reusable_files(self, table_stats: dict, extension: str) -> list[str]:
+        """
+        Return this export's files whose tables are all still wanted and unchanged.
+
+        A file that also holds a changed table is not reusable, so its tables are dumped again.
+        """
+        return [
+            file_name
+            for file_name, tables in self.files.items()
+            if file_name.endswith(extension)
+            and os.path.exists(os.path.join(self.folder, file_name))
+            and all(table in table_stats and self.is_unchanged(table, table_stats[table]) for table in tables)
+        ]
+
+    def link_file(self, file_name: str, target_folder: str) -> str:
+        """Hard-link a file of this export into another export folder, copying if linking is not possible."""
+        source = os.path.join(self.folder, file_name)
+        target = os.path.join(target_folder, file_name)
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+        return target
@@ -0,0 +1,149 @@
+import json
+import os
+import time
+from instant.utils.general_helper import GeneralHelper
+
+EVENTS_FILE = "{job}_events.jsonl"
+TRACE_FILE = "{job}_trace.json"
+SUMMARY_ROWS = 20
+
+
+class RunMetrics:
+    """
+    Structured metrics of a dump, import or clone run.
+
+    Events are appended to `<job>_events.jsonl` in the run's folder as they happen: the run's
+    phases, such as tunnel setup, from the parent, and every attempt at a file, key range or
+    table section as workers record it in the run state. The same spans can be written as a
+    Chrome trace-event file (chrome://tracing, Perfetto) showing what each worker did over time.
+    """
+    def __init__(self, folder: str, job: str, trace: bool = False):
+        self.folder = folder
+        self.job = job
+        self.trace = trace
+        self.started_at = time.time()
+        self.events_path = os.path.join(folder, EVENTS_FILE.format(job=job))
+        self.spans = []
+        self.attempts = []
+        self.seen = set()
+        self.emit("run_start")
+
+    def emit(self, event: str, **fields):
+        """Append one event to the run's JSON-lines stream."""
+        with open(self.events_path, "a") as f:
+            f.write(json.dumps({"ts": round(time.time(), 3), "job": self.job, "event": event, **fields}) + "\n")
+
+    def span(self, name: str, start: float, end: float = None, **fields):
+        """Record a phase of the parent process, e.g. tunnel setup or planning."""
+        end = time.time() if end is None else end
+        self.spans.append({"name": name, "start": start, "end": end, **fields})
+        self.emit("phase", name=name, start=round(start, 3), seconds=round(end - start, 3), **fields)
+
+    def tunnel_setup(self, tunnel_manager):
+        """Record how long the run's SSH tunnels took to open, also when the caller opened them beforehand."""
+        self.span("tunnel_setup", tunnel_manager.started_at, tunnel_manager.started_at + tunnel_manager.setup_time)
+
+    def observe(self, entries: dict):
+        """Emit the attempts workers have finished since the last call, from a copy of the run state."""
+        for key, entry in entries.items():
+            for index, attempt in enumerate(entry.get("attempt_log", [])):
+                if (key, index) in self.seen or attempt["start"] < self.started_at:
+                    continue  # Already emitted, or from the run a --resume continues
+                self.seen.add((key, index))
+                record = {
+                    "key": key,
+                    "tables": entry.get("tables") or [key.split("#", 1)[-1]],
+                    "estimated_rows": entry.get("table_rows"),
+                    "attempt": index + 1,
+                    **attempt,
+                }
+                self.attempts.append(record)
+                self.emit(
+                    "unit",
+                    **{name: value for name, value in record.items() if name not in ("start", "end")},
+                    start=round(attempt["start"], 3),
+                    seconds=round(attempt["end"] - attempt["start"], 3),
+                )
+
+    def finish(self, entries: dict):
+        """Emit the remaining attempts and the run's totals, print the summary and write the trace."""
+        self.observe(entries)
+        done = [attempt for attempt in self.attempts if attempt["status"] == "done"]
+        total_seconds = time.time() - self.started_at
+        self.emit(
+            "run_end",
+            seconds=round(total_seconds, 3),
+            units=len(entries),
+            done=sum(1 for entry in entries.values() if entry["status"] == "done"),
+            failed_attempts=len(self.attempts) - len(done),
+            bytes=sum(attempt["bytes"] for attempt in done),
+        )
+        self.print_summary(total_seconds)
+        if self.trace:
+            self.write_trace()
+        print(f"Metrics written to {self.events_path}")
+
+    def print_summary(self, total_seconds: float):
+        """Print the run's phases and its slowest units as a table."""
+        print(f"\n{self.job} summary ({total_seconds:.2f}s):")
+        for span in self.spans:
+            print(f"  {span['name']:<24} {span['end'] - span['start']:>9.2f}s")
+
+        units = {}
+        for attempt in self.attempts:
+            unit = units.setdefault(attempt["key"], {"seconds": 0.0, "bytes": 0, "attempts": 0, "status": None,
+                                                     "worker": attempt["worker"], "rows": attempt["estimated_rows"]})
+            unit["seconds"] += attempt["end"] - attempt["start"]
+            unit["bytes"] += attempt["bytes"]
+            unit["attempts"] += 1
+            unit["status"] = attempt["status"]
+        if not units:
+            return
+
+        print(f"  {'unit':<48} {'seconds':>9} {'bytes':>10} {'rows':>10} {'tries':>5}  {'status':<7} worker")
+        slowest = sorted(units.items(), key=lambda item: -item[1]["seconds"])
+        for key, unit in slowest[:SUMMARY_ROWS]:
+            rows = "" if unit["rows"] is None else f"~{unit['rows']}"
+            print(
+                f"  {key[-48:]:<48} {unit['seconds']:>9.2f} {GeneralHelper.format_bytes(unit['bytes']):>10} "
+                f"{rows:>10} {unit['attempts']:>5}  {unit['status']:<7} {unit['worker']}"
+            )
+        if len(slowest) > SUMMARY_ROWS:
+            print(f"  ... {len(slowest) - SUMMARY_ROWS} more units in {self.events_path}")
+
+        busy = sum(unit["seconds"] for unit in units.values())
+        workers = {attempt["worker"] for attempt in self.attempts}
+        if total_seconds > 0 and workers:
+            print(f"  Worker utilisation: {100 * busy / (total_seconds * len(workers)):.0f}% of {len(workers)} workers")
+
+    def write_trace(self):
+        """Write the run as Chrome trace events: one row per worker, plus the parent's phases."""
+        events = [
+            {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"instant sql {self.job}"}},
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": "main"}},
+        ]
+        for span in self.spans:
+            events.append({
+                "name": span["name"], "cat": "phase", "ph": "X", "pid": 1, "tid": 0,
+                "ts": int(span["start"] * 1e6), "dur": int((span["end"] - span["start"]) * 1e6),
+            })
+        for worker in sorted({attempt["worker"] for attempt in self.attempts}):
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": worker_tid(worker),
+                           "args": {"name": worker}})
+        for attempt in self.attempts:
+            events.append({
+                "name": attempt["key"], "cat": attempt["status"], "ph": "X", "pid": 1,
+                "tid": worker_tid(attempt["worker"]),
+                "ts": int(attempt["start"] * 1e6), "dur": int((attempt["end"] - attempt["start"]) * 1e6),
+                "args": {"bytes": attempt["bytes"], "attempt": attempt["attempt"], "error": attempt.get("error")},
+            })
+        path = os.path.join(self.folder, TRACE_FILE.format(job=self.job))
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"Chrome trace written to {path}")
+
+
+def worker_tid(worker: str) -> int:
+    """Number a pool worker's trace row after its process name, e.g. ForkPoolWorker-3 is row 3."""
+    suffix = worker.rsplit("-", 1)[-1]
+    return int(suffix) if suffix.isdigit() else abs(hash(worker)) % 10000
@@ -0,0 +1,292 @@
+import os
+import time
+from datetime import datetime
+from threading import BrokenBarrierError
+import pymysql
+from pymysql.constants import FIELD_TYPE
+from pymysql.converters import escape_string
+from sql_compression import compression_for, open_output
+from sql_splitter import FOOTER_START
+from sql_state import run_with_retries
+from sql_stream import StreamProgress
+from sql_tab import TEXT_CONVERSIONS, is_triggers_file
+from sql_throttle import NET_WRITE_TIMEOUT_SECONDS
+from sql_tunnel import connect_through_tunnel
+
+INSERT_BATCH_BYTES = 1024 * 1024  # Rows per INSERT statement are capped like mysqldump's net_buffer_length
+ROWS_PER_FETCH = 10000
+SNAPSHOT_TIMEOUT = 120  # Seconds the global read lock may wait for the workers' snapshots
+NUMERIC_TYPES = {
+    FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL, FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG,
+    FIELD_TYPE.INT24, FIELD_TYPE.LONGLONG, FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.YEAR,
+}
+
+# Same session setup and restore as mysqldump, so the files import and split like mysqldump's
+DUMP_HEADER = """-- Dump of `{database}` written by instant's native dump engine
+/*!40101 SET @OLD_CHARACTER_SET_CLIENT=@@CHARACTER_SET_CLIENT */;
+/*!40101 SET NAMES utf8mb4 */;
+/*!40103 SET @OLD_TIME_ZONE=@@TIME_ZONE */;
+/*!40103 SET TIME_ZONE='+00:00' */;
+/*!40014 SET @OLD_UNIQUE_CHECKS=@@UNIQUE_CHECKS, UNIQUE_CHECKS=0 */;
+/*!40014 SET @OLD_FOREIGN_KEY_CHECKS=@@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS=0 */;
+/*!40101 SET @OLD_SQL_MODE=@@SQL_MODE, SQL_MODE='NO_AUTO_VALUE_ON_ZERO' */;
+/*!40111 SET @OLD_SQL_NOTES=@@SQL_NOTES, SQL_NOTES=0 */;
+"""
+DUMP_FOOTER = FOOTER_START.decode() + """
+/*!40101 SET SQL_MODE=@OLD_SQL_MODE */;
+/*!40014 SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS */;
+/*!40014 SET UNIQUE_CHECKS=@OLD_UNIQUE_CHECKS */;
+/*!40101 SET CHARACTER_SET_CLIENT=@OLD_CHARACTER_SET_CLIENT */;
+/*!40111 SET SQL_NOTES=@OLD_SQL_NOTES */;
+
+-- Dump completed on {completed_at}
+"""
+
+
+class SnapshotLock:
+    """
+    Short global read lock under which every dump worker opens its consistent snapshot.
+
+    FLUSH TABLES WITH READ LOCK needs the RELOAD privilege, which RDS does not grant, so the
+    lock falls back to LOCK TABLES ... READ on the dumped tables. The binary log position is
+    read while writes are blocked, so it matches the snapshot.
+    """
+    def __init__(self, connection, tables: list[str]):
+        self.connection = connection
+        self.tables = tables
+        self.method = None
+        self.binlog_position = None
+        self.locked_at = None
+
+    def acquire(self):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("FLUSH TABLES WITH READ LOCK;")
+            self.method = "FLUSH TABLES WITH READ LOCK"
+        except pymysql.err.MySQLError:
+            cursor.execute("LOCK TABLES " + ", ".join(f"`{table}` READ" for table in self.tables) + ";")
+            self.method = "LOCK TABLES ... READ"
+        self.locked_at = time.time()
+
+        try:
+            cursor.execute("SHOW MASTER STATUS;")
+            row = cursor.fetchone()
+            if row:
+                self.binlog_position = {
+                    "file": row[0], "position": int(row[1]), "gtid_set": row[4] if len(row) > 4 else None,
+                }
+        except pymysql.err.MySQLError:
+            pass  # Needs REPLICATION CLIENT; the position is informational only
+        cursor.close()
+
+    def release(self):
+        cursor = self.connection.cursor()
+        cursor.execute("UNLOCK TABLES;")
+        cursor.close()
+        self.connection.close()
+        print(f"Snapshot lock ({self.method}) held for {time.time() - self.locked_at:.2f} seconds.")
+
+    def hold_until_ready(self, snapshot_barrier):
+        """Keep writes blocked until every worker has opened its snapshot, or the wait times out."""
+        try:
+            snapshot_barrier.wait(SNAPSHOT_TIMEOUT)
+            print("All dump workers share one snapshot.")
+        except BrokenBarrierError:
+            print("Not every dump worker opened its snapshot in time; their files may differ in time.")
+        finally:
+            self.release()
+
+
+def open_snapshot_connection(local_port, rds_user, rds_password, rds_db):
+    """Open a connection and start a consistent-snapshot transaction on it."""
+    connection = connect_through_tunnel(
+        local_port, rds_user, rds_password, rds_db, charset="utf8mb4", conv=TEXT_CONVERSIONS
+    )
+    cursor = connection.cursor()
+    cursor.execute("SET SESSION time_zone = '+00:00';")  # Matches the TIME_ZONE of the file header
+    # Rows may be consumed slowly by the compressor or the throttle
+    cursor.execute(f"SET SESSION net_write_timeout = {NET_WRITE_TIMEOUT_SECONDS};")
+    cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ;")
+    cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY;")
+    cursor.close()
+    return connection
+
+
+def numeric_literal(value):
+    return "NULL" if value is None else value
+
+
+def quoted_literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bytes):
+        return "0x" + value.hex() if value else "''"
+    return "'" + escape_string(value) + "'"
+
+
+def write_table_definition(cursor, table: str, output) -> bool:
+    """
+    Write a table's or view's DROP/CREATE section under mysqldump's section markers.
+
+    Returns:
+        bool: True for a base table, False for a view.
+    """
+    cursor.execute(f"SHOW CREATE TABLE `{table}`;")
+    row = cursor.fetchone()
+    if cursor.description[0][0] == "View":
+        # Views depend on tables of any file, so the import creates them last
+        output.write((
+            f"\n--\n-- Final view structure for view `{table}`\n--\n\n"
+            f"DROP TABLE IF EXISTS `{table}`;\nDROP VIEW IF EXISTS `{table}`;\n{row[1]};\n"
+        ).encode())
+        return False
+
+    output.write((
+        f"\n--\n-- Table structure for table `{table}`\n--\n\n"
+        f"DROP TABLE IF EXISTS `{table}`;\n"
+        "/*!40101 SET @saved_cs_client     = @@character_set_client */;\n"
+        "/*!50503 SET character_set_client = utf8mb4 */;\n"
+        f"{row[1]};\n"
+        "/*!40101 SET character_set_client = @saved_cs_client */;\n"
+    ).encode())
+    return True
+
+
+def write_table_triggers(cursor, table: str, output):
+    cursor.execute("SHOW TRIGGERS LIKE %s;", (table,))
+    for trigger in [row[0] for row in cursor.fetchall() if row[2] == table]:  # LIKE also matches _ and %
+        cursor.execute(f"SHOW CREATE TRIGGER `{trigger}`;")
+        statement = cursor.fetchone()[2]
+        output.write((
+            f"DROP TRIGGER IF EXISTS `{trigger}`;\nDELIMITER ;;\n{statement} ;;\nDELIMITER ;\n"
+        ).encode())
+
+
+def write_table_rows(connection, rds_db: str, unit, output, progress: StreamProgress, insert_ignore: bool = False):
+    """Stream a table's rows, or one primary-key range of them, as batched multi-row INSERTs."""
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND EXTRA NOT LIKE '%%GENERATED%%' "
+        "ORDER BY ORDINAL_POSITION;",
+        (rds_db, unit.name),
+    )
+    column_list = ", ".join(f"`{row[0]}`" for row in cursor.fetchall())
+    cursor.close()
+
+    query = f"SELECT {column_list} FROM `{unit.name}`"
+    if unit.where:
+        query += f" WHERE {unit.where}"
+    insert = f"INSERT {'IGNORE ' if insert_ignore else ''}INTO `{unit.name}` ({column_list}) VALUES "
+
+    output.write(f"\n--\n-- Dumping data for table `{unit.name}`\n--\n\n".encode())
+    with connection.cursor(pymysql.cursors.SSCursor) as rows_cursor:
+        rows_cursor.execute(query)
+        formatters = [
+            numeric_literal if column[1] in NUMERIC_TYPES else quoted_literal for column in rows_cursor.description
+        ]
+        batch, batch_bytes = [], 0
+        for rows in iter(lambda: rows_cursor.fetchmany(ROWS_PER_FETCH), []):
+            for row in rows:
+                values = "(" + ",".join(format_value(value) for format_value, value in zip(formatters, row)) + ")"
+                batch.append(values)
+                batch_bytes += len(values)
+                if batch_bytes >= INSERT_BATCH_BYTES:
+                    chunk = (insert + ",".join(batch) + ";\n").encode()
+                    output.write(chunk)
+                    progress.update(len(chunk))
+                    batch, batch_bytes = [], 0
+        if batch:
+            chunk = (insert + ",".join(batch) + ";\n").encode()
+            output.write(chunk)
+            progress.update(len(chunk))
+
+
+def write_native_dump_file(connection, rds_db: str, dump_file, dump_file_path: str, throttle=None):
+    """
+    Write one planned file from a snapshot connection in mysqldump's layout.
+
+    Whole tables carry their definition and triggers, and the first part of a split table its
+    definition; the other parts only hold rows, inserted with INSERT IGNORE so a retried part
+    can reload. The triggers of split tables go in the triggers file, created after all parts.
+    With a throttle, the file is written, and its rows fetched, at the throttle's pace.
+    """
+    progress = StreamProgress(dump_file.file_name, dump_file.estimated_bytes)
+    with open_output(dump_file_path, compression_for(dump_file.file_name), throttle) as output:
+        output.write(DUMP_HEADER.format(database=rds_db).encode())
+        cursor = connection.cursor()
+        for unit in dump_file.units:
+            if is_triggers_file(dump_file.file_name):
+                write_table_triggers(cursor, unit.name, output)
+                continue
+            if unit.is_part and unit.part > 0:
+                write_table_rows(connection, rds_db, unit, output, progress, insert_ignore=True)
+                continue
+            if write_table_definition(cursor, unit.name, output):
+                write_table_rows(connection, rds_db, unit, output, progress)
+                if not unit.is_part:
+                    write_table_triggers(cursor, unit.name, output)
+        cursor.close()
+        output.write(DUMP_FOOTER.format(completed_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")).encode())
+    progress.report()
+
+
+def run_native_dump(
+    dump_files,
+    process_num,
+    local_port,
+    rds_user,
+    rds_password,
+    rds_db,
+    timestamp_folder,
+    shared_state,
+    snapshot_barrier,
+    retries=3,
+    throttle=None,
+):
+    """
+    Dump one worker's share of the plan over a single connection, without mysqldump.
+
+    The worker opens its snapshot while the parent holds the read lock and then waits on
+    snapshot_barrier, so all workers read the database at the same point in time. A file
+    retried after a lost connection is dumped from a new snapshot. With a throttle, files are
+    written at its pace and not started while it is paused.
+    """
+    export_folder = os.path.join("exported_sqls", timestamp_folder)
+    connection = None
+    try:
+        connection = open_snapshot_connection(local_port, rds_user, rds_password, rds_db)
+    except pymysql.err.MySQLError as e:
+        print(f"Could not open a snapshot connection (process {process_num}): {e}")
+    try:
+        snapshot_barrier.wait(SNAPSHOT_TIMEOUT)
+    except BrokenBarrierError:
+        pass  # The parent reports it; the dump goes on from this worker's own snapshot
+
+    for dump_file in dump_files:
+        dump_file_path = os.path.join(export_folder, dump_file.file_name)
+
+        def dump():
+            nonlocal connection
+            if connection is None or not connection.open:
+                print(f"Opening a new snapshot for {dump_file.file_name} (process {process_num})")
+                connection = open_snapshot_connection(local_port, rds_user, rds_password, rds_db)
+            try:
+                if throttle is not None:
+                    throttle.record_wait(throttle.wait_while_paused())
+                write_native_dump_file(connection, rds_db, dump_file, dump_file_path, throttle)
+            except pymysql.err.MySQLError:
+                try:
+                    connection.close()
+                except pymysql.err.Error:
+                    pass
+                connection = None  # The snapshot is gone with the connection
+                raise
+            print(f"Dump completed successfully for {dump_file.file_name} (process {process_num})")
+            return os.path.getsize(dump_file_path)
+
+        run_with_retries(dump, shared_state, dump_file.file_name, retries)
+
+    if connection is not None and connection.open:
+        connection.commit()
+        connection.close()
@@ -0,0 +1,143 @@
+import heapq
+import re
+from sql.models.models import DumpFile, TableInfo
+from instant.utils.general_helper import GeneralHelper
+
+# Part files of a split table, e.g. 20240820_orders.part003.sql.zst
+PART_FILE_PATTERN = re.compile(r"\.part(\d+)\.sql(\.\w+)?$")
+
+
+class DumpPlanner:
+    @staticmethod
+    def plan(tables: list[TableInfo], num_workers: int) -> list[list[TableInfo]]:
+        """
+        Balance tables across workers by estimated size, largest first.
+
+        Each table goes to the worker with the smallest planned load so far
+        (longest-processing-time scheduling).
+
+        Args:
+            tables (list[TableInfo]): The tables to dump.
+            num_workers (int): The number of dump workers.
+
+        Returns:
+            list: One list of tables per worker, empty workers omitted.
+        """
+        num_workers = max(1, min(num_workers, len(tables)))
+        buckets = [[] for _ in range(num_workers)]
+        loads = [(0, i) for i in range(num_workers)]
+        heapq.heapify(loads)
+
+        for table in sorted(tables, key=lambda t: (-t.estimated_bytes, t.name)):
+            load, i = heapq.heappop(loads)
+            buckets[i].append(table)
+            heapq.heappush(loads, (load + table.estimated_bytes, i))
+
+        return [bucket for bucket in buckets if bucket]
+
+    @staticmethod
+    def bucket_bytes(bucket: list[TableInfo]) -> int:
+        """Return the total estimated bytes of a worker's tables."""
+        return sum(table.estimated_bytes for table in bucket)
+
+    @staticmethod
+    def print_plan(buckets: list[list[TableInfo]]):
+        """Print the planned worker assignment and the estimated makespan."""
+        total_bytes = sum(DumpPlanner.bucket_bytes(bucket) for bucket in buckets)
+        makespan = max((DumpPlanner.bucket_bytes(bucket) for bucket in buckets), default=0)
+
+        for i, bucket in enumerate(buckets, start=1):
+            print(
+                f"Worker {i}: {len(bucket)} tables, "
+                f"{GeneralHelper.format_bytes(DumpPlanner.bucket_bytes(bucket))}"
+            )
+            for table in bucket:
+                label = table.name
+                if getattr(table, "is_part", False):
+                    label = f"{table.name} part {table.part} [{table.where}]"
+                print(f"    {label} ({GeneralHelper.format_bytes(table.estimated_bytes)}, ~{table.table_rows} rows)")
+
+        ideal = total_bytes / len(buckets) if buckets else 0
+        print(f"Total estimated size: {GeneralHelper.format_bytes(total_bytes)}")
+        print(
+            f"Estimated makespan: {GeneralHelper.format_bytes(makespan)} on the busiest worker "
+            f"(ideal {GeneralHelper.format_bytes(ideal)})"
+        )
+
+    @staticmethod
+    def split_ranges(min_value: int, max_value: int, parts: int) -> list[tuple[int, int]]:
+        """
+        Split an inclusive integer key range into at most `parts` contiguous ranges.
+
+        Returns:
+            list: (start, end) pairs; every end is exclusive except the last, which is inclusive.
+        """
+        span = max_value - min_value + 1
+        parts = max(1, min(parts, span))
+        step = -(-span // parts)  # Ceiling division
+        starts = list(range(min_value, max_value + 1, step))
+        return [
+            (start, starts[i + 1] if i + 1 < len(starts) else max_value)
+            for i, start in enumerate(starts)
+        ]
+
+    @staticmethod
+    def part_file_name(timestamp_folder: str, table_name: str, part: int, extension: str) -> str:
+        """Return the file name of one primary-key range of a split table."""
+        return f"{timestamp_folder}_{table_name}.part{part:03d}{extension}"
+
+    @staticmethod
+    def dump_files(chunk: list, process_num: int, timestamp_folder: str, extension: str) -> list[DumpFile]:
+        """
+        Lay out one worker's units as output files.
+
+        Whole tables share a single file per worker; each primary-key range of a split
+        table gets its own part file so the import can load the parts in parallel.
+        """
+        files = []
+        whole_tables = [unit for unit in chunk if not unit.is_part]
+        if whole_tables:
+            files.append(DumpFile(f"{timestamp_folder}_{process_num}{extension}", whole_tables))
+        for unit in chunk:
+            if unit.is_part:
+                files.append(DumpFile(
+                    DumpPlanner.part_file_name(timestamp_folder, unit.name, unit.part, extension), [unit]
+                ))
+        return files
+
+    @staticmethod
+    def table_files(chunk: list, timestamp_folder: str, extension: str) -> list[DumpFile]:
+        """Lay out units as one file per table or primary-key range, e.g. for delimited-text dumps."""
+        return [
+            DumpFile(
+                DumpPlanner.part_file_name(timestamp_folder, unit.name, unit.part, extension)
+                if unit.is_part else f"{timestamp_folder}_{unit.name}{extension}",
+                [unit],
+            )
+            for unit in chunk
+        ]
+
+    @staticmethod
+    def import_phases(sql_files: list[str]) -> list[list[str]]:
+        """
+        Order dump files for import.
+
+        The first part of a split table carries its DROP/CREATE TABLE, so it loads together with the
+        regular files; the remaining parts only hold rows and load in parallel once the table exists.
+
+        Returns:
+            list: The file batches to import one after another, empty batches omitted.
+        """
+        first_phase, second_phase = [], []
+        for sql_file in sql_files:
+            match = PART_FILE_PATTERN.search(sql_file)
+            if match and int(match.group(1)) > 0:
+                second_phase.append(sql_file)
+            else:
+                first_phase.append(sql_file)
+        return [phase for phase in (first_phase, second_phase) if phase]
+
+    @staticmethod
+    def first_part_file(sql_file: str) -> str:
+        """Return the part file carrying the table definition for a part file, or the file itself otherwise."""
+        return PART_FILE_PATTERN.sub(lambda m: f".part000.sql{m.group(2) or ''}", sql_file)
@@ -0,0 +1,260 @@
+import os
+import shutil
+from contextlib import ExitStack, contextmanager
+from sql.models.models import ImportUnit
+from sql_compression import compression_for, dump_extension, is_dump_file, open_dump, open_output
+from sql_indexes import IndexDeferringReader
+from sql_planner import DumpPlanner, PART_FILE_PATTERN
+from sql_state import prepare_import_state
+from sql_store import open_whole_file
+from sql_stream import ConcatReader, ProgressReader, RangeReader, StreamProgress, feed_process
+from sql_tab import is_tab_file, is_triggers_file, run_load_unit, tab_table_name
+
+# mysqldump starts every table's section with this comment
+TABLE_MARKER = b"-- Table structure for table `"
+# View sections depend on tables from any file, so they are imported after all tables
+VIEW_MARKERS = (
+    b"-- Temporary view structure for view `",
+    b"-- Temporary table structure for view `",
+    b"-- Final view structure for view `",
+)
+# First statement of the trailer that restores the session settings set up by the header
+FOOTER_START = b"/*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;"
+UNITS_FOLDER = ".units"
+
+
+def _section_name(line: bytes):
+    """Return (name, deferred) if the line starts a table or view section, otherwise None."""
+    for marker, deferred in [(TABLE_MARKER, False)] + [(marker, True) for marker in VIEW_MARKERS]:
+        if line.startswith(marker):
+            name = line[len(marker):].rstrip().rstrip(b"`").decode(errors="replace")
+            return name, deferred
+    return None
+
+
+def split_dump_file(sql_folder: str, sql_file: str, split: bool = True,
+                    done_keys: frozenset = frozenset()) -> list[ImportUnit]:
+    """
+    Cut a mysqldump file into per-table import units in a single streaming pass.
+
+    The file's header (session setup) and footer (session restore) are kept in memory and wrapped
+    around every unit. Plain files are indexed by byte offset, so units read their range straight
+    from the original file; compressed files have each table's section recompressed, in the
+    file's own format, into a temporary unit file under .units/ that is decompressed on the fly
+    when imported, so no uncompressed copy is written. Sections a resumed import already loaded
+    (`done_keys`) are not written again. Files with a single table, row-only parts of split
+    tables and files that are not mysqldump output stay whole. Delimited-text files are loaded
+    whole, and the triggers of a delimited-text export wait until all rows are in.
+
+    Returns:
+        list: The file's ImportUnits.
+    """
+    path = os.path.join(sql_folder, sql_file)
+    if is_tab_file(sql_file):
+        return [ImportUnit(sql_file, path, os.path.getsize(path), load_table=tab_table_name(sql_file))]
+    if is_triggers_file(sql_file):
+        return [ImportUnit(sql_file, path, os.path.getsize(path), deferred=True)]
+
+    whole_file = [ImportUnit(sql_file, path, os.path.getsize(path))]
+    if not split or PART_FILE_PATTERN.search(sql_file):
+        return whole_file
+
+    compress = compression_for(sql_file)
+    units_folder = os.path.join(sql_folder, UNITS_FOLDER, sql_file)
+    header = bytearray()
+    footer = bytearray()
+    sections = []  # [name, deferred, offset, size, unit writer]
+    position = 0
+    current = None
+
+    def unit_file(index):
+        return os.path.join(units_folder, f"{index:04d}{dump_extension(compress)}")
+
+    with open_dump(path) as source, ExitStack() as unit_files:
+        for line in iter(source.readline, b""):
+            section = _section_name(line)
+            if section is not None:
+                unit_files.close()  # Finish the previous section's unit file
+                writer = None
+                if compress and f"{sql_file}#{section[0]}" not in done_keys:
+                    os.makedirs(units_folder, exist_ok=True)
+                    writer = unit_files.enter_context(open_output(unit_file(len(sections)), compress))
+                current = [section[0], section[1], position, 0, writer]
+                sections.append(current)
+            elif line.startswith(FOOTER_START) or footer:
+                footer.extend(line)
+                position += len(line)
+                continue
+
+            if current is None:
+                header.extend(line)
+            else:
+                current[3] += len(line)
+                if current[4] is not None:
+                    current[4].write(line)
+            position += len(line)
+
+    if len(sections) < 2:
+        shutil.rmtree(units_folder, ignore_errors=True)
+        return whole_file
+
+    units = []
+    for index, (name, deferred, offset, size, _) in enumerate(sections):
+        if compress:
+            unit_path, unit_offset = unit_file(index), 0
+        else:
+            unit_path, unit_offset = path, offset
+        units.append(ImportUnit(
+            sql_file, unit_path, size, table=name, offset=unit_offset, header=bytes(header),
+            footer=bytes(footer), temporary=compress is not None, deferred=deferred,
+        ))
+    return units
+
+
+def import_unit_phases(units: list[ImportUnit]) -> list[list[ImportUnit]]:
+    """
+    Order import units into phases, each scheduled largest first.
+
+    Table units follow the file phases of DumpPlanner.import_phases, so the rows of split
+    tables load after their definition; delimited-text files load once the schema exists, and
+    view and trigger units come last.
+    """
+    by_file = {}
+    for unit in units:
+        if not unit.load_table:
+            by_file.setdefault(unit.file_name, []).append(unit)
+
+    phases = [
+        [unit for sql_file in file_phase for unit in by_file[sql_file] if not unit.deferred]
+        for file_phase in DumpPlanner.import_phases(list(by_file))
+    ]
+    phases.append([unit for unit in units if unit.load_table])
+    phases.append([unit for unit in units if unit.deferred])
+    return [sorted(phase, key=lambda unit: -unit.size) for phase in phases if phase]
+
+
+@contextmanager
+def open_unit(unit: ImportUnit, progress: StreamProgress = None):
+    """Open an import unit as a binary stream of SQL: the whole dump, or header + table section + footer."""
+    if unit.is_whole_file:
+        with open_whole_file(unit, progress) as source:
+            yield source
+        return
+
+    if unit.temporary:
+        # The section's own compressed unit file, decompressed on the fly
+        with open_dump(unit.path) as section:
+            if progress:
+                section = ProgressReader(section, progress)
+            yield ConcatReader([unit.header, section, unit.footer])
+        return
+
+    with open(unit.path, "rb") as raw:
+        section = RangeReader(raw, unit.offset, unit.size)
+        if progress:
+            section = ProgressReader(section, progress)
+        yield ConcatReader([unit.header, section, unit.footer])
+
+
+def run_import_unit(mysql_command, unit: ImportUnit, session=None, deferred_indexes: dict = None) -> int:
+    """
+    Stream one import unit into the mysql client in binary mode.
+
+    Only the tails of the client's output are kept, while progress on the unit is printed
+    for the worker. Temporary unit files are removed once imported, and delimited-text
+    files are bulk-loaded with LOAD DATA instead.
+
+    Args:
+        mysql_command (list): The mysql client command.
+        unit (ImportUnit): The unit to import.
+        session (FastLoadSession): Optional session tuning wrapped around the unit.
+        deferred_indexes (dict): When given, tables are created with only their primary key and
+            this dict collects the secondary indexes left out, table name to definitions.
+
+    Returns:
+        int: The number of bytes of the unit consumed.
+    """
+    if unit.load_table:
+        return run_load_unit(mysql_command, unit, session)
+
+    progress = StreamProgress(unit.key, unit.size)
+    with open_unit(unit, progress) as source:
+        if deferred_indexes is not None:
+            source = IndexDeferringReader(source)
+        if session is None:
+            feed_process(mysql_command, source)
+        else:
+            output = feed_process(mysql_command, source, session.prologue(), session.epilogue())
+            session.verify(output)
+        if deferred_indexes is not None:
+            deferred_indexes.update(source.deferred)
+    progress.report()
+    if unit.temporary:
+        os.remove(unit.path)
+    return progress.bytes_done
+
+
+def remove_unit_files(sql_folder: str):
+    """Remove the temporary unit files of compressed dumps."""
+    shutil.rmtree(os.path.join(sql_folder, UNITS_FOLDER), ignore_errors=True)
+
+
+def plan_import(pool, sql_folder: str, state, split: bool = True) -> list[list[ImportUnit]]:
+    """
+    Split a folder's dump files into units in parallel and register them in the import state.
+
+    On resume, files whose units all imported are not split again; row-only parts of split
+    tables are always planned, as re-importing their table's first part resets them.
+
+    Returns:
+        list: The phases of units still to import, each largest first.
+    """
+    sql_files = sorted(f for f in os.listdir(sql_folder) if is_dump_file(f) or is_tab_file(f))
+    done_keys = frozenset(state.done())
+    file_keys = {}
+    for key in state.entries:
+        file_keys.setdefault(key.split("#", 1)[0], []).append(key)
+    finished = {
+        sql_file for sql_file in sql_files
+        if sql_file in file_keys and not PART_FILE_PATTERN.search(sql_file)
+        and all(key in done_keys for key in file_keys[sql_file])
+    }
+    units = [
+        unit
+        for file_units in pool.starmap(
+            split_dump_file,
+            [(sql_folder, sql_file, split, done_keys) for sql_file in sql_files if sql_file not in finished],
+        )
+        for unit in file_units
+    ]
+    pending = set(prepare_import_state(state, [unit.key for unit in units]))
+    skipped = f", {len(finished)} files already imported" if finished else ""
+    print(f"Importing {len(pending)} of {len(units)} units from {len(sql_files) - len(finished)} files{skipped}.")
+    return [[unit for unit in phase if unit.key in pending] for phase in import_unit_phases(units)]
+
+
+def plan_stored_import(store, export_name: str, state) -> list[list[ImportUnit]]:
+    """
+    Plan the import of an export kept in the chunk store, streaming its files from their chunks.
+
+    Per-table splitting needs byte offsets into a file on disk, so stored files import whole.
+
+    Returns:
+        list: The phases of units still to import, each largest first.
+    """
+    files = store.load_recipe(export_name)["files"]
+    units = [
+        ImportUnit(
+            file_name,
+            store.root,
+            entry["size"],
+            deferred=is_triggers_file(file_name),
+            load_table=tab_table_name(file_name) if is_tab_file(file_name) else None,
+            chunks=entry["chunks"],
+        )
+        for file_name, entry in sorted(files.items())
+        if is_dump_file(file_name) or is_tab_file(file_name)
+    ]
+    pending = set(prepare_import_state(state, [unit.key for unit in units]))
+    print(f"Importing {len(pending)} of {len(units)} files of {export_name} from the chunk store.")
+    return [[unit for unit in phase if unit.key in pending] for phase in import_unit_phases(units)]
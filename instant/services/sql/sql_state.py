@@ -0,0 +1,188 @@
+import json
+import os
+import subprocess
+import time
+from multiprocessing import current_process
+import pymysql
+from instant.utils.general_helper import GeneralHelper
+from sql_planner import DumpPlanner
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+DUMP_STATE_FILE = "dump_state.json"
+IMPORT_STATE_FILE = "import_state.json"
+CLONE_STATE_FILE = "clone_state.json"
+
+
+class RunState:
+    """
+    Per-file status of a dump or import run, persisted as JSON so a failed run can be resumed.
+
+    Workers update a Manager dict seeded from `entries`; the parent copies it back and
+    saves it while the pool is running, so the file on disk survives a crash.
+    """
+    def __init__(self, path: str, entries: dict = None):
+        self.path = path
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path: str, resume: bool = False):
+        """Load the saved state when resuming, otherwise start a fresh one."""
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                return cls(path, json.load(f))
+        if resume:
+            print(f"No state found at {path}, starting a new run.")
+        return cls(path)
+
+    def save(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)  # Never leave a half-written state file behind
+
+    def register(self, key: str, **info):
+        """Add a pending entry unless the key is already tracked."""
+        if key not in self.entries:
+            self.entries[key] = {"status": PENDING, "bytes": 0, "attempts": 0, **info}
+
+    def unfinished(self) -> list[str]:
+        """Return the keys that still need work: pending, failed, or interrupted while running."""
+        return [key for key, entry in self.entries.items() if entry["status"] != DONE]
+
+    def done(self) -> list[str]:
+        return [key for key, entry in self.entries.items() if entry["status"] == DONE]
+
+    def bytes_done(self, keys) -> int:
+        """Return the bytes processed for those of `keys` that are done."""
+        return sum(
+            self.entries[key].get("bytes", 0)
+            for key in keys if key in self.entries and self.entries[key]["status"] == DONE
+        )
+
+    def track(self, async_result, shared_state, interval: float = 5, controller=None, metrics=None,
+              monitor=None):
+        """
+        Wait for a pool's async result, saving the shared state every `interval` seconds.
+
+        An adaptive ConcurrencyController is fed the bytes finished so far on every save,
+        RunMetrics emits the attempts the workers finished since the last one, and a
+        SourceMonitor adjusts the throttle to the source's load.
+        """
+        while not async_result.ready():
+            async_result.wait(interval)
+            self.entries = dict(shared_state)
+            self.save()
+            if controller is not None:
+                controller.observe(self.bytes_done(self.entries))
+            if metrics is not None:
+                metrics.observe(self.entries)
+            if monitor is not None:
+                monitor.observe()
+        self.entries = dict(shared_state)
+        self.save()
+        if metrics is not None:
+            metrics.observe(self.entries)
+        return async_result.get()
+
+    def print_summary(self):
+        failed = [key for key, entry in self.entries.items() if entry["status"] == FAILED]
+        total_bytes = sum(entry.get("bytes", 0) for entry in self.entries.values())
+        print(
+            f"{len(self.done())}/{len(self.entries)} done, {GeneralHelper.format_bytes(total_bytes)}, "
+            f"state saved to {self.path}"
+        )
+        if self.unfinished():
+            for key in failed:
+                print(f"Failed: {key}: {self.entries[key].get('error', '')}")
+            print("Re-run with --resume to retry the unfinished work.")
+
+
+def update_state(shared_state, key: str, **fields):
+    """Update one entry of a Manager dict; nested values must be reassigned for the change to propagate."""
+    entry = dict(shared_state[key])
+    entry.update(fields)
+    shared_state[key] = entry
+
+
+def attempt_log(shared_state, key: str, started: float, status: str, processed_bytes: int, error: str = None) -> list:
+    """Return an entry's attempt log with the attempt that just ended appended, for RunMetrics."""
+    return shared_state[key].get("attempt_log", []) + [{
+        "start": started,
+        "end": time.time(),
+        "status": status,
+        "bytes": processed_bytes,
+        "worker": current_process().name,
+        "error": error.splitlines()[-1] if error else None,  # The full error stays in the entry
+    }]
+
+
+def run_with_retries(action, shared_state, key: str, retries: int = 3, backoff_seconds: float = 2):
+    """
+    Run `action` for one tracked entry, retrying with exponential backoff.
+
+    `action` returns the number of bytes processed and raises CalledProcessError, OSError,
+    RuntimeError or a pymysql error on failure.
+
+    Returns:
+        bool: True if the entry finished successfully.
+    """
+    for attempt in range(1, retries + 2):
+        update_state(shared_state, key, status=RUNNING, attempts=shared_state[key]["attempts"] + 1)
+        started = time.time()
+        try:
+            processed_bytes = action()
+            update_state(
+                shared_state, key, status=DONE, bytes=processed_bytes, error=None,
+                attempt_log=attempt_log(shared_state, key, started, DONE, processed_bytes),
+            )
+            return True
+        except (subprocess.CalledProcessError, OSError, RuntimeError, pymysql.err.MySQLError) as e:
+            error = getattr(e, "stderr", None) or str(e)
+            if isinstance(error, bytes):
+                error = error.decode(errors="replace")
+            error = error.strip()[-2000:]
+            update_state(
+                shared_state, key, status=FAILED, error=error,
+                attempt_log=attempt_log(shared_state, key, started, FAILED, 0, error),
+            )
+            if attempt <= retries:
+                delay = backoff_seconds * 2 ** (attempt - 1)
+                print(f"Error occurred for {key} (attempt {attempt}), retrying in {delay:.0f}s: {error}")
+                time.sleep(delay)
+            else:
+                print(f"Error occurred for {key}, giving up after {attempt} attempts: {error}")
+    return False
+
+
+def prepare_import_state(state, sql_files: list[str]) -> list[str]:
+    """
+    Register a folder's dump files and return the ones that still need importing.
+
+    Re-importing the first part of a split table drops and recreates the table, so the
+    table's other parts are reset to pending along with it.
+    """
+    for sql_file in sql_files:
+        state.register(sql_file)
+
+    unfinished = set(state.unfinished())
+    for sql_file in sql_files:
+        if DumpPlanner.first_part_file(sql_file) in unfinished and sql_file not in unfinished:
+            state.entries[sql_file]["status"] = PENDING
+    state.save()
+
+    unfinished = set(state.unfinished())
+    return sorted(sql_file for sql_file in sql_files if sql_file in unfinished)
+
+
+def ready_for_import(state, sql_files: list[str]) -> list[str]:
+    """Skip row-only parts whose table definition (part 000) did not import; they stay pending for --resume."""
+    ready = []
+    for sql_file in sql_files:
+        first_part = DumpPlanner.first_part_file(sql_file)
+        if first_part == sql_file or state.entries.get(first_part, {}).get("status") == DONE:
+            ready.append(sql_file)
+    return ready
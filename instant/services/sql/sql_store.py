@@ -0,0 +1,259 @@
+import hashlib
+import io
+import json
+import os
+import re
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing import Pool
+from sql_compression import compression_for, open_dump, open_output
+from sql_stream import CHUNK_SIZE, ProgressReader
+
+STORE_FOLDER = os.path.join("exported_sqls", ".store")
+# Cut candidates: the end of a line, or the gap between two rows of an extended INSERT
+CUT_CANDIDATES = re.compile(rb"\n|\),\(")
+MIN_CHUNK_BYTES = 64 * 1024
+MAX_CHUNK_BYTES = 4 * 1024 * 1024
+# A row whose CRC32 has these bits clear ends a chunk; about one cut per 4096 rows
+CUT_MASK = 0xFFF
+OBJECT_COMPRESSION_LEVEL = 6
+
+
+def find_cut(buffer, min_size: int = MIN_CHUNK_BYTES, max_size: int = MAX_CHUNK_BYTES):
+    """
+    Find where the chunk at the start of the buffer ends, or None if more data is needed.
+
+    The chunk ends after the first row or line, past min_size, whose own content hashes to a
+    cut. Since the decision only depends on that row, an inserted or changed row moves the cuts
+    around it but not the ones further on, so the following chunks keep their content.
+    """
+    previous = 0
+    for match in CUT_CANDIDATES.finditer(buffer, 0, max_size):
+        end = match.end()
+        if end >= min_size and zlib.crc32(buffer[previous:end]) & CUT_MASK == 0:
+            return end
+        previous = end
+    return max_size if len(buffer) >= max_size else None
+
+
+def content_chunks(source, min_size: int = MIN_CHUNK_BYTES, max_size: int = MAX_CHUNK_BYTES):
+    """Split a binary stream into content-defined chunks."""
+    buffer = bytearray()
+    for block in iter(lambda: source.read(CHUNK_SIZE), b""):
+        buffer += block
+        cut = find_cut(memoryview(buffer), min_size, max_size)
+        while cut is not None:
+            yield bytes(buffer[:cut])
+            del buffer[:cut]
+            cut = find_cut(memoryview(buffer), min_size, max_size)
+    if buffer:
+        yield bytes(buffer)
+
+
+class ChunkStore:
+    """
+    Content-addressed object store for the exports under exported_sqls.
+
+    Every file of an export is cut into content-defined chunks of its decompressed SQL or text;
+    each distinct chunk is kept once, zlib-compressed, under objects/ by its SHA-256. An export's
+    recipe under exports/ lists the chunks of its files, so any export can be rebuilt, or streamed
+    into an import, while tables that did not change between days share the same objects.
+    """
+    def __init__(self, root: str = STORE_FOLDER):
+        self.root = root
+        self.objects_folder = os.path.join(root, "objects")
+        self.exports_folder = os.path.join(root, "exports")
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_folder, digest[:2], digest)
+
+    def recipe_path(self, export_name: str) -> str:
+        return os.path.join(self.exports_folder, f"{export_name}.json")
+
+    def put(self, chunk: bytes) -> tuple[str, bool]:
+        """
+        Store a chunk unless an identical one is already stored.
+
+        Returns:
+            tuple: The chunk's digest, and whether it was new.
+        """
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(zlib.compress(chunk, OBJECT_COMPRESSION_LEVEL))
+        os.replace(temporary_path, path)  # Concurrent writers of the same chunk write identical bytes
+        return digest, True
+
+    def get(self, digest: str) -> bytes:
+        with open(self.object_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def store_file(self, path: str) -> dict:
+        """
+        Chunk one export file into the store.
+
+        Returns:
+            dict: The file's recipe entry: its chunks, decompressed size and digest, and size on disk.
+        """
+        content_digest = hashlib.sha256()
+        chunks, size, new_bytes = [], 0, 0
+        with open_dump(path) as source:
+            for chunk in content_chunks(source):
+                digest, new = self.put(chunk)
+                chunks.append(digest)
+                content_digest.update(chunk)
+                size += len(chunk)
+                new_bytes += len(chunk) if new else 0
+        return {
+            "chunks": chunks,
+            "size": size,
+            "sha256": content_digest.hexdigest(),
+            "file_bytes": os.path.getsize(path),
+            "new_bytes": new_bytes,
+        }
+
+    def save_recipe(self, export_name: str, files: dict):
+        os.makedirs(self.exports_folder, exist_ok=True)
+        with open(self.recipe_path(export_name), "w") as f:
+            json.dump(
+                {"created_at": datetime.now().isoformat(timespec="seconds"), "files": files},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+
+    def load_recipe(self, export_name: str) -> dict:
+        path = self.recipe_path(export_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No stored export named {export_name} in {self.root}")
+        with open(path) as f:
+            return json.load(f)
+
+    def export_names(self) -> list[str]:
+        if not os.path.isdir(self.exports_folder):
+            return []
+        return sorted(name[:-len(".json")] for name in os.listdir(self.exports_folder) if name.endswith(".json"))
+
+    def restore_export(self, export_name: str, target_folder: str) -> int:
+        """
+        Rebuild a stored export's files, recompressed as they were, and check their content digests.
+
+        Returns:
+            int: The number of files restored.
+        """
+        recipe = self.load_recipe(export_name)
+        os.makedirs(target_folder, exist_ok=True)
+        for file_name, entry in recipe["files"].items():
+            content_digest = hashlib.sha256()
+            with open_output(os.path.join(target_folder, file_name), compression_for(file_name)) as output:
+                for digest in entry["chunks"]:
+                    chunk = self.get(digest)
+                    content_digest.update(chunk)
+                    output.write(chunk)
+            if content_digest.hexdigest() != entry["sha256"]:
+                raise ValueError(f"Restored {file_name} does not match its stored digest, the store is corrupt.")
+            print(f"Restored {file_name}")
+        return len(recipe["files"])
+
+    def drop_export(self, export_name: str):
+        """Forget an export; its chunks are freed by the next collect_garbage unless other exports share them."""
+        os.remove(self.recipe_path(export_name))
+
+    def collect_garbage(self) -> tuple[int, int]:
+        """
+        Delete the objects no stored export refers to, and leftovers of interrupted writes.
+
+        Returns:
+            tuple: The number of objects deleted and the bytes freed.
+        """
+        referenced = {
+            digest
+            for export_name in self.export_names()
+            for entry in self.load_recipe(export_name)["files"].values()
+            for digest in entry["chunks"]
+        }
+        deleted, freed = 0, 0
+        for folder, _, file_names in os.walk(self.objects_folder):
+            for file_name in file_names:
+                if file_name in referenced:
+                    continue
+                path = os.path.join(folder, file_name)
+                freed += os.path.getsize(path)
+                deleted += 1
+                os.remove(path)
+        return deleted, freed
+
+    def stored_bytes(self) -> int:
+        """The size of all objects on disk."""
+        return sum(
+            os.path.getsize(os.path.join(folder, file_name))
+            for folder, _, file_names in os.walk(self.objects_folder)
+            for file_name in file_names
+        )
+
+
+def store_export_file(store_root: str, folder: str, file_name: str) -> tuple[str, dict]:
+    """Pool worker: chunk one file of an export folder into the store."""
+    entry = ChunkStore(store_root).store_file(os.path.join(folder, file_name))
+    print(f"Stored {file_name}")
+    return file_name, entry
+
+
+def store_export_folder(folder: str, store: ChunkStore, num_workers: int = 4) -> dict:
+    """
+    Chunk every file of an export folder into the store, several files at a time, and save its recipe.
+
+    Returns:
+        dict: The export's recipe entries by file name.
+    """
+    export_name = os.path.basename(os.path.normpath(folder))
+    file_names = sorted(
+        name for name in os.listdir(folder)
+        if not name.startswith(".") and os.path.isfile(os.path.join(folder, name))
+    )
+    with Pool(processes=num_workers) as pool:
+        files = dict(pool.starmap(store_export_file, [(store.root, folder, name) for name in file_names]))
+    store.save_recipe(export_name, files)
+    return files
+
+
+class ChunkReader:
+    """Binary reader over a stored file, decompressing its chunks one at a time."""
+    def __init__(self, store: ChunkStore, digests: list[str]):
+        self.store = store
+        self.digests = list(digests)
+        self.current = io.BytesIO()
+
+    def _next_chunk(self) -> bool:
+        if not self.digests:
+            return False
+        self.current = io.BytesIO(self.store.get(self.digests.pop(0)))
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while True:
+            data = self.current.read(size)
+            if data or not self._next_chunk():
+                return data
+
+    def readline(self) -> bytes:
+        line = self.current.readline()
+        while not line.endswith(b"\n") and self._next_chunk():
+            line += self.current.readline()
+        return line
+
+
+@contextmanager
+def open_whole_file(unit, progress=None):
+    """Open a whole-file import unit as a binary stream, from disk or, for a stored export, from the store."""
+    if unit.chunks is None:
+        with open_dump(unit.path, progress) as source:
+            yield source
+        return
+    source = ChunkReader(ChunkStore(unit.path), unit.chunks)
+    yield ProgressReader(source, progress) if progress else source
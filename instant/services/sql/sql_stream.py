@@ -0,0 +1,199 @@
+import subprocess
+import threading
+import time
+from collections import deque
+from multiprocessing import current_process
+from instant.utils.general_helper import GeneralHelper
+
+CHUNK_SIZE = 1024 * 1024  # Bytes copied per read when streaming a dump
+OUTPUT_LIMIT = 64 * 1024  # Only the tail of a client's stdout/stderr is kept
+
+
+class TailReader(threading.Thread):
+    """Drain a process's output stream in the background, keeping only its last `limit` bytes."""
+    def __init__(self, stream, limit: int = OUTPUT_LIMIT):
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.limit = limit
+        self.chunks = deque()
+        self.size = 0
+
+    def run(self):
+        for chunk in iter(lambda: self.stream.read(4096), b""):
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+            while self.size - len(self.chunks[0]) >= self.limit:
+                self.size -= len(self.chunks.popleft())
+        self.stream.close()
+
+    @property
+    def text(self) -> str:
+        self.join()
+        return b"".join(self.chunks)[-self.limit:].decode(errors="replace")
+
+
+class ProgressReader:
+    """Binary file wrapper that reports every read to a StreamProgress."""
+    def __init__(self, raw, progress: "StreamProgress"):
+        self.raw = raw
+        self.progress = progress
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.progress.update(len(data))
+        return data
+
+    def readline(self) -> bytes:
+        data = self.raw.readline()
+        self.progress.update(len(data))
+        return data
+
+    def close(self):
+        self.raw.close()
+
+
+class TeeReader:
+    """Binary reader that copies everything read from `raw` into `copy`, e.g. an archive file."""
+    def __init__(self, raw, copy):
+        self.raw = raw
+        self.copy = copy
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.copy.write(data)
+        return data
+
+
+class RangeReader:
+    """Binary reader over `length` bytes of a file starting at `offset`."""
+    def __init__(self, raw, offset: int, length: int):
+        self.raw = raw
+        self.remaining = length
+        self.raw.seek(offset)
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.raw.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+class ConcatReader:
+    """Binary reader yielding several byte strings and readers one after another."""
+    def __init__(self, parts: list):
+        self.parts = [part for part in parts if part != b""]
+
+    def read(self, size: int = -1) -> bytes:
+        while self.parts:
+            part = self.parts[0]
+            if isinstance(part, bytes):
+                data = part if size < 0 else part[:size]
+                rest = b"" if size < 0 else part[size:]
+                if rest:
+                    self.parts[0] = rest
+                else:
+                    self.parts.pop(0)
+                return data
+            data = part.read(size)
+            if data:
+                return data
+            self.parts.pop(0)
+        return b""
+
+
+class StreamProgress:
+    """Print a worker's throughput and the share of its input consumed, at most every `interval` seconds."""
+    def __init__(self, label: str, total_bytes: int, interval: float = 5):
+        self.label = f"[{current_process().name}] {label}"
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.bytes_done = 0
+        self.start_time = time.time()
+        self.last_report = self.start_time
+
+    def update(self, num_bytes: int):
+        self.bytes_done += num_bytes
+        now = time.time()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self):
+        elapsed = max(time.time() - self.start_time, 1e-6)
+        percent = 100 * self.bytes_done / self.total_bytes if self.total_bytes else 100
+        print(
+            f"{self.label}: {percent:.1f}% ({GeneralHelper.format_bytes(self.bytes_done)}"
+            f"/{GeneralHelper.format_bytes(self.total_bytes)}) "
+            f"at {GeneralHelper.format_bytes(self.bytes_done / elapsed)}/s"
+        )
+
+
+def pump(source, destination, progress: StreamProgress = None, close: bool = True) -> int:
+    """
+    Copy a binary stream into a process's stdin in fixed-size chunks.
+
+    Stops early without raising if the process exits and closes its end of the pipe;
+    the caller reports the process's own error instead.
+
+    Returns:
+        int: The number of bytes read from source.
+    """
+    total = 0
+    try:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            destination.write(chunk)
+            total += len(chunk)
+            if progress:
+                progress.update(len(chunk))
+    except BrokenPipeError:
+        pass
+    finally:
+        if close:
+            try:
+                destination.close()
+            except BrokenPipeError:
+                pass
+    return total
+
+
+def feed_process(command, source, prologue: bytes = b"", epilogue: bytes = b"") -> str:
+    """
+    Stream prologue, source and epilogue into a process's stdin in binary mode.
+
+    Args:
+        command (list): The client command, e.g. mysql.
+        source: Binary file object with the SQL to feed.
+        prologue (bytes): Statements sent before the source.
+        epilogue (bytes): Statements sent after the source.
+
+    Returns:
+        str: The tail of the process's stdout.
+
+    Raises:
+        subprocess.CalledProcessError: If the process fails, with the tail of its stderr.
+    """
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout_reader = TailReader(process.stdout)
+    stderr_reader = TailReader(process.stderr)
+    stdout_reader.start()
+    stderr_reader.start()
+    try:
+        process.stdin.write(prologue)
+        pump(source, process.stdin, close=False)
+        process.stdin.write(epilogue)
+    except BrokenPipeError:
+        pass  # The client exited early; its exit code and stderr tell why
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        process.wait()
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode, command, output=stdout_reader.text, stderr=stderr_reader.text
+        )
+    return stdout_reader.text
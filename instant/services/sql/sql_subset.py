@@ -0,0 +1,119 @@
+# A predicate matching no rows: the table's definition is dumped but none of its data
+SCHEMA_ONLY = "FALSE"
+
+
+def parse_seed(spec: str) -> tuple[str, str]:
+    """Parse a --subset value, "table" or "table:WHERE predicate", into the table and its predicate."""
+    table, _, where = spec.partition(":")
+    return table.strip(), where.strip() or None
+
+
+def column_tuple(columns: list[str]) -> str:
+    """Render key columns for an IN comparison, as a row constructor when there are several."""
+    quoted = ", ".join(f"`{column}`" for column in columns)
+    return quoted if len(columns) == 1 else f"({quoted})"
+
+
+def seed_predicate(catalog, table: str, where: str = None, limit: int = None) -> str:
+    """
+    Build the predicate selecting a seed table's rows.
+
+    With a limit, the newest `limit` matching rows by primary key are taken. MySQL does not
+    allow LIMIT directly in an IN subquery, so it goes through a derived table.
+    """
+    where = where or "TRUE"
+    if limit is None:
+        return where
+    primary_key = catalog.tables[table]["primary_key"]
+    if not primary_key:
+        raise ValueError(f"Table {table} has no primary key, a row limit cannot be applied to it.")
+    select = ", ".join(f"`{column}`" for column in primary_key)
+    descending = ", ".join(f"`{column}` DESC" for column in primary_key)
+    return (
+        f"{column_tuple(primary_key)} IN (SELECT {select} FROM (SELECT {select} FROM `{table}` "
+        f"WHERE {where} ORDER BY {descending} LIMIT {int(limit)}) AS `seed_{table}`)"
+    )
+
+
+def subset_predicates(catalog, tables: list[str], seeds: dict, limit: int = None) -> dict:
+    """
+    Work out which rows of each table a referentially consistent subset needs.
+
+    A seed table keeps the rows matching its predicate. Every table referenced by a foreign key
+    then keeps the rows its kept child rows point to, transitively up the foreign-key graph, so
+    the subset imports without dangling references. Tables no seed reaches are dumped schema-only.
+    Edges closing a cycle, e.g. a self-referencing parent_id, are not followed; rows only reachable
+    through them may be missing, which the dump's FOREIGN_KEY_CHECKS=0 header tolerates.
+
+    Args:
+        catalog (SchemaCatalog): The source's catalog, with its foreign-key edges.
+        tables (list): The tables and views being dumped.
+        seeds (dict): Seed table to its WHERE predicate, or None for all its rows.
+        limit (int): Keep at most this many rows of each seed table.
+
+    Returns:
+        dict: Base table name to the WHERE clause selecting its rows, SCHEMA_ONLY for unreached tables.
+    """
+    base_tables = [table for table in tables if catalog.tables.get(table, {}).get("type") != "VIEW"]
+    unknown = [table for table in seeds if table not in base_tables]
+    if unknown:
+        raise ValueError(f"Subset seed tables not found among the dumped tables: {', '.join(unknown)}")
+
+    wanted = set(base_tables)
+    edges = [
+        edge for edge in catalog.foreign_keys if edge["table"] in wanted and edge["referenced_table"] in wanted
+    ]
+    seed_where = {table: seed_predicate(catalog, table, where, limit) for table, where in seeds.items()}
+    skipped_edges = set()
+    memo = {}
+
+    def predicate(table, path):
+        key = (table, path)
+        if key not in memo:
+            parts = [seed_where[table]] if table in seed_where else []
+            for edge in edges:
+                if edge["referenced_table"] != table:
+                    continue
+                child = edge["table"]
+                if child == table or child in path:
+                    skipped_edges.add(f"{child}({', '.join(edge['columns'])}) -> {table}")
+                    continue
+                child_where = predicate(child, path | {table})
+                if child_where is not None:
+                    columns = ", ".join(f"`{column}`" for column in edge["columns"])
+                    parts.append(
+                        f"{column_tuple(edge['referenced_columns'])} IN "
+                        f"(SELECT {columns} FROM `{child}` WHERE {child_where})"
+                    )
+            memo[key] = " OR ".join(f"({part})" for part in parts) if parts else None
+        return memo[key]
+
+    predicates = {}
+    for table in base_tables:
+        where = predicate(table, frozenset())
+        predicates[table] = SCHEMA_ONLY if where is None else where
+
+    with_rows = [table for table, where in predicates.items() if where != SCHEMA_ONLY]
+    print(
+        f"Subset: {len(with_rows)} tables with rows ({', '.join(sorted(with_rows))}), "
+        f"{len(predicates) - len(with_rows)} schema-only."
+    )
+    for edge in sorted(skipped_edges):
+        print(f"Subset: not following cyclic foreign key {edge}; rows only it references may be missing.")
+    return predicates
+
+
+def subset_of(entries: dict):
+    """
+    Return the row predicates of a planned dump that is a subset, or None for a full dump.
+
+    Args:
+        entries (dict): The dump's RunState entries.
+    """
+    predicates = {
+        unit["name"]: unit["where"]
+        for entry in entries.values()
+        for unit in entry.get("units", [])
+        if unit["where"] is not None and unit["part"] is None
+    }
+    return predicates or None
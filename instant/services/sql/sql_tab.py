@@ -0,0 +1,169 @@
+import os
+import re
+import pymysql
+from pymysql.converters import conversions
+from sql_compression import COMPRESSION_FORMATS, compression_for, open_output
+from sql_store import open_whole_file
+from sql_stream import StreamProgress, feed_process
+from sql_throttle import NET_WRITE_TIMEOUT_SECONDS
+from sql_tunnel import connect_through_tunnel
+
+TAB_EXTENSION = ".tsv"
+TAB_FILE_PATTERN = re.compile(r"^\d{8}_(?P<table>.+?)(\.part\d+)?\.tsv(\.\w+)?$")
+# Schema and triggers of a delimited-text export; triggers are created after the rows are loaded
+SCHEMA_FILE = "{timestamp_folder}_schema.sql"
+TRIGGERS_FILE = "{timestamp_folder}_triggers{extension}"
+TRIGGERS_FILE_PATTERN = re.compile(r"^\d{8}_triggers\.sql(\.\w+)?$")
+
+SCHEMA_OPTIONS = ["--no-data", "--skip-triggers"]
+TRIGGERS_OPTIONS = ["--no-data", "--no-create-info", "--triggers"]
+
+ROWS_PER_FETCH = 10000
+# LOAD DATA's default escaping: FIELDS TERMINATED BY '\t' ESCAPED BY '\\' LINES TERMINATED BY '\n'
+NULL_VALUE = b"\\N"
+SPECIAL_BYTES = re.compile(rb"[\\\t\n\r\x00]")
+ESCAPES = {b"\\": b"\\\\", b"\t": b"\\t", b"\n": b"\\n", b"\r": b"\\r", b"\x00": b"\\0"}
+# Keep pymysql's parameter encoders but no result decoders, so values arrive as MySQL's own text
+TEXT_CONVERSIONS = {key: value for key, value in conversions.items() if not isinstance(key, int)}
+# Same session as mysqldump's header: timestamps in UTC, explicit zero ids kept
+SESSION_STATEMENTS = [
+    "SET SESSION time_zone = '+00:00';",
+    "SET SESSION sql_mode = 'NO_AUTO_VALUE_ON_ZERO';",
+]
+
+
+def tab_extension(compress=None) -> str:
+    """Return the delimited-text file extension for the given compression format."""
+    return TAB_EXTENSION + (COMPRESSION_FORMATS[compress]["suffix"] if compress else "")
+
+
+def is_tab_file(file_name: str) -> bool:
+    """Check whether a file holds one table's rows as plain or compressed delimited text."""
+    return TAB_FILE_PATTERN.match(file_name) is not None
+
+
+def tab_table_name(file_name: str) -> str:
+    """Return the table a delimited-text file is loaded into."""
+    return TAB_FILE_PATTERN.match(file_name).group("table")
+
+
+def is_triggers_file(file_name: str) -> bool:
+    return TRIGGERS_FILE_PATTERN.match(file_name) is not None
+
+
+def escape_value(value) -> bytes:
+    """Encode one column value as a LOAD DATA field."""
+    if value is None:
+        return NULL_VALUE
+    if isinstance(value, str):
+        value = value.encode()
+    return SPECIAL_BYTES.sub(lambda match: ESCAPES[match.group()], value)
+
+
+def get_tab_columns(cursor, rds_db: str, table: str) -> list[tuple[str, str]]:
+    """
+    Return the columns to export as (header name, select expression), in table order.
+
+    Generated columns are left out since the server computes them on load. BIT columns are
+    exported as numbers and loaded through a user variable, as LOAD DATA cannot read them as text.
+    """
+    cursor.execute(
+        "SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND EXTRA NOT LIKE '%%GENERATED%%' "
+        "ORDER BY ORDINAL_POSITION;",
+        (rds_db, table),
+    )
+    columns = []
+    for column_name, data_type in cursor.fetchall():
+        if data_type.lower() == "bit":
+            columns.append((f"@{column_name}", f"CAST(`{column_name}` AS UNSIGNED)"))
+        else:
+            columns.append((column_name, f"`{column_name}`"))
+    return columns
+
+
+def run_tab_dump_file(local_port, rds_user, rds_password, rds_db, dump_file, dump_file_path, throttle=None) -> int:
+    """
+    Stream one table, or one primary-key range of it, into a delimited-text file.
+
+    Rows are read through an unbuffered cursor in MySQL's own text representation, so memory
+    stays flat however large the table is. The first line lists the columns for the import.
+    With a throttle, rows are written, and so fetched, at its pace.
+
+    Returns:
+        int: The size of the written file.
+    """
+    unit = dump_file.units[0]
+    connection = connect_through_tunnel(
+        local_port, rds_user, rds_password, rds_db, charset="utf8mb4", conv=TEXT_CONVERSIONS
+    )
+    try:
+        cursor = connection.cursor()
+        columns = get_tab_columns(cursor, rds_db, unit.name)
+        for statement in SESSION_STATEMENTS:
+            cursor.execute(statement)
+        cursor.execute("SET SESSION character_set_results = binary;")  # Column bytes as stored
+        # Rows may be consumed slowly by the compressor or the throttle
+        cursor.execute(f"SET SESSION net_write_timeout = {NET_WRITE_TIMEOUT_SECONDS};")
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY;")
+        cursor.close()
+
+        query = f"SELECT {', '.join(expression for _, expression in columns)} FROM `{unit.name}`"
+        if unit.where:
+            query += f" WHERE {unit.where}"
+
+        progress = StreamProgress(dump_file.file_name, unit.estimated_bytes)
+        with connection.cursor(pymysql.cursors.SSCursor) as rows_cursor, \
+                open_output(dump_file_path, compression_for(dump_file.file_name), throttle) as output:
+            output.write("\t".join(name for name, _ in columns).encode() + b"\n")
+            rows_cursor.execute(query)
+            for rows in iter(lambda: rows_cursor.fetchmany(ROWS_PER_FETCH), []):
+                chunk = b"".join(b"\t".join(map(escape_value, row)) + b"\n" for row in rows)
+                output.write(chunk)
+                progress.update(len(chunk))
+        connection.commit()
+    finally:
+        connection.close()
+    return os.path.getsize(dump_file_path)
+
+
+def load_data_statement(table: str, columns: list[str]) -> str:
+    """Build the LOAD DATA statement reading a delimited-text file from the client's stdin."""
+    column_list = ", ".join(column if column.startswith("@") else f"`{column}`" for column in columns)
+    statement = (
+        f"LOAD DATA LOCAL INFILE '/dev/stdin' INTO TABLE `{table}` CHARACTER SET binary ({column_list})"
+    )
+    assignments = [f"`{column[1:]}` = CAST({column} AS UNSIGNED)" for column in columns if column.startswith("@")]
+    if assignments:
+        statement += " SET " + ", ".join(assignments)
+    return statement + ";"
+
+
+def run_load_unit(mysql_command, unit, session=None) -> int:
+    """
+    Bulk-load a delimited-text file with LOAD DATA LOCAL INFILE, streaming it into the mysql client.
+
+    The statement is passed on the command line and the rows on stdin, so compressed files are
+    decompressed on the fly without a temporary copy. The server needs local_infile enabled.
+
+    Args:
+        mysql_command (list): The mysql client command.
+        unit (ImportUnit): The delimited-text file to load.
+        session (FastLoadSession): Optional session tuning wrapped around the load.
+
+    Returns:
+        int: The number of bytes of the file consumed.
+    """
+    progress = StreamProgress(unit.key, unit.size)
+    with open_whole_file(unit, progress) as source:
+        columns = source.readline().rstrip(b"\n").decode().split("\t")
+        statements = ["SET SESSION foreign_key_checks = 0;", *SESSION_STATEMENTS]
+        statements.append(load_data_statement(unit.load_table, columns))
+        script = "\n".join(statements)
+        if session is not None:
+            script = session.prologue().decode() + script + session.epilogue().decode()
+        output = feed_process([*mysql_command, "--local-infile=1", f"--execute={script}"], source)
+        if session is not None:
+            session.verify(output)
+    progress.report()
+    return progress.bytes_done
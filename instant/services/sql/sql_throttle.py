@@ -0,0 +1,235 @@
+import time
+from contextlib import contextmanager
+from instant.utils.general_helper import GeneralHelper
+
+PAUSE_POLL_SECONDS = 1
+# Set on the dump's streaming connections: the server drops a connection whose rows go unread this long
+NET_WRITE_TIMEOUT_SECONDS = 600
+# A pause never holds a worker longer than this, well under the net_write_timeout of its connection
+MAX_PAUSE_SECONDS = 300
+THROTTLE_BLOCK_BYTES = 256 * 1024  # Bytes written between two throttle decisions
+MIN_FACTOR = 0.1
+RECOVERY_STEP = 0.25
+# MySQL 8.0.22 renamed the statement, 8.4 dropped the old name
+REPLICA_STATUS_STATEMENTS = ("SHOW REPLICA STATUS;", "SHOW SLAVE STATUS;")
+
+
+class BandwidthThrottle:
+    """
+    Bandwidth limits shared by a dump's workers through a Manager.
+
+    Each worker's output is capped at `worker_rate` bytes per second, and all workers together
+    at `total_rate`, by scheduling every block on a shared timeline. The SourceMonitor scales
+    the run through `factor`: below 1 every worker stretches its time per block to match, with
+    or without caps, and at 0 the workers pause.
+    """
+    def __init__(self, shared, lock, worker_rate: float = None, total_rate: float = None):
+        """
+        Args:
+            shared: A Manager dict holding the factor, the shared timeline and the time waited.
+            lock: A Manager Lock guarding the shared timeline.
+            worker_rate (float): The most bytes per second one worker writes, or None.
+            total_rate (float): The most bytes per second all workers write together, or None.
+        """
+        self.shared = shared
+        self.lock = lock
+        self.worker_rate = worker_rate
+        self.total_rate = total_rate
+
+    @property
+    def factor(self) -> float:
+        return self.shared["factor"]
+
+    def wait_while_paused(self) -> float:
+        """
+        Block while the monitor has paused the run, for at most MAX_PAUSE_SECONDS so the worker's
+        connection is read from before the server times it out; returns the seconds waited.
+        """
+        started = time.time()
+        while self.factor == 0 and time.time() - started < MAX_PAUSE_SECONDS:
+            time.sleep(PAUSE_POLL_SECONDS)
+        return time.time() - started
+
+    def reserve(self, seconds: float, now: float) -> float:
+        """Book `seconds` on the timeline shared by all workers and return when the booking ends."""
+        with self.lock:
+            end = max(self.shared["next_send"], now) + seconds
+            self.shared["next_send"] = end
+        return end
+
+    def record_wait(self, seconds: float):
+        with self.lock:
+            self.shared["waited"] = self.shared["waited"] + seconds
+
+
+class ThrottledWriter:
+    """Binary writer that holds its worker to the throttle, one block at a time."""
+    def __init__(self, raw, throttle: BandwidthThrottle):
+        self.raw = raw
+        self.throttle = throttle
+        self.pending_bytes = 0
+        self.block_start = time.time()
+        self.next_write = self.block_start  # This worker's own timeline for the per-worker cap
+        self.waited = 0.0
+
+    def write(self, data: bytes):
+        self.raw.write(data)
+        self.pending_bytes += len(data)
+        if self.pending_bytes >= THROTTLE_BLOCK_BYTES:
+            self.settle()
+
+    def settle(self):
+        """Sleep as long as the caps and the monitor's factor require for the bytes written since the last call."""
+        num_bytes, self.pending_bytes = self.pending_bytes, 0
+        busy = time.time() - self.block_start
+        waited = self.throttle.wait_while_paused()
+        factor = self.throttle.factor or MIN_FACTOR  # Still paused past the cap, or resumed in between; go on slowly
+        now = time.time()
+
+        delay = busy * (1 / factor - 1)
+        if self.throttle.worker_rate:
+            self.next_write = max(self.next_write, now) + num_bytes / (self.throttle.worker_rate * factor)
+            delay = max(delay, self.next_write - now)
+        if self.throttle.total_rate:
+            delay = max(delay, self.throttle.reserve(num_bytes / (self.throttle.total_rate * factor), now) - now)
+        if delay > 0:
+            time.sleep(delay)
+            waited += delay
+        self.waited += waited
+        self.block_start = time.time()
+
+
+@contextmanager
+def throttled(raw, throttle: BandwidthThrottle = None):
+    """Wrap a dump's output in the throttle when there is one, adding its waits to the run's total."""
+    if throttle is None:
+        yield raw
+        return
+    writer = ThrottledWriter(raw, throttle)
+    try:
+        yield writer
+    finally:
+        throttle.record_wait(writer.waited)
+
+
+class SourceMonitor:
+    """
+    Watch the source's load over a side connection and slow or pause the dump's workers.
+
+    While Threads_running or the replica lag is above its threshold the run is slowed by half,
+    down to a tenth of its speed, and at twice a threshold it pauses; once both are back under
+    their thresholds it speeds up again step by step. A paused worker still writes one block at
+    a tenth of its speed every MAX_PAUSE_SECONDS, so its connection never hits net_write_timeout.
+    """
+    def __init__(self, throttle: BandwidthThrottle, connection, threads_running_limit: int = None,
+                 replica_lag_limit: int = None, metrics=None):
+        self.throttle = throttle
+        self.connection = connection
+        self.threads_running_limit = threads_running_limit
+        self.replica_lag_limit = replica_lag_limit
+        self.metrics = metrics
+        self.events = []
+        self.paused_since = None
+        self.paused_seconds = 0.0
+
+    def probe(self) -> tuple:
+        """Read the source's Threads_running and, when it is a replica, its lag in seconds."""
+        threads_running = replica_lag = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_running';")
+            row = cursor.fetchone()
+            threads_running = int(row[1]) if row else None
+            if self.replica_lag_limit is not None:
+                row = None
+                for statement in REPLICA_STATUS_STATEMENTS:
+                    try:
+                        cursor.execute(statement)
+                    except Exception:
+                        continue  # Not supported by this server version
+                    row = cursor.fetchone()
+                    break
+                if row:
+                    status = dict(zip((column[0] for column in cursor.description), row))
+                    lag = status.get("Seconds_Behind_Master", status.get("Seconds_Behind_Source"))
+                    replica_lag = int(lag) if lag is not None else None
+            cursor.close()
+        except Exception:
+            pass  # The monitor only informs the throttle; a failed read must not stop the run
+        return threads_running, replica_lag
+
+    def observe(self):
+        """Adjust the workers' speed to the source's load; called by RunState.track on every save."""
+        threads_running, replica_lag = self.probe()
+        over = [
+            (value, limit, name)
+            for value, limit, name in (
+                (threads_running, self.threads_running_limit, "Threads_running"),
+                (replica_lag, self.replica_lag_limit, "replica lag"),
+            )
+            if limit is not None and value is not None and value > limit
+        ]
+        factor = self.throttle.factor
+        if any(value >= 2 * limit for value, limit, _ in over):
+            new_factor = 0.0
+        elif over:
+            new_factor = max(MIN_FACTOR, factor / 2) if factor else MIN_FACTOR
+        else:
+            new_factor = min(1.0, factor + RECOVERY_STEP)
+        if new_factor == factor:
+            return
+
+        reason = ", ".join(f"{name} {value} over {limit}" for value, limit, name in over) or "source load is normal"
+        self.throttle.shared["factor"] = new_factor
+        now = time.time()
+        if new_factor == 0:
+            self.paused_since = now
+        elif self.paused_since is not None:
+            self.paused_seconds += now - self.paused_since
+            if self.metrics is not None:
+                self.metrics.span("throttle_pause", self.paused_since, now)
+            self.paused_since = None
+        action = "pause" if new_factor == 0 else "slow down" if new_factor < factor else "speed up"
+        self.events.append({"ts": now, "action": action, "factor": new_factor, "reason": reason})
+        if self.metrics is not None:
+            self.metrics.emit(
+                "throttle", action=action, factor=new_factor, reason=reason,
+                threads_running=threads_running, replica_lag=replica_lag,
+            )
+        print(f"Throttle: {action} to {new_factor:.0%} of full speed ({reason}).")
+
+    def finish(self):
+        """Lift any pause, close the side connection and print what the throttle did."""
+        if self.paused_since is not None:
+            self.paused_seconds += time.time() - self.paused_since
+            if self.metrics is not None:
+                self.metrics.span("throttle_pause", self.paused_since)
+            self.paused_since = None
+        self.throttle.shared["factor"] = 1.0
+        self.connection.close()
+
+        caps = []
+        if self.throttle.worker_rate:
+            caps.append(f"{GeneralHelper.format_bytes(self.throttle.worker_rate)}/s per worker")
+        if self.throttle.total_rate:
+            caps.append(f"{GeneralHelper.format_bytes(self.throttle.total_rate)}/s overall")
+        actions = [event["action"] for event in self.events]
+        print(
+            f"Throttle: {actions.count('slow down')} slowdowns, {actions.count('pause')} pauses "
+            f"({self.paused_seconds:.1f}s paused); workers waited {self.throttle.shared['waited']:.1f}s in total"
+            + (f" under caps of {' and '.join(caps)}." if caps else ".")
+        )
+
+
+def create_throttle(manager, connection, worker_rate: float = None, total_rate: float = None,
+                    threads_running_limit: int = None, replica_lag_limit: int = None, metrics=None):
+    """
+    Create the workers' shared throttle and the parent's monitor of the source.
+
+    Returns:
+        tuple: The BandwidthThrottle to pass to the workers, and the SourceMonitor for RunState.track.
+    """
+    throttle = BandwidthThrottle(
+        manager.dict({"factor": 1.0, "next_send": 0.0, "waited": 0.0}), manager.Lock(), worker_rate, total_rate
+    )
+    return throttle, SourceMonitor(throttle, connection, threads_running_limit, replica_lag_limit, metrics)
@@ -0,0 +1,86 @@
+import time
+import pymysql
+from sshtunnel import SSHTunnelForwarder
+
+
+def connect_through_tunnel(local_port, rds_user, rds_password, rds_db, **options):
+    """
+    Open a pymysql connection to the database through a tunnel's local port.
+
+    Args:
+        local_port (int): The local port of the SSH tunnel.
+        options: Extra pymysql.connect arguments, e.g. a cursor class or converters.
+
+    Returns:
+        connection: A connection object to the RDS database.
+    """
+    return pymysql.connect(
+        host='127.0.0.1',  # Connect to the local port
+        port=local_port,
+        user=rds_user,
+        password=rds_password,
+        database=rds_db,
+        **options,
+    )
+
+
+class TunnelManager:
+    """
+    Open a small pool of SSH tunnels to the RDS host and share their local ports.
+
+    Each forwarder is threaded and serves any number of client connections, so pool
+    workers only need a local port instead of opening their own SSH session.
+    """
+    def __init__(self, ssh_host, ssh_port, ssh_user, ssh_pkey, rds_host, rds_port, tunnel_count=1):
+        self.ssh_host = ssh_host
+        self.ssh_port = ssh_port
+        self.ssh_user = ssh_user
+        self.ssh_pkey = ssh_pkey
+        self.rds_host = rds_host
+        self.rds_port = rds_port
+        self.tunnel_count = max(1, tunnel_count)
+        self.forwarders = []
+        self.setup_time = 0.0
+        self.started_at = None
+
+    def start(self):
+        """Open all tunnels, binding each to a free local port chosen by the OS."""
+        start_time = self.started_at = time.time()
+        try:
+            for _ in range(self.tunnel_count):
+                forwarder = SSHTunnelForwarder(
+                    (self.ssh_host, self.ssh_port),
+                    ssh_username=self.ssh_user,
+                    ssh_pkey=self.ssh_pkey,
+                    remote_bind_address=(self.rds_host, self.rds_port),
+                    local_bind_address=("127.0.0.1", 0),
+                    set_keepalive=30,
+                )
+                forwarder.start()
+                self.forwarders.append(forwarder)
+        except Exception:
+            self.stop()
+            raise
+        self.setup_time = time.time() - start_time
+        print(f"Tunnel(s) established on port(s) {self.local_ports} in {self.setup_time:.2f} seconds")
+
+    def stop(self):
+        """Close all tunnels."""
+        for forwarder in self.forwarders:
+            forwarder.stop()
+        self.forwarders = []
+
+    @property
+    def local_ports(self) -> list[int]:
+        return [forwarder.local_bind_port for forwarder in self.forwarders]
+
+    def port_for(self, index: int) -> int:
+        """Return the local port a worker should use, spreading workers across the tunnels."""
+        return self.local_ports[index % len(self.forwarders)]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,116 @@
+import time
+import pymysql
+from sql_planner import DumpPlanner
+from sql_tab import SESSION_STATEMENTS
+from sql.models.models import DumpUnit
+
+VERIFY_METHODS = ("crc", "checksum")
+DEFAULT_CHUNK_ROWS = 200000
+
+
+def chunk_key(unit: DumpUnit) -> str:
+    """Name a verified table or primary-key range in the report."""
+    return unit.name if not unit.is_part else f"{unit.name}#{unit.part} [{unit.where}]"
+
+
+def range_chunks(table, primary_key: str, min_value: int, max_value: int, parts: int) -> list[DumpUnit]:
+    """
+    Cut a table into primary-key ranges to dump or checksum one by one.
+
+    The first range is open below and the last open above, so rows outside the key range read
+    while planning still land in a chunk: rows inserted since are dumped, and rows the target
+    has outside the source's range show up as a mismatch.
+    """
+    ranges = DumpPlanner.split_ranges(min_value, max_value, parts)
+    chunks = []
+    for part, (start, end) in enumerate(ranges):
+        conditions = []
+        if part > 0:
+            conditions.append(f"`{primary_key}` >= {start}")
+        if part < len(ranges) - 1:
+            conditions.append(f"`{primary_key}` < {end}")
+        chunks.append(DumpUnit(
+            table,
+            estimated_bytes=table.estimated_bytes // len(ranges),
+            table_rows=table.table_rows // len(ranges),
+            where=" AND ".join(conditions) or None,
+            part=part,
+        ))
+    return chunks
+
+
+def crc_query(table: str, columns: list[str], where: str = None) -> str:
+    """
+    Build the row count and order-independent CRC aggregate of a table or key range.
+
+    Every column is compared as its binary text, with a NULL marker per column since
+    CONCAT_WS skips NULLs.
+    """
+    values = ", ".join(f"CAST(`{column}` AS BINARY)" for column in columns)
+    nulls = ", ".join(f"ISNULL(`{column}`)" for column in columns)
+    query = (
+        f"SELECT COUNT(*), COALESCE(BIT_XOR(CRC32(CONCAT_WS('#', {values}, CONCAT({nulls})))), 0) "
+        f"FROM `{table}`"
+    )
+    return query + (f" WHERE {where};" if where else ";")
+
+
+def checksum_chunks(connect_options: dict, chunks: list[DumpUnit], columns: dict, method: str = "crc",
+                    pause_seconds: float = 0) -> dict:
+    """
+    Checksum a batch of tables or key ranges over one connection.
+
+    Args:
+        connect_options (dict): pymysql.connect arguments of the source or the target.
+        chunks (list): The DumpUnits to checksum.
+        columns (dict): Table name to its columns, for the CRC method.
+        method (str): "crc" for COUNT and BIT_XOR(CRC32) per chunk, or "checksum" for CHECKSUM TABLE.
+        pause_seconds (float): Sleep after each chunk, to bound the load on the server.
+
+    Returns:
+        dict: Chunk key to (row count or None, checksum), or to an error message.
+    """
+    results = {}
+    connection = pymysql.connect(**connect_options)
+    try:
+        cursor = connection.cursor()
+        for statement in SESSION_STATEMENTS:  # Compare TIMESTAMP values in UTC on both sides
+            cursor.execute(statement)
+        for unit in chunks:
+            try:
+                if method == "checksum":
+                    cursor.execute(f"CHECKSUM TABLE `{unit.name}`;")
+                    results[chunk_key(unit)] = (None, cursor.fetchone()[1])
+                else:
+                    cursor.execute(crc_query(unit.name, columns[unit.name], unit.where))
+                    row_count, checksum = cursor.fetchone()
+                    results[chunk_key(unit)] = (int(row_count), int(checksum))
+            except pymysql.err.MySQLError as error:
+                results[chunk_key(unit)] = f"{error.args[-1]}"
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        cursor.close()
+    finally:
+        connection.close()
+    return results
+
+
+def compare_checksums(source: dict, target: dict) -> list[str]:
+    """
+    Compare the source's and target's results chunk by chunk.
+
+    Returns:
+        list: A description of every mismatched or failed chunk, empty when the target matches.
+    """
+    mismatches = []
+    for key in sorted(source):
+        expected, actual = source[key], target.get(key, "not checked")
+        if isinstance(expected, str) or isinstance(actual, str):
+            mismatches.append(f"{key}: source {expected}, target {actual}")
+        elif expected != actual:
+            expected_rows, actual_rows = expected[0], actual[0]
+            if expected_rows is not None and expected_rows != actual_rows:
+                mismatches.append(f"{key}: {expected_rows} rows on the source, {actual_rows} on the target")
+            else:
+                mismatches.append(f"{key}: checksums differ ({expected[1]} on the source, {actual[1]} on the target)")
+    return mismatches
@@ -1,7 +1,14 @@
 import click
 from aws.aws_helper import AwsHelper
+from instant.utils.general_helper import GeneralHelper
+from ssh_deploy import build_archive, changed_files, current_branch, deploy_script, stream_deploy
+from ssh_exec import HostOutput, print_exec_summary, run_on_hosts
+from ssh_fleet import HostReport, deploy_to_fleet, print_fleet_summary
+from ssh_helper import SshHelper
+from ssh_sync import sync_deploy
 import os
 import subprocess
+import time
 
 @click.group()
 def cli():
@@ -111,68 +118,166 @@ def get_ssh_targets():
     help='The SSH target to connect to.',
     default=lambda: 'wwe-brick' if get_ssh_targets() else None
 )
-def deploy_and_restart(ssh_target):
+@click.option('--full-archive', is_flag=True, default=False,
+              help='Send every changed file whole instead of only the files and blocks the target lacks.')
+def deploy_and_restart(ssh_target, full_archive):
     """
     Deploy the current branch to the remote instance and restart the project.
 
+    The changed files are hashed locally and, in one command, on the target; only the files
+    and the blocks of large files that differ are then streamed into a second command on the
+    same pooled SSH connection, which puts them in place, deletes the files deleted locally
+    and restarts the project. With --full-archive every changed file is sent whole.
+
     Parameters:
     - ssh_target: str - The SSH target to connect to.
+    - full_archive: bool - Send every changed file whole, skipping the hashes.
     """
     # Get the current branch of the project
     project_path = os.getenv('PROJECT_LOCAL_PATH')
-    current_branch = subprocess.check_output(
-        ['git', '-C', project_path, 'rev-parse', '--abbrev-ref', 'HEAD']
-    ).strip().decode('utf-8')
-    
-    click.echo(f"Current branch: {current_branch}")
-    
-    # Get the list of changed files
-    changed_files = subprocess.check_output(
-        ['git', '-C', project_path, 'diff', '--name-only', 'HEAD']
-    ).strip().decode('utf-8').split('\n')
-    
-    click.echo(f"Changed files: {changed_files}")
-    
-    # SSH and perform operations
     project_remote_path = os.getenv('PROJECT_REMOTE_PATH')
-    temp_remote_path = "/tmp/deploy_temp"
-    ssh_commands = f"""
-ssh -T {ssh_target} << 'EOF'
-cd {project_remote_path}
-sudo git stash
-sudo git checkout {current_branch}
-sudo git pull
-mkdir -p {temp_remote_path}
-EOF
+    restart_command = os.getenv('PROJECT_RESTART_COMMAND')
+    branch = current_branch(project_path)
+    click.echo(f"Current branch: {branch}")
+
+    # Get the list of changed files, deleted ones included
+    files = changed_files(project_path)
+    click.echo(f"Changed files: {files}")
+
+    ssh = SshHelper.for_target(ssh_target)
+    started = time.time()
+    try:
+        if full_archive:
+            files = [file for file in files if os.path.lexists(os.path.join(project_path, file))]
+            script = deploy_script(project_remote_path, branch, restart_command)
+            bytes_sent, transfer_seconds, exit_status = stream_deploy(ssh, project_path, files, script, click.echo)
+            summary = f"{len(files)} files sent whole"
+        else:
+            result = sync_deploy(ssh, project_path, project_remote_path, branch, files, restart_command, click.echo)
+            bytes_sent, transfer_seconds, exit_status = result.bytes_sent, result.transfer_seconds, result.exit_status
+            summary = result.describe()
+    finally:
+        SshHelper.close_all()
+    click.echo(
+        f"Sync: {summary}; sent {GeneralHelper.format_bytes(bytes_sent)} in {transfer_seconds:.2f} seconds, "
+        f"{time.time() - started:.2f} seconds in total."
+    )
+    if exit_status != 0:
+        raise click.ClickException(f"Deploy to {ssh_target} failed with exit status {exit_status}.")
+    click.echo(f"Project on branch {branch} deployed and restarted on {ssh_target}")
+
+@cli.command()
+@click.option('--prefix', default='brick', prompt='Give me the instance prefix',
+              help='This helps filter the instances result.')
+@click.option('--aws-profile', default=os.getenv("AWS_PROFILE"),
+              help='AWS profile to use (optional).')
+@click.option('--aws-region', default=os.getenv("AWS_REGION"),
+              help='AWS region to use (optional).')
+@click.option('--concurrency', default=10, type=int, help='Number of hosts of a batch deployed at once.')
+@click.option('--batch-size', default=1, type=int, help='Number of hosts deployed and restarted per rollout batch.')
+@click.option('--health-check', default=os.getenv('PROJECT_HEALTH_CHECK_COMMAND'),
+              help='Command that exits 0 on a host once the restarted project is healthy.')
+@click.option('--health-timeout', default=120, type=int,
+              help='Seconds a restarted host may take to pass its health check before the rollout halts.')
+def deploy_fleet(prefix, aws_profile, aws_region, concurrency, batch_size, health_check, health_timeout):
     """
-    click.echo(ssh_commands)
-    subprocess.run(ssh_commands, shell=True)
-    
-#     # Copy changed files to a temporary directory on the remote instance
-    for file in changed_files:
-        local_file_path = os.path.join(project_path, file)
-        remote_temp_file_path = os.path.join(temp_remote_path, file)
-        remote_temp_dir = os.path.dirname(remote_temp_file_path)
-        click.echo(f'remote temp dir: {remote_temp_dir}')
-        # Create the necessary directories on the remote server
-        ssh_mkdir_command = f"ssh -T {ssh_target} 'mkdir -p {remote_temp_dir}'"
-        subprocess.run(ssh_mkdir_command, shell=True)
-        
-        # Copy the file to the remote server
-        scp_command = f"scp {local_file_path} {ssh_target}:{remote_temp_file_path}"
-        subprocess.run(scp_command, shell=True)
-    
-    # SSH and move files to the desired location with sudo, then restart
-    ssh_commands = f"""
-ssh -T {ssh_target} << 'EOF'
-cd {project_remote_path}
-sudo cp -r {temp_remote_path}/* {project_remote_path}/
-sudo rm -rf {temp_remote_path}
-sudo {os.getenv('PROJECT_RESTART_COMMAND')}
-EOF
+    Deploy the current branch to every running instance matching the prefix.
+
+    The hosts are deployed in rolling batches: each batch gets the changed files, is restarted
+    and waits for its health checks before the next one starts, so a failed batch halts the
+    rollout with the remaining hosts still on their previous code.
+
+    Parameters:
+    - prefix: str - The prefix to filter instances.
+    - aws_profile: str - The AWS profile to use.
+    - aws_region: str - The AWS region to use.
+    - concurrency: int - Number of hosts of a batch deployed at once.
+    - batch_size: int - Number of hosts deployed and restarted per rollout batch.
+    - health_check: str - Command that exits 0 once a host is healthy.
+    - health_timeout: int - Seconds to wait for a host's health check.
+    """
+    restart_command = os.getenv('PROJECT_RESTART_COMMAND')
+    if not restart_command:
+        raise click.ClickException("PROJECT_RESTART_COMMAND is not set, the hosts could not be restarted.")
+    aws_helper = AwsHelper(aws_profile, aws_region)
+    instances = aws_helper.get_running_instances(prefix)
+    if not instances:
+        click.echo(f"No running instances found with prefix {prefix}")
+        return
+    if batch_size < 1 or concurrency < 1:
+        raise click.UsageError("--concurrency and --batch-size must be at least 1.")
+
+    project_path = os.getenv('PROJECT_LOCAL_PATH')
+    branch = current_branch(project_path)
+    files = [file for file in changed_files(project_path) if os.path.lexists(os.path.join(project_path, file))]
+    archive = build_archive(project_path, files)
+    click.echo(
+        f"Deploying branch {branch} ({len(files)} changed files, {GeneralHelper.format_bytes(len(archive))}) "
+        f"to {len(instances)} instances: {', '.join(instance.name for instance in instances)}"
+    )
+    if not health_check:
+        click.echo("No --health-check given, restarts will not wait for the hosts to become healthy.")
+
+    reports = [HostReport(instance.name, instance.public_ip) for instance in instances]
+    script = deploy_script(os.getenv('PROJECT_REMOTE_PATH'), branch)
+    started = time.time()
+    try:
+        deploy_to_fleet(
+            reports, script, archive, restart_command,
+            concurrency=concurrency, batch_size=batch_size, health_check=health_check, health_timeout=health_timeout,
+        )
+    finally:
+        SshHelper.close_all()
+    print_fleet_summary(reports, time.time() - started)
+
+    failed = [report.name for report in reports if report.status not in ("healthy", "restarted")]
+    if failed:
+        raise click.ClickException(f"{len(failed)} of {len(reports)} hosts did not deploy: {', '.join(failed)}")
+
+@cli.command(name='exec')
+@click.argument('command')
+@click.option('--prefix', default='brick', prompt='Give me the instance prefix',
+              help='This helps filter the instances result.')
+@click.option('--aws-profile', default=os.getenv("AWS_PROFILE"),
+              help='AWS profile to use (optional).')
+@click.option('--aws-region', default=os.getenv("AWS_REGION"),
+              help='AWS region to use (optional).')
+@click.option('--concurrency', default=20, type=int, help='Number of hosts the command runs on at once.')
+def exec_command(command, prefix, aws_profile, aws_region, concurrency):
     """
-    subprocess.run(ssh_commands, shell=True)
-    click.echo(f"Project on branch {current_branch} deployed and restarted on {ssh_target}")
+    Run a command on every running instance matching the prefix.
+
+    The command runs concurrently over pooled SSH connections and each host's output is
+    shown as it arrives, prefixed with the host's name. At the end identical outputs are
+    grouped, with every host's exit code and latency.
+
+    Parameters:
+    - command: str - The command to run on each instance.
+    - prefix: str - The prefix to filter instances.
+    - aws_profile: str - The AWS profile to use.
+    - aws_region: str - The AWS region to use.
+    - concurrency: int - Number of hosts the command runs on at once.
+    """
+    if concurrency < 1:
+        raise click.UsageError("--concurrency must be at least 1.")
+    aws_helper = AwsHelper(aws_profile, aws_region)
+    instances = aws_helper.get_running_instances(prefix)
+    if not instances:
+        click.echo(f"No running instances found with prefix {prefix}")
+        return
+
+    click.echo(f"Running on {len(instances)} instances: {', '.join(instance.name for instance in instances)}")
+    hosts = [HostOutput(instance.name, instance.public_ip) for instance in instances]
+    started = time.time()
+    try:
+        run_on_hosts(hosts, command, concurrency)
+    finally:
+        SshHelper.close_all()
+    print_exec_summary(hosts, time.time() - started)
+
+    failed = [host.name for host in hosts if host.error or host.exit_status != 0]
+    if failed:
+        raise click.ClickException(f"{len(failed)} of {len(hosts)} hosts failed: {', '.join(failed)}")
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
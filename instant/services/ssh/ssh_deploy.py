@@ -0,0 +1,104 @@
+import io
+import os
+import shlex
+import subprocess
+import tarfile
+import time
+
+TEMP_REMOTE_PATH = "/tmp/deploy_temp"
+
+
+class CountingWriter:
+    """Binary writer that counts the bytes passed through to `raw`."""
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> int:
+        self.raw.write(data)
+        self.bytes_written += len(data)
+        return len(data)
+
+
+def current_branch(project_path: str) -> str:
+    return subprocess.check_output(
+        ['git', '-C', project_path, 'rev-parse', '--abbrev-ref', 'HEAD']
+    ).strip().decode('utf-8')
+
+
+def changed_files(project_path: str) -> list[str]:
+    """Return the files `git diff --name-only HEAD` lists, relative to the project root."""
+    output = subprocess.check_output(['git', '-C', project_path, 'diff', '--name-only', 'HEAD']).decode('utf-8')
+    return [line for line in output.splitlines() if line]
+
+
+def checkout_command(branch: str) -> str:
+    """
+    Remote command bringing the project's checkout up to date with the branch, run in its folder.
+
+    Its stdin is /dev/null: the deploy's stdin carries the files, which a credential prompt or a
+    hook reading stdin would otherwise eat.
+    """
+    return f"{{ sudo git stash; sudo git checkout {shlex.quote(branch)}; sudo git pull; }} < /dev/null"
+
+
+def deploy_script(project_remote_path: str, branch: str, restart_command: str = None,
+                  temp_remote_path: str = TEMP_REMOTE_PATH) -> str:
+    """
+    Build the remote side of a deploy: update the checkout, unpack the archive read from stdin
+    into a temporary folder, copy it over the project and restart, unless restart_command is
+    None for a restart that comes later.
+    """
+    project = shlex.quote(project_remote_path)
+    temp = shlex.quote(temp_remote_path)
+    return "\n".join([
+        f"cd {project}",
+        checkout_command(branch),
+        f"rm -rf {temp} && mkdir -p {temp}",
+        f"tar -xzf - -C {temp} || {{ echo 'Could not unpack the deploy archive' >&2; exit 1; }}",
+        f"sudo cp -r {temp}/. {project}/",
+        f"sudo rm -rf {temp}",
+    ] + ([f"sudo {restart_command}"] if restart_command else []))
+
+
+def write_archive(output, project_path: str, files: list[str]):
+    """Stream the files into a gzip-compressed tar archive, with paths relative to the project."""
+    with tarfile.open(fileobj=output, mode="w|gz") as archive:
+        for file in files:
+            archive.add(os.path.join(project_path, file), arcname=file, recursive=False)
+
+
+def build_archive(project_path: str, files: list[str]) -> bytes:
+    """Build the deploy archive in memory, to send the same one to several hosts."""
+    buffer = io.BytesIO()
+    write_archive(buffer, project_path, files)
+    return buffer.getvalue()
+
+
+def stream_deploy(ssh, project_path: str, files: list[str], script: str, on_line=print) -> tuple[int, float, int]:
+    """
+    Run a deploy in one command on the host's pooled connection, the archive of the files
+    streamed over its stdin while the remote output is shown as it arrives.
+
+    Args:
+        ssh (SshHelper): The host to deploy to.
+        project_path (str): The local project the file paths are relative to.
+        files (list): The files to send.
+        script (str): The remote side of the deploy, see deploy_script.
+        on_line (callable): Called with every line of remote output.
+
+    Returns:
+        tuple: The archive's size in bytes, the seconds it took to send, and the script's exit status.
+    """
+    sent = {}
+
+    def send_archive(writer):
+        output = CountingWriter(writer)
+        started = time.time()
+        try:
+            write_archive(output, project_path, files)
+        finally:
+            sent["bytes"], sent["seconds"] = output.bytes_written, time.time() - started
+
+    exit_status, _ = ssh.execute_command(script, on_line=on_line, write_stdin=send_archive)
+    return sent.get("bytes", 0), sent.get("seconds", 0.0), exit_status
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from ssh_helper import SshHelper
+
+_print_lock = threading.Lock()
+
+
+class HostOutput:
+    """Output, exit status and latency of one host's run of a fanned-out command."""
+    def __init__(self, name: str, public_ip: str):
+        self.name = name
+        self.public_ip = public_ip
+        self.exit_status = None
+        self.output = ""
+        self.seconds = None
+        self.error = None
+
+    @property
+    def ssh(self) -> SshHelper:
+        return SshHelper(self.public_ip, os.getenv('SSH_USER'), os.getenv('KEY_PATH'))
+
+    def echo(self, line: str):
+        with _print_lock:  # Keep the lines of concurrent hosts whole
+            print(f"[{self.name}] {line}", flush=True)
+
+    @property
+    def status(self) -> str:
+        return f"error: {self.error}" if self.error else f"exit {self.exit_status}"
+
+    def __repr__(self):
+        return f"HostOutput(Name={self.name}, Status={self.status})"
+
+
+def run_on_host(host: HostOutput, command: str):
+    """Thread pool worker: run the command on one host, echoing its output as it arrives."""
+    started = time.time()
+    try:
+        host.exit_status, host.output = host.ssh.execute_command(command, on_line=host.echo)
+    except Exception as e:  # Unreachable hosts, refused keys, dropped connections
+        host.error = str(e).strip() or type(e).__name__
+        host.echo(f"error: {host.error}")
+    finally:
+        host.seconds = time.time() - started
+
+
+def run_on_hosts(hosts: list[HostOutput], command: str, concurrency: int = 20):
+    """Run the command on up to `concurrency` hosts at a time, each over its pooled connection."""
+    with ThreadPool(processes=max(1, min(concurrency, len(hosts)))) as pool:
+        pool.starmap(run_on_host, [(host, command) for host in hosts])
+
+
+def group_outputs(hosts: list[HostOutput]) -> list[tuple[str, list[HostOutput]]]:
+    """Group the hosts by identical output, the largest groups first."""
+    groups = {}
+    for host in sorted(hosts, key=lambda host: host.name):
+        groups.setdefault(host.output if host.error is None else f"error: {host.error}", []).append(host)
+    return sorted(groups.items(), key=lambda group: -len(group[1]))
+
+
+def print_exec_summary(hosts: list[HostOutput], total_seconds: float):
+    """Print each distinct output once, with the hosts that produced it and their exit codes and latencies."""
+    groups = group_outputs(hosts)
+    print(f"\n{len(hosts)} hosts, {len(groups)} distinct outputs ({total_seconds:.1f}s):")
+    for output, group in groups:
+        print(f"\n=== {len(group)} host{'s' if len(group) > 1 else ''}: " + ", ".join(
+            f"{host.name} ({host.status}, {host.seconds:.2f}s)" for host in group
+        ))
+        print(output.rstrip("\n") or "(no output)")
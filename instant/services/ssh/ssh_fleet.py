@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from instant.utils.general_helper import GeneralHelper
+from ssh_helper import SshHelper
+
+HEALTH_CHECK_INTERVAL_SECONDS = 5
+_print_lock = threading.Lock()
+
+
+class HostReport:
+    """Status and timings of one host of a fleet deploy."""
+    def __init__(self, name: str, public_ip: str):
+        self.name = name
+        self.public_ip = public_ip
+        self.status = "pending"
+        self.archive_bytes = 0
+        self.deploy_seconds = None
+        self.restart_seconds = None
+        self.health_seconds = None
+        self.error = None
+
+    @property
+    def ssh(self) -> SshHelper:
+        return SshHelper(self.public_ip, os.getenv('SSH_USER'), os.getenv('KEY_PATH'))
+
+    def echo(self, line: str):
+        with _print_lock:  # Keep the lines of concurrent hosts whole
+            print(f"[{self.name}] {line}", flush=True)
+
+    def fail(self, status: str, error: str):
+        self.status = status
+        self.error = error.strip().splitlines()[-1] if error.strip() else status
+        self.echo(f"{status}: {self.error}")
+
+    def __repr__(self):
+        return f"HostReport(Name={self.name}, Status={self.status})"
+
+
+def deploy_host(report: HostReport, script: str, archive: bytes):
+    """Thread pool worker: send the archive to one host and put the files in place, without restarting."""
+    started = time.time()
+    try:
+        exit_status, output = report.ssh.execute_command(
+            script, on_line=report.echo, write_stdin=lambda writer: writer.write(archive)
+        )
+    except Exception as e:  # Unreachable hosts, refused keys, dropped connections
+        report.fail("unreachable", str(e))
+        return
+    finally:
+        report.deploy_seconds = time.time() - started
+    if exit_status != 0:
+        report.fail("deploy failed", output or f"exit status {exit_status}")
+        return
+    report.archive_bytes = len(archive)
+    report.status = "deployed"
+
+
+def restart_host(report: HostReport, restart_command: str, health_check: str = None, health_timeout: float = 120):
+    """
+    Thread pool worker: restart one host's project and wait until its health check passes.
+
+    The health check is run on the host every few seconds until it exits 0 or the timeout passes.
+    """
+    ssh = report.ssh
+    started = time.time()
+    try:
+        exit_status, output = ssh.execute_command(f"sudo {restart_command}", on_line=report.echo)
+        report.restart_seconds = time.time() - started
+        if exit_status != 0:
+            report.fail("restart failed", output or f"exit status {exit_status}")
+            return
+        if not health_check:
+            report.status = "restarted"
+            return
+
+        health_started = time.time()
+        while True:
+            exit_status, output = ssh.execute_command(health_check)
+            if exit_status == 0:
+                report.health_seconds = time.time() - health_started
+                report.status = "healthy"
+                return
+            if time.time() - health_started > health_timeout:
+                report.health_seconds = time.time() - health_started
+                report.fail("unhealthy", output or f"health check exit status {exit_status}")
+                return
+            time.sleep(HEALTH_CHECK_INTERVAL_SECONDS)
+    except Exception as e:
+        report.fail("restart failed", str(e))
+
+
+def roll_host(report: HostReport, script: str, archive: bytes, restart_command: str,
+              health_check: str = None, health_timeout: float = 120):
+    """Thread pool worker: put the files in place on one host, then restart it and wait until it is healthy."""
+    deploy_host(report, script, archive)
+    if report.status == "deployed":
+        restart_host(report, restart_command, health_check, health_timeout)
+
+
+def deploy_to_fleet(reports: list[HostReport], script: str, archive: bytes, restart_command: str,
+                    concurrency: int = 10, batch_size: int = 1, health_check: str = None,
+                    health_timeout: float = 120):
+    """
+    Deploy to the hosts in rolling batches, each batch updated, restarted and health checked as a whole.
+
+    Hosts go `batch_size` at a time, up to `concurrency` of a batch at once; each batch waits for
+    its health checks before the next one starts. A batch with a failed restart or health check
+    halts the rollout: the remaining hosts are left untouched, on their previous code. Hosts that
+    could not be reached or whose files could not be put in place are reported, not restarted.
+    """
+    with ThreadPool(processes=max(1, min(concurrency, batch_size, len(reports)))) as pool:
+        for start in range(0, len(reports), batch_size):
+            batch = reports[start:start + batch_size]
+            print(f"Deploying {', '.join(report.name for report in batch)}...")
+            pool.starmap(roll_host, [
+                (report, script, archive, restart_command, health_check, health_timeout) for report in batch
+            ])
+            if any(report.status in ("restart failed", "unhealthy") for report in batch):
+                for report in reports[start + batch_size:]:
+                    report.status = "not deployed"
+                print("Rollout halted: a host in the last batch did not come back healthy.")
+                break
+
+
+def print_fleet_summary(reports: list[HostReport], total_seconds: float):
+    """Print every host's status and timings."""
+    def seconds(value):
+        return "" if value is None else f"{value:.1f}s"
+
+    print(f"\nFleet deploy summary ({total_seconds:.1f}s):")
+    print(f"  {'host':<32} {'ip':<16} {'status':<14} {'sent':>10} {'deploy':>8} {'restart':>8} {'healthy':>8}")
+    for report in sorted(reports, key=lambda report: report.name):
+        print(
+            f"  {report.name[:32]:<32} {report.public_ip or '':<16} {report.status:<14} "
+            f"{GeneralHelper.format_bytes(report.archive_bytes):>10} {seconds(report.deploy_seconds):>8} "
+            f"{seconds(report.restart_seconds):>8} {seconds(report.health_seconds):>8}"
+        )
+    for report in reports:
+        if report.error:
+            print(f"  {report.name}: {report.error}")
@@ -1,21 +1,173 @@
+import os
+import threading
 import paramiko
 
+KEEPALIVE_SECONDS = 30
+CONNECT_TIMEOUT_SECONDS = 15
+CHUNK_SIZE = 64 * 1024
+SSH_CONFIG_PATH = os.path.expanduser('~/.ssh/config')
+
+
+class ChannelWriter:
+    """Binary writer sending everything written to a channel's stdin."""
+    def __init__(self, channel):
+        self.channel = channel
+
+    def write(self, data: bytes) -> int:
+        self.channel.sendall(data)
+        return len(data)
+
+
 class SshHelper:
-    def __init__(self, hostname: str, username: str, key_path: str):
+    """
+    Pooled SSH connection to one host.
+
+    Connections are kept open per host, port, user and key for the life of the process, with
+    keepalives, and shared by every SshHelper for the same endpoint: each command, file
+    streams included, runs on its own channel of the one authenticated transport, so repeated
+    operations in a run pay the handshake once. Safe to use from several threads.
+    """
+    _connections = {}
+    _endpoint_locks = {}
+    _lock = threading.Lock()
+
+    def __init__(self, hostname: str, username: str, key_path: str, port: int = 22):
         self.hostname = hostname
         self.username = username
         self.key_path = key_path
-        self.ssh_client = paramiko.SSHClient()
-        self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.port = port
+
+    @classmethod
+    def for_target(cls, ssh_target: str):
+        """
+        Build the helper for an ssh target: a Host alias of ~/.ssh/config, or user@host.
+
+        Values the config does not set fall back to the SSH_USER and KEY_PATH environment variables.
+        """
+        user, _, host = ssh_target.rpartition('@')
+        options = {}
+        if os.path.exists(SSH_CONFIG_PATH):
+            options = paramiko.SSHConfig.from_path(SSH_CONFIG_PATH).lookup(host)
+        identity_files = options.get('identityfile') or [os.getenv('KEY_PATH')]
+        return cls(
+            hostname=options.get('hostname', host),
+            username=user or options.get('user') or os.getenv('SSH_USER'),
+            key_path=os.path.expanduser(identity_files[0]) if identity_files[0] else None,
+            port=int(options.get('port', 22)),
+        )
+
+    @property
+    def pool_key(self) -> tuple:
+        return self.hostname, self.port, self.username, self.key_path
+
+    def connect(self) -> paramiko.SSHClient:
+        """
+        Return the pooled client of this endpoint, connecting or reconnecting as needed.
+
+        The pool lock is only held to look up and store clients; the handshake runs under the
+        endpoint's own lock, so a slow or unreachable host does not hold up the others.
+        """
+        with self._lock:
+            ssh_client = self._live_client()
+            if ssh_client is not None:
+                return ssh_client
+            endpoint_lock = self._endpoint_locks.setdefault(self.pool_key, threading.Lock())
+
+        with endpoint_lock:
+            with self._lock:
+                ssh_client = self._live_client()  # Another thread connected while this one waited
+                if ssh_client is not None:
+                    return ssh_client
+
+            ssh_client = paramiko.SSHClient()
+            ssh_client.load_system_host_keys()
+            ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            ssh_client.connect(
+                hostname=self.hostname,
+                port=self.port,
+                username=self.username,
+                key_filename=self.key_path,
+                timeout=CONNECT_TIMEOUT_SECONDS,
+                banner_timeout=CONNECT_TIMEOUT_SECONDS,
+            )
+            ssh_client.get_transport().set_keepalive(KEEPALIVE_SECONDS)
+            with self._lock:
+                self._connections[self.pool_key] = ssh_client
+            return ssh_client
+
+    def _live_client(self):
+        """Return this endpoint's pooled client if its transport is still up; call with the pool lock held."""
+        ssh_client = self._connections.get(self.pool_key)
+        transport = ssh_client.get_transport() if ssh_client else None
+        return ssh_client if transport is not None and transport.is_active() else None
+
+    @property
+    def ssh_client(self) -> paramiko.SSHClient:
+        return self.connect()
+
+    def execute_command(self, command: str, on_line=None, write_stdin=None) -> tuple[int, str]:
+        """
+        Run a command on a new channel of the pooled connection, streaming its output.
+
+        Args:
+            command (str): The command, run by the remote user's shell.
+            on_line (callable): Called with every line of output as it arrives, stdout and stderr merged.
+            write_stdin (callable): Called in a thread with a binary writer to the command's stdin,
+                which is closed when it returns.
+
+        Returns:
+            tuple: The command's exit status and its whole output.
+        """
+        channel = self.connect().get_transport().open_session()
+        channel.set_combine_stderr(True)
+        channel.exec_command(command)
+
+        writer_errors = []
+        writer_thread = None
+        if write_stdin is not None:
+            def feed():
+                try:
+                    write_stdin(ChannelWriter(channel))
+                except OSError as e:
+                    if not (channel.closed or channel.exit_status_ready()):
+                        writer_errors.append(e)  # A local failure, not the command closing its end
+                except Exception as e:
+                    writer_errors.append(e)
+                finally:
+                    channel.shutdown_write()
+            writer_thread = threading.Thread(target=feed, daemon=True)
+            writer_thread.start()
 
-    def connect(self):
-        private_key = paramiko.RSAKey(filename=self.key_path)
-        self.ssh_client.connect(hostname=self.hostname, username=self.username, pkey=private_key)
+        output = bytearray()
+        partial = b""
+        for data in iter(lambda: channel.recv(CHUNK_SIZE), b""):
+            output += data
+            if on_line is not None:
+                *lines, partial = (partial + data).split(b"\n")
+                for line in lines:
+                    on_line(line.decode(errors="replace"))
+        if on_line is not None and partial:
+            on_line(partial.decode(errors="replace"))
 
-    def execute_command(self, command: str) -> str:
-        stdout= self.ssh_client.exec_command(command)
-        return stdout.read().decode()
+        exit_status = channel.recv_exit_status()
+        if writer_thread is not None:
+            writer_thread.join()
+        channel.close()
+        if writer_errors:
+            raise writer_errors[0]
+        return exit_status, output.decode(errors="replace")
 
     def close_connection(self):
-        self.ssh_client.close()
+        """Close this endpoint's pooled connection."""
+        with self._lock:
+            ssh_client = self._connections.pop(self.pool_key, None)
+        if ssh_client is not None:
+            ssh_client.close()
 
+    @classmethod
+    def close_all(cls):
+        """Close every pooled connection, e.g. at the end of a command."""
+        with cls._lock:
+            ssh_clients, cls._connections = list(cls._connections.values()), {}
+        for client in ssh_clients:
+            client.close()
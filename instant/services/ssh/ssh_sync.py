@@ -0,0 +1,323 @@
+import hashlib
+import io
+import json
+import os
+import shlex
+import tarfile
+import time
+from ssh_deploy import CountingWriter, TEMP_REMOTE_PATH, checkout_command, deploy_script, stream_deploy
+
+BLOCK_SIZE = 256 * 1024
+MIN_DELTA_SIZE = 4 * BLOCK_SIZE  # Smaller files are sent whole when they differ
+MAX_DELTA_RATIO = 0.5  # Above this share of changed blocks a file is sent whole
+HASHES_MARKER = "__instant_sync_hashes__"
+# The deployed copies of the candidate files, saved before the checkout is updated, and their hashes
+BASE_REMOTE_PATH = TEMP_REMOTE_PATH + "_base"
+
+# Run by python3 on the host before the checkout is updated: copy the paths read as JSON from
+# stdin, relative to the current folder, into the base folder and print their hashes.
+REMOTE_HASHER = r'''
+import hashlib, json, os, shutil, sys
+block_size, min_delta_size, base = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+hashes = {}
+for path in json.load(sys.stdin):
+    if not os.path.lexists(path):
+        continue
+    if os.path.islink(path) or not os.path.isfile(path):
+        hashes[path] = {}
+        continue
+    digest, blocks, size = hashlib.sha256(), [], 0
+    saved = os.path.join(base, path)
+    try:
+        os.makedirs(os.path.dirname(saved) or base, exist_ok=True)
+        shutil.copyfile(path, saved)
+        with open(saved, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+                blocks.append(hashlib.sha256(block).hexdigest())
+                size += len(block)
+    except OSError:
+        hashes[path] = {}
+        continue
+    hashes[path] = {"size": size, "sha256": digest.hexdigest()}
+    if size >= min_delta_size:
+        hashes[path]["blocks"] = blocks
+print(json.dumps(hashes))
+'''
+
+# Run by python3 on the host: unpack the payload read from stdin into the temporary folder,
+# restoring the unchanged files and rebuilding the block-patched ones from the saved deployed
+# copies, and checking the patched files' hashes.
+REMOTE_APPLIER = r'''
+import hashlib, json, os, shutil, sys, tarfile
+temp, base, block_size = sys.argv[1], sys.argv[2], int(sys.argv[3])
+deltas = {}
+with tarfile.open(fileobj=sys.stdin.buffer, mode="r|gz") as archive:
+    for member in archive:
+        kind, _, path = member.name.partition("/")
+        if member.name == "delta.json":
+            manifest = json.loads(archive.extractfile(member).read().decode("utf-8"))
+            deltas = manifest["patched"]
+            for unchanged in manifest["unchanged"]:
+                target = os.path.join(temp, unchanged)
+                os.makedirs(os.path.dirname(target) or temp, exist_ok=True)
+                shutil.copyfile(os.path.join(base, unchanged), target)
+        elif kind == "files":
+            member.name = path
+            archive.extract(member, temp)
+        elif kind == "blocks":
+            delta, data = deltas[path], archive.extractfile(member)
+            target = os.path.join(temp, path)
+            os.makedirs(os.path.dirname(target) or temp, exist_ok=True)
+            shutil.copyfile(os.path.join(base, path), target)
+            with open(target, "r+b") as f:
+                f.truncate(delta["size"])
+                for index in delta["blocks"]:
+                    f.seek(index * block_size)
+                    f.write(data.read(min(block_size, delta["size"] - index * block_size)))
+            with open(target, "rb") as f:
+                digest = hashlib.sha256()
+                for block in iter(lambda: f.read(block_size), b""):
+                    digest.update(block)
+            if digest.hexdigest() != delta["sha256"]:
+                sys.exit("Patched %s does not match the local file, the remote copy changed during the deploy" % path)
+'''
+
+
+def file_digest(path: str, block_size: int = BLOCK_SIZE, min_delta_size: int = MIN_DELTA_SIZE) -> dict:
+    """Hash a local file the way REMOTE_HASHER does: its size, sha256 and, when large, each block's sha256."""
+    digest, blocks, size = hashlib.sha256(), [], 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+            blocks.append(hashlib.sha256(block).hexdigest())
+            size += len(block)
+    result = {"size": size, "sha256": digest.hexdigest()}
+    if size >= min_delta_size:
+        result["blocks"] = blocks
+    return result
+
+
+class SyncPlan:
+    """
+    What a delta sync sends: whole files, changed blocks of large files, and deletions; unchanged
+    files are restored from the host's deployed copies, which the checkout update reverts.
+    """
+    def __init__(self):
+        self.whole = []
+        self.patched = {}  # path -> {"size", "sha256", "blocks": changed block indices}
+        self.deleted = []
+        self.unchanged = []
+
+    def describe(self) -> str:
+        changed_blocks = sum(len(delta["blocks"]) for delta in self.patched.values())
+        return (
+            f"{len(self.whole)} files sent whole, {len(self.patched)} patched ({changed_blocks} blocks), "
+            f"{len(self.deleted)} deleted, {len(self.unchanged)} already up to date"
+        )
+
+
+def plan_sync(project_path: str, files: list[str], remote_hashes: dict, block_size: int = BLOCK_SIZE) -> SyncPlan:
+    """
+    Compare the local candidate files with the host's hashes.
+
+    Args:
+        project_path (str): The local project the file paths are relative to.
+        files (list): The candidate files, including the ones deleted locally.
+        remote_hashes (dict): The host's hashes by path, see REMOTE_HASHER; missing paths do not exist there.
+        block_size (int): The block size both sides hashed with.
+
+    Returns:
+        SyncPlan: The files to send whole or patch, and the ones to delete on the host.
+    """
+    plan = SyncPlan()
+    for file in files:
+        local_path = os.path.join(project_path, file)
+        remote = remote_hashes.get(file)
+        if not os.path.lexists(local_path):
+            plan.deleted.append(file)  # Even when already gone there, the checkout update may restore it
+            continue
+        if os.path.islink(local_path) or not os.path.isfile(local_path):
+            plan.whole.append(file)  # Links and folders go through tar as they are
+            continue
+
+        local = file_digest(local_path, block_size)
+        if remote and remote.get("sha256") == local["sha256"]:
+            plan.unchanged.append(file)
+        elif remote and "blocks" in remote and "blocks" in local:
+            changed = [
+                index for index, block in enumerate(local["blocks"])
+                if index >= len(remote["blocks"]) or remote["blocks"][index] != block
+            ]
+            if len(changed) <= MAX_DELTA_RATIO * len(local["blocks"]):
+                plan.patched[file] = {"size": local["size"], "sha256": local["sha256"], "blocks": changed}
+            else:
+                plan.whole.append(file)
+        else:
+            plan.whole.append(file)
+    return plan
+
+
+def write_payload(output, project_path: str, plan: SyncPlan, block_size: int = BLOCK_SIZE):
+    """
+    Stream the plan's payload as a gzip-compressed tar: `delta.json` first, listing the patches and
+    the unchanged files, then the whole files under `files/` and the changed blocks of each patched
+    file under `blocks/`.
+    """
+    def add_bytes(archive, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        archive.addfile(info, io.BytesIO(data))
+
+    with tarfile.open(fileobj=output, mode="w|gz") as archive:
+        manifest = {"patched": plan.patched, "unchanged": plan.unchanged}
+        add_bytes(archive, "delta.json", json.dumps(manifest).encode("utf-8"))
+        for file in plan.whole:
+            archive.add(os.path.join(project_path, file), arcname=f"files/{file}", recursive=False)
+        for file, delta in plan.patched.items():
+            with open(os.path.join(project_path, file), "rb") as f:
+                blocks = []
+                for index in delta["blocks"]:
+                    f.seek(index * block_size)
+                    blocks.append(f.read(block_size))
+            add_bytes(archive, f"blocks/{file}", b"".join(blocks))
+
+
+def hash_script(project_remote_path: str, branch: str, block_size: int = BLOCK_SIZE,
+                base_remote_path: str = BASE_REMOTE_PATH) -> str:
+    """
+    Build the first remote step: save and hash the deployed copies of the candidate files read
+    from stdin, then update the checkout, whose stash reverts them, and print the hashes.
+    """
+    base = shlex.quote(base_remote_path)
+    hasher = f"python3 -c {shlex.quote(REMOTE_HASHER)} {block_size} {MIN_DELTA_SIZE} {base}"
+    return "\n".join([
+        f"cd {shlex.quote(project_remote_path)}",
+        f"rm -rf {base} && mkdir -p {base}",
+        f"{hasher} > {base}.json || exit 1",
+        checkout_command(branch),
+        f"echo {HASHES_MARKER}",
+        f"cat {base}.json",
+    ])
+
+
+def apply_script(project_remote_path: str, deleted: list[str], restart_command: str = None,
+                 temp_remote_path: str = TEMP_REMOTE_PATH, block_size: int = BLOCK_SIZE,
+                 base_remote_path: str = BASE_REMOTE_PATH) -> str:
+    """
+    Build the second remote step: rebuild the candidate files from the payload read from stdin
+    and the saved deployed copies in a temporary folder, copy them over the project, delete the
+    deleted files and restart.
+    """
+    project = shlex.quote(project_remote_path)
+    temp = shlex.quote(temp_remote_path)
+    base = shlex.quote(base_remote_path)
+    applier = f"python3 -c {shlex.quote(REMOTE_APPLIER)} {temp} {base} {block_size}"
+    return "\n".join([
+        f"cd {project}",
+        f"rm -rf {temp} && mkdir -p {temp}",
+        f"{applier} || {{ echo 'Could not apply the deploy payload' >&2; exit 1; }}",
+        f"sudo cp -r {temp}/. {project}/",
+    ] + ([f"sudo rm -rf -- {' '.join(shlex.quote(file) for file in deleted)}"] if deleted else []) + [
+        f"sudo rm -rf {temp} {base} {base}.json",
+    ] + ([f"sudo {restart_command}"] if restart_command else []))
+
+
+class SyncResult:
+    """What a delta sync did and how long each step took."""
+    def __init__(self):
+        self.plan = None
+        self.bytes_sent = 0
+        self.hash_seconds = 0.0
+        self.transfer_seconds = 0.0
+        self.exit_status = 0
+        self.full_archive = False
+
+    def describe(self) -> str:
+        if self.full_archive:
+            return "python3 is not available on the host, sent the full archive instead"
+        return self.plan.describe()
+
+
+def fetch_remote_hashes(ssh, project_remote_path: str, branch: str, files: list[str], on_line=print) -> dict:
+    """
+    Hash the candidate files as deployed on the host, saving copies of them, and update the
+    host's checkout, in one command.
+
+    Returns:
+        dict: The host's hashes by path, or None when they could not be read, e.g. without python3.
+    """
+    seen_marker = []
+
+    def echo(line):
+        if line == HASHES_MARKER:
+            seen_marker.append(line)
+        elif not seen_marker:
+            on_line(line)
+
+    exit_status, output = ssh.execute_command(
+        hash_script(project_remote_path, branch),
+        on_line=echo,
+        write_stdin=lambda writer: writer.write(json.dumps(files).encode("utf-8")),
+    )
+    _, marker, hashes = output.rpartition(HASHES_MARKER + "\n")
+    if exit_status != 0 or not marker:
+        return None
+    try:
+        return json.loads(hashes.splitlines()[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def sync_deploy(ssh, project_path: str, project_remote_path: str, branch: str, files: list[str],
+                restart_command: str = None, on_line=print) -> SyncResult:
+    """
+    Deploy by content: hash the candidate files on both sides and send only what differs.
+
+    One command hashes the candidate files as the previous deploy left them, before the checkout
+    update stashes them, so a repeated deploy of a branch only sends what changed since; a second
+    one receives the whole files and the changed blocks of large files, restores the unchanged
+    files from the saved copies, deletes the files deleted locally and restarts. Both run on the
+    host's pooled connection. Hosts without python3 get the full archive, as stream_deploy sends it.
+
+    Args:
+        ssh (SshHelper): The host to deploy to.
+        project_path (str): The local project the file paths are relative to.
+        project_remote_path (str): The project's folder on the host.
+        branch (str): The branch to check out on the host.
+        files (list): The candidate files, including the ones deleted locally.
+        restart_command (str): Run with sudo once the files are in place, or None.
+        on_line (callable): Called with every line of remote output.
+
+    Returns:
+        SyncResult: The plan, bytes sent, timings and the exit status of the last remote command.
+    """
+    result = SyncResult()
+    started = time.time()
+    remote_hashes = fetch_remote_hashes(ssh, project_remote_path, branch, files, on_line)
+    result.hash_seconds = time.time() - started
+    if remote_hashes is None:
+        result.full_archive = True
+        existing = [file for file in files if os.path.lexists(os.path.join(project_path, file))]
+        script = deploy_script(project_remote_path, branch, restart_command)
+        result.bytes_sent, result.transfer_seconds, result.exit_status = stream_deploy(
+            ssh, project_path, existing, script, on_line
+        )
+        return result
+
+    result.plan = plan_sync(project_path, files, remote_hashes)
+    sent = {}
+
+    def send_payload(writer):
+        output = CountingWriter(writer)
+        transfer_started = time.time()
+        try:
+            write_payload(output, project_path, result.plan)
+        finally:
+            sent["bytes"], sent["seconds"] = output.bytes_written, time.time() - transfer_started
+
+    script = apply_script(project_remote_path, result.plan.deleted, restart_command)
+    result.exit_status, _ = ssh.execute_command(script, on_line=on_line, write_stdin=send_payload)
+    result.bytes_sent, result.transfer_seconds = sent.get("bytes", 0), sent.get("seconds", 0.0)
+    return result
@@ -11,4 +11,12 @@ class GeneralHelper:
 
         selection = int(input("Select an option: "))
         selected_option = options[selection - 1]
-        return selected_option
\ No newline at end of file
+        return selected_option
+
+    @staticmethod
+    def format_bytes(num_bytes: float) -> str:
+        """Format a byte count as a human readable string."""
+        for unit in ["B", "KB", "MB", "GB", "TB"]:
+            if abs(num_bytes) < 1024 or unit == "TB":
+                return f"{num_bytes:.1f} {unit}" if unit != "B" else f"{int(num_bytes)} B"
+            num_bytes /= 1024